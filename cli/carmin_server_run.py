@@ -4,9 +4,15 @@ Launches the server
 
 Options:
     -p <port>, --port <port>  The server will listen on this port
+    -w <workers>, --workers <workers>
+                              Number of worker processes
+    -t <threads>, --threads <threads>
+                              Number of threads of each worker process
+    -d, --development         Launch the single process development server
     -c, --container           Launch the server inside a Docker container
     """
 
+import os
 import json
 from subprocess import call
 from pathlib import Path
@@ -37,15 +43,31 @@ if __name__ == '__main__':
     except ValueError:
         print("Invalid port number. Port must be an integer.")
         exit(1)
+    env = dict(os.environ)
+    for option, variable in [('--workers', 'WORKERS'), ('--threads',
+                                                         'THREADS')]:
+        if args.get(option):
+            try:
+                env[variable] = str(int(args.get(option)))
+            except ValueError:
+                print("Invalid {} number. It must be an integer.".format(
+                    option[2:]))
+                exit(1)
     if args.get('--container'):
         call(['docker', 'build', '-t=carmin-server', '..'])
         call([
             'docker', 'run', '-p', '{}:8080'.format(port), '-e',
-            'DATABASE_URI="sqlite:////carmin-db/app.db"', '-v',
+            'DATABASE_URI="sqlite:////carmin-db/app.db"', '-e',
+            'WORKERS={}'.format(env.get('WORKERS', '')), '-e',
+            'THREADS={}'.format(env.get('THREADS', '')), '-v',
             '{}:/carmin-assets/pipelines'.format(
                 CONFIG.get('PIPELINE_DIRECTORY')),
             '-v', '{}:/carmin-assets/data'.format(
                 CONFIG.get('DATA_DIRECTORY')), 'carmin-server'
         ])
-    else:
+    elif args.get('--development'):
         call(['python3', '-m', 'server', str(port)], cwd=project_root())
+    else:
+        call(['python3', '-m', 'server.wsgi', str(port)],
+             cwd=project_root(),
+             env=env)
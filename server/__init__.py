@@ -11,6 +11,9 @@ from server.resources.post_processors import *
 def main():
     declare_api(app)
     start_up()
+    EXECUTION_SUPERVISOR.start()
+    EXECUTION_INITIALIZER.start()
+    start_pipeline_watcher()
     if len(sys.argv) > 1:
         port = sys.argv[1]
         try:
@@ -24,3 +27,6 @@ def main():
 
 
 from server.startup_validation import start_up
+from server.resources.helpers.pipeline_watcher import start_pipeline_watcher
+from server.resources.helpers.execution_play import EXECUTION_SUPERVISOR
+from server.resources.helpers.execution_initialization import EXECUTION_INITIALIZER
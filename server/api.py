@@ -16,6 +16,8 @@ def declare_api(app):
     from server.resources.execution_stdout import ExecutionStdOut
     from server.resources.execution_results import ExecutionResults
     from server.resources.executions_count import ExecutionsCount
+    from server.resources.executions_batch import ExecutionsBatch
+    from server.resources.execution_events import ExecutionEvents
     from server.resources.path import Path
     from server.resources.pipeline import Pipeline
     from server.resources.pipelines import Pipelines
@@ -28,6 +30,8 @@ def declare_api(app):
     api.add_resource(Edit, '/users/edit')
     api.add_resource(Executions, '/executions')
     api.add_resource(ExecutionsCount, '/executions/count')
+    api.add_resource(ExecutionsBatch, '/executions/batch')
+    api.add_resource(ExecutionEvents, '/executions/events')
     api.add_resource(Execution, '/executions/<string:execution_identifier>')
     api.add_resource(ExecutionResults,
                      '/executions/<string:execution_identifier>/results')
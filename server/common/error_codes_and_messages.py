@@ -62,7 +62,7 @@ PATH_IS_DIRECTORY = ErrorCodeAndMessage(75,
 INVALID_UPLOAD_TYPE = ErrorCodeAndMessage(80,
                                           "'type' must be 'File' or 'Archive'")
 ACTION_REQUIRED = ErrorCodeAndMessage(85, "'action' cannot be blank")
-NOT_AN_ARCHIVE = ErrorCodeAndMessage(90, 'Invalid zip: {}')
+NOT_AN_ARCHIVE = ErrorCodeAndMessage(90, 'Invalid archive: {}')
 INVALID_BASE_64 = ErrorCodeAndMessage(95, 'Invalid base64: {}')
 EXECUTION_IDENTIFIER_MUST_NOT_BE_SET = ErrorCodeAndMessage(
     100,
@@ -101,4 +101,22 @@ CORRUPTED_EXECUTION = ErrorCodeAndMessage(
 )
 UNSUPPORTED_DESCRIPTOR_TYPE = ErrorCodeAndMessage(
     165, "The descriptor type '{}' is not supported.")
+CHECKSUM_ON_DIR = ErrorCodeAndMessage(
+    170, "Invalid input: cannot generate checksum from directory")
+INVALID_CONTENT_RANGE = ErrorCodeAndMessage(
+    175, "Invalid Content-Range header: '{}'")
+UPLOAD_OFFSET_MISMATCH = ErrorCodeAndMessage(
+    180, "Invalid chunk: the upload must resume at byte {}.")
+INCOMPLETE_CHUNK = ErrorCodeAndMessage(
+    185, "Invalid chunk: {} bytes were received instead of {}.")
+CHUNK_CHECKSUM_MISMATCH = ErrorCodeAndMessage(
+    190, "Invalid chunk: its md5 does not match the Content-MD5 header.")
+UNSAFE_ARCHIVE_MEMBER = ErrorCodeAndMessage(
+    195, "Invalid archive: '{}' would be extracted outside of its directory.")
+ARCHIVE_LIMIT_EXCEEDED = ErrorCodeAndMessage(
+    200, "Invalid archive: it contains more than {} {}.")
+EXECUTION_BATCH_TOO_LARGE = ErrorCodeAndMessage(
+    205, "An execution batch cannot contain more than {} executions.")
+TOO_MANY_STREAMS = ErrorCodeAndMessage(
+    210, "Too many streams are open. Please try again later.")
 PAGE_NOT_FOUND = ErrorCodeAndMessage(404, "Page Not Found")
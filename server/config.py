@@ -13,6 +13,52 @@ class Config(object):
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     DATA_DIRECTORY = os.environ.get('DATA_DIRECTORY')
     PIPELINE_DIRECTORY = os.environ.get('PIPELINE_DIRECTORY')
+    MAX_CONCURRENT_EXECUTIONS = int(
+        os.environ.get('MAX_CONCURRENT_EXECUTIONS') or os.cpu_count() or 1)
+    PIPELINE_EXPORT_WORKERS = int(
+        os.environ.get('PIPELINE_EXPORT_WORKERS') or os.cpu_count() or 1)
+    PIPELINE_WATCH_INTERVAL = float(
+        os.environ.get('PIPELINE_WATCH_INTERVAL') or 5)
+    PRECOMPUTED_CHECKSUMS = (os.environ.get('PRECOMPUTED_CHECKSUMS')
+                             or 'md5').split(',')
+    CHECKSUM_WORKERS = int(os.environ.get('CHECKSUM_WORKERS') or 2)
+    MAX_ARCHIVE_ENTRIES = int(os.environ.get('MAX_ARCHIVE_ENTRIES') or 100000)
+    MAX_ARCHIVE_SIZE = int(
+        os.environ.get('MAX_ARCHIVE_SIZE') or 100 * 1024 * 1024 * 1024)
+    UPLOAD_SESSION_TTL = float(
+        os.environ.get('UPLOAD_SESSION_TTL') or 24 * 60 * 60)
+    ARCHIVE_EXTRACTION_WORKERS = int(
+        os.environ.get('ARCHIVE_EXTRACTION_WORKERS') or 2)
+    PATH_SIZE_INDEX_SIZE = int(
+        os.environ.get('PATH_SIZE_INDEX_SIZE') or 100000)
+    API_KEY_CACHE_SIZE = int(os.environ.get('API_KEY_CACHE_SIZE') or 1024)
+    API_KEY_CACHE_TTL = float(os.environ.get('API_KEY_CACHE_TTL') or 60)
+    API_KEY_CACHE_STATS_INTERVAL = float(
+        os.environ.get('API_KEY_CACHE_STATS_INTERVAL') or 60 * 60)
+    STD_FOLLOW_INTERVAL = float(os.environ.get('STD_FOLLOW_INTERVAL') or 1)
+    EXECUTION_EVENTS_BUFFER_SIZE = int(
+        os.environ.get('EXECUTION_EVENTS_BUFFER_SIZE') or 10000)
+    EXECUTION_EVENTS_POLL_INTERVAL = float(
+        os.environ.get('EXECUTION_EVENTS_POLL_INTERVAL') or 1)
+    EXECUTION_EVENTS_MAX_TIMEOUT = int(
+        os.environ.get('EXECUTION_EVENTS_MAX_TIMEOUT') or 60)
+    EXECUTION_INITIALIZATION_WORKERS = int(
+        os.environ.get('EXECUTION_INITIALIZATION_WORKERS') or 2)
+    MAX_EXECUTION_BATCH_SIZE = int(
+        os.environ.get('MAX_EXECUTION_BATCH_SIZE') or 10000)
+    DESCRIPTOR_CACHE_SIZE = int(os.environ.get('DESCRIPTOR_CACHE_SIZE') or 256)
+    WORKERS = int(os.environ.get('WORKERS') or os.cpu_count() or 1)
+    THREADS = int(os.environ.get('THREADS') or 4)
+    GRACEFUL_TIMEOUT = int(os.environ.get('GRACEFUL_TIMEOUT') or 30)
+    # Streams leave at least one thread of each worker to the other requests
+    MAX_STREAMS_PER_WORKER = int(
+        os.environ.get('MAX_STREAMS_PER_WORKER') or max(THREADS - 1, 1))
+    STREAM_MAX_DURATION = float(
+        os.environ.get('STREAM_MAX_DURATION') or 300)
+    EXECUTION_QUEUE_POLL_INTERVAL = float(
+        os.environ.get('EXECUTION_QUEUE_POLL_INTERVAL') or 1)
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', '').lower() in ('1',
+                                                                    'true')
 
 
 class ProductionConfig(Config):
@@ -7,4 +7,6 @@ def init_db(database):
     from server.database.models.user import User
     from server.database.models.execution import Execution
     from server.database.models.execution_process import ExecutionProcess
+    from server.database.models.checksum import Checksum
+    from server.database.models.execution_event import ExecutionEvent
     database.create_all()
@@ -0,0 +1,141 @@
+"""Migrations bring an existing database up to date with the models.
+`create_all` only creates the missing tables, so changes to existing tables
+must be applied here. Migrations run once per server start, from the start
+up of the main process, and every migration must be safe to run on an up to
+date database.
+"""
+import os
+import json
+from sqlalchemy import JSON, Enum, Table, inspect, select
+from sqlalchemy.schema import CreateTable
+
+
+def migrate(database):
+    from server.database.models.execution import Execution
+    add_missing_enum_values(database, Execution.__table__)
+    add_missing_columns(database, Execution.__table__)
+    add_missing_indexes(database, Execution.__table__)
+    backfill_execution_input_values(database)
+
+
+def add_missing_columns(database, table: Table):
+    """Adds the columns of `table` that are missing from the database. Added
+    columns must be nullable, as existing rows get NULL values."""
+    existing_columns = [
+        column["name"]
+        for column in inspect(database.engine).get_columns(table.name)
+    ]
+    with database.engine.begin() as connection:
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            connection.execute('ALTER TABLE "{}" ADD COLUMN "{}" {}'.format(
+                table.name, column.name,
+                column.type.compile(dialect=database.engine.dialect)))
+
+
+def add_missing_indexes(database, table: Table):
+    """Creates the indexes of `table` that are missing from the database."""
+    existing_indexes = [
+        index["name"]
+        for index in inspect(database.engine).get_indexes(table.name)
+    ]
+    for index in table.indexes:
+        if index.name not in existing_indexes:
+            index.create(database.engine)
+
+
+def backfill_execution_input_values(database):
+    """Copies the input values of the executions created before they were
+    stored in the database from their `inputs.json` file. Executions whose
+    file cannot be read, such as when the data directory is not mounted, are
+    left for a later start-up. Executions whose file is missing or invalid
+    never get their input values: they are set to a JSON null, which is read
+    back as None but is not scanned again."""
+    from server.database.models.execution import Execution
+    from server.resources.helpers.pathnames import (
+        INPUTS_FILENAME, EXECUTIONS_DIRNAME, CARMIN_FILES_FOLDER)
+    data_directory = database.get_app().config.get('DATA_DIRECTORY')
+    if not data_directory or not os.path.isdir(data_directory):
+        return
+
+    table = Execution.__table__
+    with database.engine.begin() as connection:
+        executions = connection.execute(
+            select([table.c.identifier, table.c.creator_username
+                    ]).where(table.c.input_values.is_(None))).fetchall()
+        for identifier, username in executions:
+            inputs_path = os.path.join(data_directory, username,
+                                       EXECUTIONS_DIRNAME, identifier,
+                                       CARMIN_FILES_FOLDER, INPUTS_FILENAME)
+            try:
+                with open(inputs_path) as inputs_file:
+                    input_values = json.load(inputs_file)
+            except (FileNotFoundError, ValueError):
+                input_values = JSON.NULL
+            except OSError:
+                continue
+            connection.execute(table.update().where(
+                table.c.identifier == identifier).values(
+                    input_values=input_values))
+
+
+def add_missing_enum_values(database, table: Table):
+    """Allows the values added to the Enum columns of `table` to be stored.
+    Postgres stores enums as native types, while SQLite validates them
+    through a CHECK constraint."""
+    enum_types = [
+        column.type for column in table.columns
+        if isinstance(column.type, Enum)
+    ]
+    dialect = database.engine.dialect.name
+
+    if dialect == 'postgresql':
+        # ALTER TYPE ... ADD VALUE cannot run inside a transaction block
+        connection = database.engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT")
+        with connection:
+            for enum_type in enum_types:
+                for value in enum_type.enums:
+                    connection.execute(
+                        "ALTER TYPE {} ADD VALUE IF NOT EXISTS '{}'".format(
+                            enum_type.name, value))
+    elif dialect == 'sqlite':
+        table_sql = database.engine.execute(
+            "SELECT sql FROM sqlite_master WHERE type='table' AND name=?",
+            table.name).scalar()
+        if not table_sql or 'CHECK' not in table_sql:
+            return
+        missing_values = [
+            value for enum_type in enum_types for value in enum_type.enums
+            if "'{}'".format(value) not in table_sql
+        ]
+        if missing_values:
+            rebuild_sqlite_table(database, table)
+
+
+def rebuild_sqlite_table(database, table: Table):
+    """SQLite cannot alter constraints. The table is created again from its
+    model, following https://www.sqlite.org/lang_altertable.html"""
+    new_table_name = "_{}_new".format(table.name)
+    create_table_sql = str(CreateTable(table).compile(database.engine))
+    create_table_sql = create_table_sql.replace(
+        "CREATE TABLE {} ".format(table.name),
+        'CREATE TABLE "{}" '.format(new_table_name), 1)
+
+    with database.engine.begin() as connection:
+        existing_columns = [
+            row[1] for row in connection.execute('PRAGMA table_info("{}")'.
+                                                 format(table.name))
+        ]
+        columns = ", ".join('"{}"'.format(column.name)
+                            for column in table.columns
+                            if column.name in existing_columns)
+        connection.execute(create_table_sql)
+        connection.execute('INSERT INTO "{0}" ({2}) SELECT {2} FROM "{1}"'.
+                           format(new_table_name, table.name, columns))
+        connection.execute('DROP TABLE "{}"'.format(table.name))
+        connection.execute('ALTER TABLE "{}" RENAME TO "{}"'.format(
+            new_table_name, table.name))
+        for index in table.indexes:
+            index.create(connection)
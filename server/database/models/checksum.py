@@ -0,0 +1,32 @@
+from sqlalchemy import Column, String, BigInteger
+from server.database import db
+
+
+class Checksum(db.Model):
+    """Checksum of a file of the data directory. The checksum is only valid
+    for the version of the file described by its size, modification time and
+    inode.
+
+    Args:
+        path (str):
+        algorithm (str):
+        size (int):
+        mtime_ns (int):
+        inode (int):
+        value (str):
+
+    Attributes:
+        path (str):
+        algorithm (str):
+        size (int):
+        mtime_ns (int):
+        inode (int):
+        value (str):
+    """
+
+    path = Column(String, primary_key=True)
+    algorithm = Column(String, primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    mtime_ns = Column(BigInteger, nullable=False)
+    inode = Column(BigInteger, nullable=False)
+    value = Column(String, nullable=False)
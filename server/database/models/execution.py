@@ -2,7 +2,8 @@ import enum
 import uuid
 import time
 from flask_restful import fields
-from sqlalchemy import Column, String, Enum, Integer, BigInteger, ForeignKey
+from sqlalchemy import (Column, String, Enum, Integer, BigInteger, Boolean,
+                        ForeignKey, JSON, Index)
 from server.database import db
 from server.resources.models.execution import ExecutionStatus
 
@@ -22,6 +23,7 @@ class Execution(db.Model):
         name (str):
         pipeline_identifier (str):
         descriptor (str):
+        input_values (dict):
         timeout (int):
         status (ExecutionStatus):
         study_identifier (str):
@@ -35,6 +37,7 @@ class Execution(db.Model):
         name (str):
         pipeline_identifier (str):
         descriptor (str):
+        input_values (dict):
         timeout (int):
         status (ExecutionStatus):
         study_identifier (str):
@@ -48,6 +51,7 @@ class Execution(db.Model):
     name = Column(String, nullable=False)
     pipeline_identifier = Column(String, nullable=False)
     descriptor = Column(String, nullable=False)
+    input_values = Column(JSON)
     timeout = Column(Integer)
     status = Column(Enum(ExecutionStatus), nullable=False)
     study_identifier = Column(String)
@@ -58,3 +62,16 @@ class Execution(db.Model):
         String, ForeignKey("user.username"), nullable=False)
     created_at = Column(BigInteger, default=current_milli_time)
     last_update = Column(BigInteger, onupdate=current_milli_time)
+    # Root URL of the request which created the execution, against which its
+    # input paths are resolved during its initialization
+    url_root = Column(String)
+    # Whether the execution is queued once initialized
+    play_when_ready = Column(Boolean)
+
+    __table_args__ = (
+        # Executions are listed per user, from the most recent one. The
+        # identifier orders executions created at the same time.
+        Index('ix_execution_creator_username_created_at', 'creator_username',
+              'created_at', 'identifier'),
+        Index('ix_execution_status', 'status'),
+    )
@@ -0,0 +1,39 @@
+from sqlalchemy import Column, String, Integer, BigInteger, Enum, Index
+from server.database import db
+from server.resources.models.execution import ExecutionStatus
+
+
+class ExecutionEvent(db.Model):
+    """ExecutionEvent is a published change of an execution. Its identifier
+    is given by the database, so that every server process numbers the
+    events the same way.
+
+    Args:
+        execution_identifier (str):
+        status (ExecutionStatus):
+        start_date (int):
+        end_date (int):
+        creator_username (str):
+
+    Attributes:
+        event_id (int):
+        execution_identifier (str):
+        status (ExecutionStatus):
+        start_date (int):
+        end_date (int):
+        creator_username (str):
+    """
+
+    event_id = Column(Integer, primary_key=True, autoincrement=True)
+    execution_identifier = Column(String, nullable=False)
+    status = Column(Enum(ExecutionStatus), nullable=False)
+    start_date = Column(BigInteger)
+    end_date = Column(BigInteger)
+    creator_username = Column(String, nullable=False)
+
+    __table_args__ = (
+        Index('ix_execution_event_execution_identifier',
+              'execution_identifier'),
+        Index('ix_execution_event_creator_username_event_id',
+              'creator_username', 'event_id'),
+    )
@@ -0,0 +1,25 @@
+import os
+from server.database.models.checksum import Checksum
+
+
+def get_checksum(path: str, algorithm: str, file_stat: os.stat_result,
+                 db_session) -> Checksum:
+    """Returns the checksum of the file at `path` if it was computed for the
+    version of the file described by `file_stat`."""
+    return db_session.query(Checksum).filter_by(
+        path=path,
+        algorithm=algorithm,
+        size=file_stat.st_size,
+        mtime_ns=file_stat.st_mtime_ns,
+        inode=file_stat.st_ino).first()
+
+
+def delete_checksums(path: str, db_session):
+    """Deletes the checksums of `path` and of all the files it contains."""
+    escaped_path = path.replace('\\', '\\\\').replace('%', '\\%').replace(
+        '_', '\\_')
+    db_session.query(Checksum).filter(
+        (Checksum.path == path)
+        | Checksum.path.like(escaped_path + os.sep + '%', escape='\\')).delete(
+            synchronize_session=False)
+    db_session.commit()
@@ -0,0 +1,38 @@
+from typing import Dict, List
+from sqlalchemy import func
+from server.database.models.execution_event import ExecutionEvent
+
+
+def get_last_event_id(db_session) -> int:
+    return db_session.query(func.max(ExecutionEvent.event_id)).scalar() or 0
+
+
+def get_events_after(event_id: int, username: str,
+                     db_session) -> List[ExecutionEvent]:
+    return db_session.query(ExecutionEvent).filter(
+        ExecutionEvent.creator_username == username,
+        ExecutionEvent.event_id > event_id).order_by(
+            ExecutionEvent.event_id).all()
+
+
+def get_last_published_states(execution_identifiers: List[str],
+                              db_session,
+                              chunk_size: int = 500) -> Dict[str, tuple]:
+    """Returns the (status, start date, end date) of the last event of each
+    execution, querying them by chunks of `chunk_size` identifiers."""
+    states = {}
+    for start in range(0, len(execution_identifiers), chunk_size):
+        events = db_session.query(
+            ExecutionEvent.execution_identifier, ExecutionEvent.status,
+            ExecutionEvent.start_date, ExecutionEvent.end_date).filter(
+                ExecutionEvent.execution_identifier.in_(
+                    execution_identifiers[start:start + chunk_size])).order_by(
+                        ExecutionEvent.event_id)
+        for identifier, status, start_date, end_date in events:
+            states[identifier] = (status, start_date, end_date)
+    return states
+
+
+def delete_events_until(event_id: int, db_session):
+    db_session.query(ExecutionEvent).filter(
+        ExecutionEvent.event_id <= event_id).delete(synchronize_session=False)
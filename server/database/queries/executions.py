@@ -1,23 +1,67 @@
-from typing import List
-from server.database.models.execution import Execution
+from typing import List, Tuple
+from sqlalchemy import and_, or_, func
+from server.database.models.execution import Execution, ExecutionStatus
 from server.database.models.execution_process import ExecutionProcess
 
 
-def get_all_executions_for_user(username: str, limit: int, offset: int,
-                                db_session) -> List[Execution]:
+def get_all_executions_for_user(username: str,
+                                limit: int,
+                                offset: int,
+                                db_session,
+                                after: Tuple[int, str] = None
+                                ) -> List[Execution]:
+    """Returns the executions of `username`, from the most recent one. With
+    `after`, the (created_at, identifier) of an execution, only the
+    executions that follow it are returned: unlike `offset`, the database
+    does not go through the previous executions."""
+    query = db_session.query(Execution).filter(
+        Execution.creator_username == username)
+    if after:
+        created_at, identifier = after
+        query = query.filter(
+            or_(Execution.created_at < created_at,
+                and_(Execution.created_at == created_at,
+                     Execution.identifier < identifier)))
     return list(
-        db_session.query(Execution).filter(
-            Execution.creator_username == username).order_by(
-                Execution.created_at.desc()).offset(offset).limit(limit))
+        query.order_by(Execution.created_at.desc(),
+                       Execution.identifier.desc()).offset(offset).limit(
+                           limit))
 
 
 def get_execution(identifier: str, db_session) -> Execution:
     return db_session.query(Execution).filter_by(identifier=identifier).first()
 
 
+def get_executions(identifiers: List[str], db_session,
+                   chunk_size: int = 500) -> List[Execution]:
+    """Returns the executions with the given identifiers, querying them by
+    chunks of `chunk_size` identifiers."""
+    executions = []
+    for start in range(0, len(identifiers), chunk_size):
+        executions.extend(
+            db_session.query(Execution).filter(
+                Execution.identifier.in_(identifiers[start:start +
+                                                     chunk_size])))
+    return executions
+
+
+def get_queued_executions(db_session) -> List[Execution]:
+    return list(
+        db_session.query(Execution).filter(
+            Execution.status == ExecutionStatus.Queued).order_by(
+                Execution.last_update))
+
+
+def get_initializing_executions(db_session) -> List[Execution]:
+    return list(
+        db_session.query(Execution).filter(
+            Execution.status == ExecutionStatus.Initializing).order_by(
+                Execution.created_at))
+
+
 def get_execution_count_for_user(username: str, db_session) -> int:
-    return db_session.query(Execution).filter(
-        Execution.creator_username == username).count()
+    return db_session.query(func.count(Execution.identifier)).filter(
+        Execution.creator_username == username).scalar()
 
 
 def get_execution_processes(execution_identifier: str,
@@ -50,6 +50,11 @@ LOGGING_CONFIG = {
             'level': 'WARNING',
             'propagate': False,
             'handlers': ['unexpected-crash']
+        },
+        'server-startup': {
+            'level': 'INFO',
+            'propagate': False,
+            'handlers': ['console']
         }
     }
 }
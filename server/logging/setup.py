@@ -35,7 +35,7 @@ def log_response(response):
 
     if user_error or server_error:
         request_content = request.get_json()
-        if request_content and request_content.get('password'):
+        if isinstance(request_content, dict) and request_content.get('password'):
             request_content['password'] = '[password]'
 
         if user_error:
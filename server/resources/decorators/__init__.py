@@ -7,7 +7,8 @@ from server.common.error_codes_and_messages import (
     ErrorCodeAndMessageMarshaller, ErrorCodeAndMessageAdditionalDetails,
     ErrorCodeAndMessageFormatter, INVALID_MODEL_PROVIDED, MODEL_DUMPING_ERROR,
     MISSING_API_KEY, INVALID_API_KEY, UNAUTHORIZED, UNEXPECTED_ERROR)
-from server.database.models.user import User, Role
+from server.database.models.user import Role
+from server.resources.helpers.api_keys import API_KEY_CACHE
 
 
 def unmarshal_request(schema, allow_none: bool = False, partial=False):
@@ -78,7 +79,7 @@ def login_required(func):
         if (apiKey is None):
             return ErrorCodeAndMessageMarshaller(MISSING_API_KEY), 401
 
-        user = db.session.query(User).filter_by(api_key=apiKey).first()
+        user = API_KEY_CACHE.get_user(apiKey, db.session)
 
         if not user:
             return ErrorCodeAndMessageMarshaller(INVALID_API_KEY), 401
@@ -96,7 +97,7 @@ def admin_only(func):
         if (apiKey is None):
             return ErrorCodeAndMessageMarshaller(MISSING_API_KEY), 401
 
-        user = db.session.query(User).filter_by(api_key=apiKey).first()
+        user = API_KEY_CACHE.get_user(apiKey, db.session)
 
         if not user:
             return ErrorCodeAndMessageMarshaller(INVALID_API_KEY), 401
@@ -10,6 +10,8 @@ from server.resources.models.execution import ExecutionSchema, EXECUTION_COMPLET
 from server.resources.helpers.executions import (
     get_execution_as_model, get_execution_dir, delete_execution_directory)
 from server.resources.helpers.execution_kill import kill_all_execution_processes
+from server.resources.helpers.execution_play import cancel_queued_execution
+from server.resources.helpers.execution_events import EXECUTION_EVENTS
 from server.resources.decorators import (login_required, marshal_response,
                                          unmarshal_request)
 
@@ -61,6 +63,12 @@ class Execution(Resource):
         deleteFiles = request.args.get(
             'deleteFiles', default=False, type=inputs.boolean)
 
+        # A queued execution has no processes yet and is simply dequeued
+        if (execution_db.status == ExecutionStatus.Queued
+                and cancel_queued_execution(execution_identifier,
+                                            db.session) and not deleteFiles):
+            return
+
         # Get all the execution running processes
         execution_processes = get_execution_processes(execution_identifier,
                                                       db.session)
@@ -83,6 +91,7 @@ class Execution(Resource):
             execution_db.status = ExecutionStatus.Killed
             execution_db.end_date = current_milli_time()
         db.session.commit()
+        EXECUTION_EVENTS.publish(execution_db)
 
         # Free all resources associated with the execution if delete files is True
         if deleteFiles:
@@ -0,0 +1,82 @@
+import json
+from flask import Response, stream_with_context
+from flask_restful import Resource, request
+from server import app
+from server.resources.decorators import login_required, marshal_response
+from server.resources.helpers.executions import query_converter
+from server.resources.helpers.execution_events import EXECUTION_EVENTS
+from server.resources.helpers.streams import STREAM_SLOTS, too_many_streams
+from server.resources.models.execution_event import ExecutionEventSchema
+
+# Comment lines keep idle event streams from being closed by proxies
+KEEP_ALIVE_INTERVAL = 15
+# Milliseconds after which clients reconnect to a closed event stream
+RECONNECTION_DELAY = 1000
+
+
+class ExecutionEvents(Resource):
+    """Status changes of the executions of the user.
+
+    By default, the request waits up to `timeout` seconds (25 by default) for
+    the events following the event `after` (0 by default), and returns them
+    as a list. Clients send the `eventId` of the last event they received as
+    `after` in their next request. Waiting requests hold a server thread as
+    streams do, and are refused with a 503 response when too many are open.
+
+    Clients accepting `text/event-stream` get a Server-Sent Events stream
+    instead, which starts after the `Last-Event-ID` header or the `after`
+    parameter, and starts with the upcoming events otherwise. The stream is
+    closed after `STREAM_MAX_DURATION` seconds: `EventSource` clients
+    reconnect with the `Last-Event-ID` header on their own.
+    """
+
+    @login_required
+    def get(self, user):
+        after = request.args.get('after', type=query_converter)
+        if request.accept_mimetypes.best == 'text/event-stream':
+            last_event_id = request.headers.get(
+                'Last-Event-ID', type=query_converter)
+            if last_event_id is not None:
+                after = last_event_id
+            if after is None:
+                after = EXECUTION_EVENTS.last_event_id
+            stream = STREAM_SLOTS.open_stream()
+            if not stream:
+                return too_many_streams()
+            response = Response(
+                stream_with_context(
+                    stream_events(user.username, after, stream)),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache'})
+            response.call_on_close(stream.close)
+            return response
+        stream = STREAM_SLOTS.open_stream()
+        if not stream:
+            return too_many_streams()
+        try:
+            return self.get_events(user, after or 0, stream)
+        finally:
+            stream.close()
+
+    @marshal_response(ExecutionEventSchema(many=True))
+    def get_events(self, user, after: int, stream):
+        timeout = request.args.get('timeout', type=query_converter)
+        if timeout is None:
+            timeout = 25
+        timeout = min(timeout, app.config['EXECUTION_EVENTS_MAX_TIMEOUT'],
+                      stream.remaining())
+        return EXECUTION_EVENTS.wait(user.username, after, timeout)
+
+
+def stream_events(username: str, after: int, stream):
+    schema = ExecutionEventSchema()
+    yield "retry: {}\n\n".format(RECONNECTION_DELAY)
+    while stream.is_open():
+        events = EXECUTION_EVENTS.wait(
+            username, after, min(KEEP_ALIVE_INTERVAL, stream.remaining()))
+        if not events:
+            yield ": keep-alive\n\n"
+        for event in events:
+            after = event.event_id
+            yield "id: {}\nevent: status\ndata: {}\n\n".format(
+                event.event_id, json.dumps(schema.dump(event).data))
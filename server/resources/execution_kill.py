@@ -6,8 +6,11 @@ from server.common.error_codes_and_messages import (
 from server.database import db
 from server.database.queries.executions import get_execution, get_execution_processes
 from server.database.models.execution import Execution, ExecutionStatus, current_milli_time
+from server.database.models.user import Role
 from server.resources.decorators import login_required, marshal_response
 from server.resources.helpers.execution_kill import kill_all_execution_processes
+from server.resources.helpers.execution_play import cancel_queued_execution
+from server.resources.helpers.execution_events import EXECUTION_EVENTS
 
 
 class ExecutionKill(Resource):
@@ -21,6 +24,12 @@ class ExecutionKill(Resource):
         if user.role != Role.admin and execution_db.creator_username != user.username:
             return UNAUTHORIZED
 
+        # A queued execution has no processes yet and is simply dequeued
+        if (execution_db.status == ExecutionStatus.Queued
+                and cancel_queued_execution(execution_identifier,
+                                            db.session)):
+            return
+
         if execution_db.status != ExecutionStatus.Running:
             return ErrorCodeAndMessageFormatter(
                 CANNOT_KILL_NOT_RUNNING_EXECUTION, execution_db.status.name)
@@ -40,3 +49,4 @@ class ExecutionKill(Resource):
         for execution_process in execution_processes:
             db.session.delete(execution_process)
         db.session.commit()
+        EXECUTION_EVENTS.publish(execution_db)
@@ -1,4 +1,5 @@
 import os
+import logging
 from flask_restful import Resource, request
 from jsonschema import ValidationError
 from server.database import db
@@ -26,7 +27,8 @@ class ExecutionPlay(Resource):
         if execution_db.creator_username != user.username:
             return UNAUTHORIZED
 
-        if execution_db.status != ExecutionStatus.Initializing:
+        # Executions can only be played once their invocation was validated
+        if execution_db.status != ExecutionStatus.Ready:
             return ErrorCodeAndMessageFormatter(CANNOT_REPLAY_EXECUTION,
                                                 execution_db.status.name)
 
@@ -59,5 +61,5 @@ class ExecutionPlay(Resource):
                 descriptor_path))
             return UNEXPECTED_ERROR
 
-        # The execution is valid and we are now ready to start it
-        start_execution(user, execution, descriptor, modified_inputs_path)
+        # The execution is valid and we are now ready to queue it
+        start_execution(execution_db)
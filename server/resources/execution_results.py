@@ -7,7 +7,7 @@ from server.resources.models.execution import EXECUTION_COMPLETED_STATUSES
 from server.resources.decorators import login_required, marshal_response
 from server.common.error_codes_and_messages import (
     ErrorCodeAndMessageFormatter, EXECUTION_NOT_FOUND, UNAUTHORIZED,
-    CANNOT_GET_RESULT_NOT_COMPLETED_EXECUTION)
+    CANNOT_GET_RESULT_NOT_COMPLETED_EXECUTION, CORRUPTED_EXECUTION)
 from server.resources.helpers.execution_results import get_output_files
 from server.resources.helpers.executions import is_safe_for_get
 from server.resources.models.path import PathSchema
@@ -4,14 +4,17 @@ from sqlalchemy.exc import IntegrityError
 from server.database import db
 from server.database.models.execution import Execution, ExecutionStatus
 from server.platform_properties import PLATFORM_PROPERTIES
-from server.common.error_codes_and_messages import UNEXPECTED_ERROR, INVOCATION_INITIALIZATION_FAILED
+from server.common.error_codes_and_messages import (
+    ErrorCodeAndMessageFormatter, UNEXPECTED_ERROR, UNSUPPORTED_DESCRIPTOR_TYPE)
 from server.resources.helpers.pipelines import (
     get_original_descriptor_path_and_type)
 from server.resources.helpers.executions import (
-    write_inputs_to_file, create_execution_directory, get_execution_as_model,
-    validate_request_model, delete_execution_directory,
-    copy_descriptor_to_execution_dir, create_absolute_path_inputs,
-    query_converter)
+    create_execution_directory, get_execution_as_model, validate_request_model,
+    query_converter, parse_execution_fields, parse_execution_cursor)
+from server.resources.helpers.path_sizes import PATH_SIZE_INDEX
+from server.resources.helpers.execution_events import EXECUTION_EVENTS
+from server.resources.helpers.execution_initialization import (
+    EXECUTION_INITIALIZER)
 from server.database.queries.executions import (get_all_executions_for_user,
                                                 get_execution)
 from .models.execution import ExecutionSchema
@@ -27,10 +30,19 @@ class Executions(Resource):
         limit = request.args.get(
             'limit', type=query_converter) or PLATFORM_PROPERTIES.get(
                 'defaultLimitListExecutions')
-        user_executions = get_all_executions_for_user(user.username, limit,
-                                                      offset, db.session)
+        fields, error = parse_execution_fields(
+            request.args.get('fields', type=str))
+        if error:
+            return error
+        after, error = parse_execution_cursor(
+            request.args.get('after', type=str), user.username, db.session)
+        if error:
+            return error
+        user_executions = get_all_executions_for_user(
+            user.username, limit, offset, db.session, after=after)
         for i, execution in enumerate(user_executions):
-            exe, error = get_execution_as_model(user.username, execution)
+            exe, error = get_execution_as_model(user.username, execution,
+                                                fields)
             if error:
                 return error
             user_executions[i] = exe
@@ -53,17 +65,30 @@ class Executions(Resource):
             if error:
                 return error
 
+            # Get appriopriate descriptor object
+            if not Descriptor.descriptor_factory_from_type(descriptor_type):
+                # We don't have any descriptor defined for this pipeline type
+                logger = logging.getLogger('server-error')
+                logger.error(
+                    "Unsupported descriptor type extracted from file at {}".
+                    format(descriptor_path))
+                return ErrorCodeAndMessageFormatter(
+                    UNSUPPORTED_DESCRIPTOR_TYPE, descriptor_type)
+
             # Insert new execution to DB
             new_execution = Execution(
                 name=model.name,
                 pipeline_identifier=model.pipeline_identifier,
                 descriptor=descriptor_type,
+                input_values=model.input_values,
                 timeout=model.timeout,
                 status=ExecutionStatus.Initializing,
                 study_identifier=model.study_identifier,
-                creator_username=user.username)
+                creator_username=user.username,
+                url_root=request.url_root)
             db.session.add(new_execution)
             db.session.commit()
+            EXECUTION_EVENTS.publish(new_execution)
 
             # Execution directory creation
             (execution_path,
@@ -72,55 +97,13 @@ class Executions(Resource):
             if error:
                 db.session.rollback()
                 return error
+            PATH_SIZE_INDEX.invalidate(execution_path)
 
-            # Writing inputs to inputs file in execution directory
-            error = write_inputs_to_file(model, carmin_files_path)
-            if error:
-                delete_execution_directory(execution_path)
-                db.session.rollback()
-                return error
-
-            # Copying pipeline descriptor to execution folder
-            error = copy_descriptor_to_execution_dir(carmin_files_path,
-                                                     descriptor_path)
-            if error:
-                delete_execution_directory(execution_path)
-                db.session.rollback()
-                return UNEXPECTED_ERROR
-
-            # Get appriopriate descriptor object
-            descriptor = Descriptor.descriptor_factory_from_type(
-                new_execution.descriptor)
-            if not descriptor:
-                delete_execution_directory(execution_path)
-                db.session.rollback()
-                # We don't have any descriptor defined for this pipeline type
-                logger = logging.getLogger('server-error')
-                logger.error(
-                    "Unsupported descriptor type extracted from file at {}".
-                    format(descriptor_path))
-                return ErrorCodeAndMessageFormatter(
-                    UNSUPPORTED_DESCRIPTOR_TYPE, descriptor_type)
-
-            # Create a version of the inputs file with correct links
-            modified_inputs_path, error = create_absolute_path_inputs(
-                user.username, new_execution.identifier,
-                new_execution.pipeline_identifier, request.url_root)
-            if error:
-                delete_execution_directory(execution_path)
-                db.session.rollback()
-                return UNEXPECTED_ERROR
-
-            # We now validate the invocation
-            success, error = descriptor.validate(descriptor_path,
-                                                 modified_inputs_path)
-            if not success:  # If this fails, we will change the execution status to InitializationFailed and return this error
-                new_execution.status = ExecutionStatus.InitializationFailed
-                db.session.commit()
-                error_code_and_message = ErrorCodeAndMessageFormatter(
-                    INVOCATION_INITIALIZATION_FAILED, new_execution.identifier)
-                return ErrorCodeAndMessageAdditionalDetails(
-                    error_code_and_message, str(error))
+            # The inputs are written and the invocation is validated in the
+            # background: the execution becomes 'Ready' or
+            # 'InitializationFailed'
+            EXECUTION_INITIALIZER.submit(new_execution.identifier,
+                                         descriptor_path)
 
             # Get execution from DB (for safe measure)
             execution_db = get_execution(new_execution.identifier, db.session)
@@ -0,0 +1,154 @@
+from flask_restful import Resource, request
+from sqlalchemy.exc import IntegrityError
+from server import app
+from server.database import db
+from server.database.models.execution import (Execution, ExecutionStatus,
+                                              execution_uuid)
+from server.database.queries.executions import get_executions
+from server.common.error_codes_and_messages import (
+    ErrorCodeAndMessageFormatter, ErrorCodeAndMessageAdditionalDetails,
+    INVALID_MODEL_PROVIDED, UNEXPECTED_ERROR, UNSUPPORTED_DESCRIPTOR_TYPE,
+    EXECUTION_BATCH_TOO_LARGE)
+from server.resources.helpers.pipelines import (
+    get_original_descriptor_path_and_type)
+from server.resources.helpers.executions import (
+    create_execution_directory, get_execution_as_model,
+    validate_request_models)
+from server.resources.helpers.path_sizes import PATH_SIZE_INDEX
+from server.resources.helpers.execution_events import EXECUTION_EVENTS
+from server.resources.helpers.execution_initialization import (
+    EXECUTION_INITIALIZER)
+from .models.execution import ExecutionSchema
+from .models.execution_batch import (ExecutionBatchResult,
+                                     ExecutionBatchResultSchema)
+from .decorators import marshal_response, login_required
+from server.resources.models.descriptor.descriptor_abstract import Descriptor
+
+
+class ExecutionsBatch(Resource):
+    """Creates the executions of an array at once. Pipelines and input files
+    shared by several executions are only checked once, and the executions are
+    inserted in a single transaction. Each execution gets its own result, in
+    the order of the array. With `play=true`, the executions are queued once
+    they are initialized."""
+
+    @login_required
+    @marshal_response(ExecutionBatchResultSchema(many=True))
+    def post(self, user):
+        body = request.get_json(force=True, silent=True)
+        if not body or not isinstance(body, list):
+            return INVALID_MODEL_PROVIDED
+        max_batch_size = app.config['MAX_EXECUTION_BATCH_SIZE']
+        if len(body) > max_batch_size:
+            return ErrorCodeAndMessageFormatter(EXECUTION_BATCH_TOO_LARGE,
+                                                max_batch_size)
+        play = request.args.get(
+            'play', default='', type=str).lower() in ('1', 'true')
+
+        results = [ExecutionBatchResult() for _ in body]
+        models = []
+        for index, item in enumerate(body):
+            model, errors = ExecutionSchema().load(item)
+            if errors:
+                results[index].error = ErrorCodeAndMessageAdditionalDetails(
+                    INVALID_MODEL_PROVIDED, errors)
+            else:
+                models.append((index, model))
+
+        # Insert the valid executions to DB
+        descriptors = {}
+        new_executions = []
+        validation_errors = validate_request_models(
+            [model for _, model in models], request.url_root)
+        for (index, model), error in zip(models, validation_errors):
+            if error:
+                results[index].error = error
+                continue
+            if model.pipeline_identifier not in descriptors:
+                descriptors[model.pipeline_identifier] = get_descriptor(
+                    model.pipeline_identifier)
+            (descriptor_path,
+             descriptor_type), error = descriptors[model.pipeline_identifier]
+            if error:
+                results[index].error = error
+                continue
+            execution = Execution(
+                identifier=execution_uuid(),
+                name=model.name,
+                pipeline_identifier=model.pipeline_identifier,
+                descriptor=descriptor_type,
+                input_values=model.input_values,
+                timeout=model.timeout,
+                status=ExecutionStatus.Initializing,
+                study_identifier=model.study_identifier,
+                creator_username=user.username,
+                url_root=request.url_root,
+                play_when_ready=play)
+            new_executions.append((index, descriptor_path, execution))
+        if not new_executions:
+            return results
+
+        # Read before the commit expires the attributes of the executions
+        identifiers = [
+            execution.identifier for _, _, execution in new_executions
+        ]
+        try:
+            db.session.add_all(
+                [execution for _, _, execution in new_executions])
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return UNEXPECTED_ERROR
+        # Load the committed executions back at once, rather than one by one
+        # when their expired attributes are read
+        executions_db = {
+            execution_db.identifier: execution_db
+            for execution_db in get_executions(identifiers, db.session)
+        }
+        new_executions = [(index, descriptor_path, executions_db[identifier])
+                          for (index, descriptor_path, _), identifier in zip(
+                              new_executions, identifiers)]
+
+        # Execution directories creation
+        created_executions = []
+        for index, descriptor_path, execution in new_executions:
+            (execution_path, _), error = create_execution_directory(
+                execution, user)
+            if error:
+                results[index].error = error
+                db.session.delete(execution)
+                continue
+            PATH_SIZE_INDEX.invalidate(execution_path)
+            created_executions.append((index, descriptor_path, execution))
+        if len(created_executions) < len(new_executions):
+            db.session.commit()
+        EXECUTION_EVENTS.publish_all(
+            [execution for _, _, execution in created_executions])
+
+        identifiers = []
+        for _, descriptor_path, execution in created_executions:
+            identifiers.append(execution.identifier)
+            EXECUTION_INITIALIZER.submit(execution.identifier, descriptor_path)
+
+        # Get executions back as models from the DB for response
+        executions_db = {
+            execution_db.identifier: execution_db
+            for execution_db in get_executions(identifiers, db.session)
+        }
+        for index, _, execution in created_executions:
+            results[index].execution, error = get_execution_as_model(
+                user.username, executions_db.get(execution.identifier))
+            if error:
+                results[index].error = UNEXPECTED_ERROR
+        return results
+
+
+def get_descriptor(pipeline_identifier: str):
+    (descriptor_path,
+     descriptor_type), error = get_original_descriptor_path_and_type(
+         pipeline_identifier)
+    if not error and not Descriptor.descriptor_factory_from_type(
+            descriptor_type):
+        error = ErrorCodeAndMessageFormatter(UNSUPPORTED_DESCRIPTOR_TYPE,
+                                             descriptor_type)
+    return (descriptor_path, descriptor_type), error
@@ -0,0 +1,95 @@
+"""The API key cache keeps the users of recently used API keys, so that
+authenticating a request does not require a database query each time.
+
+Entries expire after `API_KEY_CACHE_TTL` seconds, and the least recently used
+ones are dropped once the cache holds `API_KEY_CACHE_SIZE` users. The cache is
+invalidated when the credentials of a user change. Each server process has its
+own cache: the TTL bounds how long another process may keep a stale user.
+
+The hit and miss counts of the cache are logged every
+`API_KEY_CACHE_STATS_INTERVAL` seconds, by each process, with the requests.
+"""
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict, namedtuple
+from server import app
+from server.database.models.user import User
+
+# Lightweight copy of a User, which can be used outside of the database
+# session it was loaded in
+AuthenticatedUser = namedtuple("AuthenticatedUser",
+                               ["username", "role", "api_key"])
+
+
+class ApiKeyCache():
+    def __init__(self):
+        self._lock = threading.Lock()
+        # API key: (expiration time, AuthenticatedUser)
+        self._users = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._next_stats_time = time.monotonic()
+
+    def get_user(self, api_key: str, db_session) -> AuthenticatedUser:
+        """Returns the user of `api_key`, or None if the key is invalid.
+        Invalid keys are not cached, so that a new key is valid at once."""
+        now = time.monotonic()
+        self._log_stats(now)
+        with self._lock:
+            cached = self._users.get(api_key)
+            if cached and cached[0] > now:
+                self._users.move_to_end(api_key)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        user = db_session.query(User).filter_by(api_key=api_key).first()
+        if not user:
+            return None
+        authenticated_user = AuthenticatedUser(
+            username=user.username, role=user.role, api_key=user.api_key)
+
+        with self._lock:
+            self._users[api_key] = (now + app.config['API_KEY_CACHE_TTL'],
+                                    authenticated_user)
+            self._users.move_to_end(api_key)
+            while len(self._users) > app.config['API_KEY_CACHE_SIZE']:
+                self._users.popitem(last=False)
+        return authenticated_user
+
+    def invalidate_user(self, username: str):
+        """Forgets the API keys of `username`."""
+        with self._lock:
+            for api_key, (_, user) in list(self._users.items()):
+                if user.username == username:
+                    del self._users[api_key]
+
+    def stats(self) -> str:
+        lookups = self.hits + self.misses
+        return ("API key cache of process {}: {} users, {} hits, {} misses "
+                "({:.1%} hit rate)").format(
+                    os.getpid(), len(self._users), self.hits, self.misses,
+                    self.hits / lookups if lookups else 0)
+
+    def _log_stats(self, now: float):
+        with self._lock:
+            if now < self._next_stats_time:
+                return
+            self._next_stats_time = (
+                now + app.config['API_KEY_CACHE_STATS_INTERVAL'])
+            if not self.hits + self.misses:
+                return
+        logger = logging.getLogger('request-response')
+        logger.info(self.stats())
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+            self.hits = 0
+            self.misses = 0
+            self._next_stats_time = time.monotonic()
+
+
+API_KEY_CACHE = ApiKeyCache()
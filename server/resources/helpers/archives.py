@@ -0,0 +1,333 @@
+"""Archives are used to download and upload directories in a single request.
+
+Downloaded archives are generated while they are sent: nothing is written to
+disk, and only one chunk of a file is held in memory at a time, so the first
+bytes are sent right away whatever the size of the directory.
+
+Uploaded archives are extracted entry by entry, without extracting the whole
+archive at once. Zip, tar, and compressed tar archives are supported; tar.zst
+archives require the `zstandard` package.
+"""
+import os
+import stat
+import shutil
+import tarfile
+import zipfile
+import zlib
+from typing import Iterator, Tuple
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+from server.common.error_codes_and_messages import (
+    ErrorCodeAndMessageFormatter, NOT_AN_ARCHIVE, UNSAFE_ARCHIVE_MEMBER,
+    ARCHIVE_LIMIT_EXCEEDED)
+from server.resources.models.error_code_and_message import ErrorCodeAndMessage
+from server.resources.helpers.descriptor_store import is_descriptor_store
+
+CHUNK_SIZE = 1024 * 1024
+
+TAR_FORMAT = "tar"
+ZIP_FORMAT = "zip"
+ZSTD_TAR_FORMAT = "tar.zst"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+ARCHIVE_FORMATS = [TAR_FORMAT, ZIP_FORMAT]
+DEFAULT_COMPRESSION_LEVEL = 6
+
+
+def archive_filename(data_path: str, archive_format: str,
+                     compression_level: int) -> str:
+    filename = os.path.basename(data_path)
+    if archive_format == ZIP_FORMAT:
+        return filename + ".zip"
+    if compression_level:
+        return filename + ".tar.gz"
+    return filename + ".tar"
+
+
+def archive_mimetype(archive_format: str, compression_level: int) -> str:
+    if archive_format == ZIP_FORMAT:
+        return "application/zip"
+    if compression_level:
+        return "application/gzip"
+    return "application/x-tar"
+
+
+def stream_archive(data_path: str, archive_format: str,
+                   compression_level: int) -> Iterator[bytes]:
+    if archive_format == ZIP_FORMAT:
+        return stream_zip(data_path, compression_level)
+    return stream_tar(data_path, compression_level)
+
+
+def archive_members(data_path: str) -> Iterator[Tuple[str, str]]:
+    """Yields the path and archive name of `data_path` and everything it
+    contains. Archive names start with the basename of `data_path`.
+    Symbolic links to directories are not followed."""
+    root_dir = os.path.dirname(os.path.abspath(data_path))
+    yield data_path, os.path.relpath(data_path, root_dir)
+    for subdir, dirs, files in os.walk(data_path):
+        dirs[:] = sorted(
+            name for name in dirs
+            if not is_descriptor_store(os.path.join(subdir, name)))
+        for name in dirs + sorted(files):
+            path = os.path.join(subdir, name)
+            yield path, os.path.relpath(path, root_dir)
+
+
+def stream_tar(data_path: str, compression_level: int) -> Iterator[bytes]:
+    """Yields a tar archive of `data_path`, gzipped unless
+    `compression_level` is 0."""
+    compressor = None
+    if compression_level:
+        # 16 + MAX_WBITS writes a gzip header and trailer
+        compressor = zlib.compressobj(compression_level, zlib.DEFLATED,
+                                      16 + zlib.MAX_WBITS)
+
+    for block in tar_blocks(data_path):
+        if compressor:
+            block = compressor.compress(block)
+        if block:
+            yield block
+    if compressor:
+        yield compressor.flush()
+
+
+def tar_blocks(data_path: str) -> Iterator[bytes]:
+    length = 0
+    for path, arcname in archive_members(data_path):
+        try:
+            file_stat = os.lstat(path)
+            tar_info = tarfile.TarInfo(arcname)
+            tar_info.mode = stat.S_IMODE(file_stat.st_mode)
+            tar_info.mtime = file_stat.st_mtime
+            data_file = None
+            if stat.S_ISLNK(file_stat.st_mode):
+                tar_info.type = tarfile.SYMTYPE
+                tar_info.linkname = os.readlink(path)
+            elif stat.S_ISDIR(file_stat.st_mode):
+                tar_info.type = tarfile.DIRTYPE
+            elif stat.S_ISREG(file_stat.st_mode):
+                tar_info.size = file_stat.st_size
+                data_file = open(path, 'rb')
+            else:
+                continue
+        except OSError:
+            # The file was removed or cannot be read: it is left out
+            continue
+
+        header = tar_info.tobuf(tarfile.PAX_FORMAT, "utf-8",
+                                "surrogateescape")
+        length += len(header)
+        yield header
+        if data_file:
+            with data_file:
+                for chunk in read_exactly(data_file, tar_info.size):
+                    length += len(chunk)
+                    yield chunk
+            padding = -tar_info.size % tarfile.BLOCKSIZE
+            length += padding
+            yield tarfile.NUL * padding
+
+    # The archive ends with two empty blocks, padded to a full record
+    end_of_archive = 2 * tarfile.BLOCKSIZE
+    end_of_archive += -(length + end_of_archive) % tarfile.RECORDSIZE
+    yield tarfile.NUL * end_of_archive
+
+
+def read_exactly(data_file, size: int) -> Iterator[bytes]:
+    """Yields `size` bytes of `data_file`. A file that shrank since its size
+    was written to the archive is padded with null bytes."""
+    remaining = size
+    while remaining > 0:
+        chunk = data_file.read(min(CHUNK_SIZE, remaining))
+        if not chunk:
+            chunk = tarfile.NUL * min(CHUNK_SIZE, remaining)
+        remaining -= len(chunk)
+        yield chunk
+
+
+class StreamWriter():
+    """StreamWriter is a write-only, unseekable file, which keeps what is
+    written to it until it is read with `pop()`."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(data_path: str, compression_level: int) -> Iterator[bytes]:
+    """Yields a zip archive of `data_path`. Files are deflated at the default
+    level, or stored when `compression_level` is 0. Symbolic links are left
+    out, since zip archives cannot represent them portably."""
+    return (chunk for chunk in zip_chunks(data_path, compression_level)
+            if chunk)
+
+
+def zip_chunks(data_path: str, compression_level: int) -> Iterator[bytes]:
+    compression = zipfile.ZIP_DEFLATED if compression_level else zipfile.ZIP_STORED
+    writer = StreamWriter()
+    # Without a seekable output, zipfile writes the sizes and checksum of each
+    # file after its data
+    with zipfile.ZipFile(writer, mode='w', compression=compression) as archive:
+        for path, arcname in archive_members(data_path):
+            if os.path.islink(path):
+                continue
+            try:
+                zip_info = zipfile.ZipInfo.from_file(path, arcname)
+                data_file = None
+                if not zip_info.is_dir():
+                    data_file = open(path, 'rb')
+            except OSError:
+                continue
+
+            zip_info.compress_type = compression
+            if data_file is None:
+                archive.writestr(zip_info, b"")
+                yield writer.pop()
+                continue
+
+            with data_file, archive.open(zip_info, mode='w') as archive_file:
+                for chunk in read_exactly(data_file, zip_info.file_size):
+                    archive_file.write(chunk)
+                    yield writer.pop()
+            yield writer.pop()
+    yield writer.pop()
+
+
+class ArchiveError(Exception):
+    def __init__(self, error: ErrorCodeAndMessage):
+        super().__init__(error.error_message)
+        self.error = error
+
+
+def detect_archive_format(archive_path: str) -> str:
+    """Returns ZIP_FORMAT, TAR_FORMAT or ZSTD_TAR_FORMAT from the first bytes
+    of the archive, or None if it is not a supported archive. Tar archives
+    may be compressed with gzip, bzip2 or xz."""
+    with open(archive_path, 'rb') as archive:
+        header = archive.read(tarfile.BLOCKSIZE)
+    if header[:4] in (b"PK\x03\x04", b"PK\x05\x06"):
+        return ZIP_FORMAT
+    if header[:4] == ZSTD_MAGIC:
+        return ZSTD_TAR_FORMAT
+    if header[:2] == b"\x1f\x8b" or header[:3] == b"BZh" or header[:6] == (
+            b"\xfd7zXZ\x00") or header[257:262] == b"ustar":
+        return TAR_FORMAT
+    return None
+
+
+def extract_archive(archive_path: str, destination: str, max_entries: int,
+                    max_size: int, is_safe_path) -> ErrorCodeAndMessage:
+    """Extracts the archive at `archive_path` in the `destination` directory.
+
+    Only directories and regular files are extracted. Extraction stops with
+    an error if the archive contains more than `max_entries` entries or more
+    than `max_size` bytes once extracted, or a member that would be
+    extracted outside of `destination` or for which `is_safe_path` fails.
+    """
+    archive_format = detect_archive_format(archive_path)
+    if not archive_format:
+        return ErrorCodeAndMessageFormatter(NOT_AN_ARCHIVE,
+                                            "unsupported archive format")
+    if archive_format == ZSTD_TAR_FORMAT and not zstandard:
+        return ErrorCodeAndMessageFormatter(
+            NOT_AN_ARCHIVE, "tar.zst archives require 'zstandard'")
+
+    destination = os.path.abspath(destination)
+    entries = 0
+    remaining_size = max_size
+    try:
+        for name, data_file in archive_entries(archive_path, archive_format):
+            entries += 1
+            if entries > max_entries:
+                raise ArchiveError(
+                    ErrorCodeAndMessageFormatter(ARCHIVE_LIMIT_EXCEEDED,
+                                                 max_entries, "entries"))
+
+            target = os.path.normpath(os.path.join(destination, name))
+            if target == destination and data_file is None:
+                # The root entry of archives such as `tar -C dir .`
+                continue
+            if (not target.startswith(destination + os.sep)
+                    or not is_safe_path(target)):
+                raise ArchiveError(
+                    ErrorCodeAndMessageFormatter(UNSAFE_ARCHIVE_MEMBER,
+                                                 name))
+
+            if data_file is None:
+                os.makedirs(target, exist_ok=True)
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                for chunk in iter(lambda: data_file.read(CHUNK_SIZE), b""):
+                    remaining_size -= len(chunk)
+                    if remaining_size < 0:
+                        raise ArchiveError(
+                            ErrorCodeAndMessageFormatter(
+                                ARCHIVE_LIMIT_EXCEEDED, max_size, "bytes"))
+                    f.write(chunk)
+    except ArchiveError as e:
+        return e.error
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, zlib.error) as e:
+        return ErrorCodeAndMessageFormatter(NOT_AN_ARCHIVE, e)
+    return None
+
+
+def archive_entries(archive_path: str,
+                    archive_format: str) -> Iterator[Tuple[str, object]]:
+    """Yields the name and data of the directories and regular files of an
+    archive, one at a time. Data is None for directories."""
+    with open(archive_path, 'rb') as archive_file:
+        if archive_format == ZIP_FORMAT:
+            with zipfile.ZipFile(archive_file) as archive:
+                for zip_info in archive.infolist():
+                    if stat.S_ISLNK(zip_info.external_attr >> 16):
+                        continue
+                    if zip_info.is_dir():
+                        yield zip_info.filename, None
+                        continue
+                    with archive.open(zip_info) as data_file:
+                        yield zip_info.filename, data_file
+            return
+
+        stream = archive_file
+        if archive_format == ZSTD_TAR_FORMAT:
+            stream = zstandard.ZstdDecompressor().stream_reader(archive_file)
+        # The archive is read as a stream: members are extracted in order,
+        # without seeking back
+        with tarfile.open(fileobj=stream, mode='r|*') as archive:
+            for tar_info in archive:
+                if tar_info.isdir():
+                    yield tar_info.name, None
+                elif tar_info.isreg():
+                    yield tar_info.name, archive.extractfile(tar_info)
+
+
+def merge_directory(source: str, destination: str):
+    """Moves the content of `source` into `destination`, replacing the files
+    that already exist, then removes `source`."""
+    if not os.path.isdir(destination):
+        os.replace(source, destination)
+        return
+    for name in os.listdir(source):
+        source_path = os.path.join(source, name)
+        destination_path = os.path.join(destination, name)
+        if os.path.isdir(source_path) and os.path.isdir(destination_path):
+            merge_directory(source_path, destination_path)
+        else:
+            if os.path.isdir(destination_path):
+                shutil.rmtree(destination_path)
+            os.replace(source_path, destination_path)
+    shutil.rmtree(source, ignore_errors=True)
@@ -0,0 +1,163 @@
+"""Checksums of the files of the data directory are stored in the database, so
+that a file is only read again once it changed.
+
+A stored checksum is valid as long as the size, modification time and inode
+of its file are unchanged. The checksums of uploaded files are computed in the
+background, as clients usually verify them right after the transfer. The
+checksums of execution results are computed along with their manifest (see
+`execution_results.py`).
+"""
+import os
+import hashlib
+import logging
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+from sqlalchemy.exc import IntegrityError
+from server import app
+from server.database import db
+from server.database.models.checksum import Checksum
+from server.database.queries.checksums import get_checksum
+
+READ_BUFFER_SIZE = 1024 * 1024
+
+HASH_FACTORIES = {"md5": hashlib.md5, "sha256": hashlib.sha256}
+if xxhash:
+    HASH_FACTORIES["xxhash"] = xxhash.xxh64
+
+CHECKSUM_ALGORITHMS = list(HASH_FACTORIES)
+
+
+def compute_checksums(path: str, algorithms: List[str]) -> Dict[str, str]:
+    """Computes the checksums of the file at `path` for every algorithm, in a
+    single read of the file."""
+    hashes = {
+        algorithm: HASH_FACTORIES[algorithm]()
+        for algorithm in algorithms
+    }
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(READ_BUFFER_SIZE), b""):
+            for file_hash in hashes.values():
+                file_hash.update(chunk)
+    return {
+        algorithm: file_hash.hexdigest()
+        for algorithm, file_hash in hashes.items()
+    }
+
+
+def get_file_checksum(path: str, algorithm: str) -> str:
+    """Returns the checksum of the file at `path`, computing it only if it is
+    not stored for the current version of the file."""
+    return get_file_checksums(path, [algorithm])[algorithm]
+
+
+def get_file_checksums(path: str, algorithms: List[str]) -> Dict[str, str]:
+    """Returns the checksums of the file at `path` for every algorithm,
+    computing the ones that are not stored in a single read of the file."""
+    path = os.path.realpath(path)
+    file_stat = os.stat(path)
+    checksums = {}
+    for algorithm in algorithms:
+        checksum = get_checksum(path, algorithm, file_stat, db.session)
+        if checksum:
+            checksums[algorithm] = checksum.value
+    missing_algorithms = [a for a in algorithms if a not in checksums]
+    if missing_algorithms:
+        checksums.update(store_checksums(path, missing_algorithms))
+    return checksums
+
+
+def get_precomputed_algorithms() -> List[str]:
+    return [
+        algorithm for algorithm in app.config['PRECOMPUTED_CHECKSUMS']
+        if algorithm in HASH_FACTORIES
+    ]
+
+
+def store_checksums(path: str, algorithms: List[str]) -> Dict[str, str]:
+    path = os.path.realpath(path)
+    file_stat = os.stat(path)
+    checksums = compute_checksums(path, algorithms)
+
+    # The file changed while it was read: its checksums are not stored
+    if os.stat(path).st_mtime_ns != file_stat.st_mtime_ns:
+        return checksums
+
+    for algorithm, value in checksums.items():
+        db.session.merge(
+            Checksum(
+                path=path,
+                algorithm=algorithm,
+                size=file_stat.st_size,
+                mtime_ns=file_stat.st_mtime_ns,
+                inode=file_stat.st_ino,
+                value=value))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # The checksums were stored by another request in the meantime
+        db.session.rollback()
+    return checksums
+
+
+class ChecksumPrecomputer():
+    """ChecksumPrecomputer computes the checksums of files in a background
+    thread pool of `CHECKSUM_WORKERS` threads, for the algorithms listed in
+    `PRECOMPUTED_CHECKSUMS`."""
+
+    def __init__(self):
+        self._executor = None
+
+    def submit(self, paths: List[str]):
+        algorithms = get_precomputed_algorithms()
+        if not paths or not algorithms:
+            return
+
+        if app.config["TESTING"]:
+            precompute_checksums(paths, algorithms)
+            return
+
+        if not self._executor:
+            self._executor = ThreadPoolExecutor(
+                max_workers=app.config['CHECKSUM_WORKERS'])
+        self._executor.submit(run_precompute_checksums, paths, algorithms)
+
+
+CHECKSUM_PRECOMPUTER = ChecksumPrecomputer()
+
+
+def precompute_checksums_in_background(path: str):
+    """Computes in the background the checksums of the file at `path`, or of
+    all the files it contains if it is a directory."""
+    if os.path.isdir(path):
+        paths = [
+            os.path.join(subdir, f) for subdir, _, files in os.walk(path)
+            for f in files
+        ]
+    else:
+        paths = [path]
+    CHECKSUM_PRECOMPUTER.submit(paths)
+
+
+def run_precompute_checksums(paths: List[str], algorithms: List[str]):
+    with app.app_context():
+        try:
+            precompute_checksums(paths, algorithms)
+        except Exception:
+            logger = logging.getLogger('server-error')
+            logger.error(traceback.format_exc())
+        finally:
+            db.session.remove()
+
+
+def precompute_checksums(paths: List[str], algorithms: List[str]):
+    for path in paths:
+        try:
+            get_file_checksums(path, algorithms)
+        except OSError:
+            # The file was removed in the meantime
+            continue
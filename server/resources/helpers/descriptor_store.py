@@ -0,0 +1,139 @@
+"""The descriptor store keeps a single copy of each descriptor used by the
+executions, in `DATA_DIRECTORY/.carmin-descriptors`, named after the SHA-256
+hash of its content. Stored descriptors are read-only and never modified.
+
+The `.carmin-files` folder of an execution references its descriptor with a
+hard link to the stored copy, or with a reflink (a copy-on-write clone) when
+hard links are not supported, so that the descriptor data is not duplicated.
+When neither is supported, the hash of the descriptor is written instead, and
+`get_descriptor_path` resolves it to the stored copy.
+
+Since linked descriptors share their data with the stored copy, files of the
+data directory must be replaced rather than written in place. The store is
+kept in the data directory so that hard links to it can be made, but it is
+left out of directory listings, sizes and archives.
+"""
+import os
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+import uuid
+import stat
+import shutil
+import threading
+from server import app
+from server.resources.helpers.pipelines import get_file_hash
+from server.resources.helpers.pathnames import (DESCRIPTOR_STORE_DIRNAME,
+                                                DESCRIPTOR_FILENAME,
+                                                DESCRIPTOR_HASH_FILENAME)
+
+# Linux ioctl cloning a file into another one (btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+
+class DescriptorStore():
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Descriptor path: (modification time, size, hash), so that unchanged
+        # descriptors are not hashed again
+        self._hashes = {}
+
+    def store(self, descriptor_path: str) -> (str, str):
+        """Adds a descriptor to the store, unless its content is already
+        stored. Returns the stored path and the hash of the descriptor."""
+        descriptor_hash = self.get_hash(descriptor_path)
+        stored_path = get_stored_descriptor_path(descriptor_hash)
+        if os.path.isfile(stored_path):
+            return stored_path, descriptor_hash
+
+        store_directory = os.path.dirname(stored_path)
+        os.makedirs(store_directory, exist_ok=True)
+        temp_path = os.path.join(store_directory, ".{}.{}.tmp".format(
+            descriptor_hash, uuid.uuid4().hex))
+        try:
+            shutil.copyfile(descriptor_path, temp_path)
+            # The descriptor may have changed since it was hashed
+            descriptor_hash = get_file_hash(temp_path)
+            stored_path = get_stored_descriptor_path(descriptor_hash)
+            os.chmod(temp_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            os.replace(temp_path, stored_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return stored_path, descriptor_hash
+
+    def get_hash(self, descriptor_path: str) -> str:
+        descriptor_path = os.path.realpath(descriptor_path)
+        descriptor_stat = os.stat(descriptor_path)
+        key = (descriptor_stat.st_mtime_ns, descriptor_stat.st_size)
+        with self._lock:
+            cached = self._hashes.get(descriptor_path)
+        if cached and cached[:2] == key:
+            return cached[2]
+
+        descriptor_hash = get_file_hash(descriptor_path)
+        with self._lock:
+            self._hashes[descriptor_path] = key + (descriptor_hash, )
+        return descriptor_hash
+
+    def link(self, descriptor_path: str, carmin_files_path: str):
+        """References the stored copy of a descriptor in the `.carmin-files`
+        folder of an execution. Raises an OSError on failure."""
+        stored_path, descriptor_hash = self.store(descriptor_path)
+        link_path = os.path.join(carmin_files_path, DESCRIPTOR_FILENAME)
+        # The reference of an interrupted initialization is replaced
+        for path in [
+                link_path,
+                os.path.join(carmin_files_path, DESCRIPTOR_HASH_FILENAME)
+        ]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        try:
+            os.link(stored_path, link_path)
+            return
+        except OSError:
+            pass
+        try:
+            reflink(stored_path, link_path)
+            return
+        except OSError:
+            pass
+        with open(os.path.join(carmin_files_path, DESCRIPTOR_HASH_FILENAME),
+                  'w') as hash_file:
+            hash_file.write(descriptor_hash)
+
+
+DESCRIPTOR_STORE = DescriptorStore()
+
+
+def get_descriptor_store_directory() -> str:
+    return os.path.join(app.config['DATA_DIRECTORY'], DESCRIPTOR_STORE_DIRNAME)
+
+
+def get_stored_descriptor_path(descriptor_hash: str) -> str:
+    return os.path.join(get_descriptor_store_directory(),
+                        "{}.json".format(descriptor_hash))
+
+
+def is_descriptor_store(path: str) -> bool:
+    return (os.path.basename(path) == DESCRIPTOR_STORE_DIRNAME
+            and os.path.abspath(path) == os.path.abspath(
+                get_descriptor_store_directory()))
+
+
+def reflink(source: str, destination: str):
+    """Clones `source` to `destination`, sharing their data blocks. Raises an
+    OSError if the file system does not support it."""
+    if not fcntl:
+        raise OSError("Reflinks are not supported on this platform.")
+    with open(source, 'rb') as source_file, open(destination,
+                                                 'xb') as destination_file:
+        try:
+            fcntl.ioctl(destination_file.fileno(), FICLONE,
+                        source_file.fileno())
+        except OSError:
+            os.remove(destination)
+            raise
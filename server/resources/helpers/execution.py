@@ -35,3 +35,12 @@ def extract_execution_identifier_from_path(
             return split_path[actual_execution_folder_index]
     except ValueError:
         return None
+
+
+def is_executions_directory(absolute_path_to_resource: str) -> bool:
+    """Returns True for the directory containing the executions of a user."""
+    rel_path = PurePath(
+        os.path.relpath(absolute_path_to_resource,
+                        app.config['DATA_DIRECTORY'])).as_posix()
+    split_path = os.path.normpath(rel_path).split(os.sep)
+    return len(split_path) == 2 and split_path[1] == EXECUTIONS_DIRNAME
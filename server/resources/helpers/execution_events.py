@@ -0,0 +1,149 @@
+"""The execution event bus lets clients wait for the status changes of their
+executions, instead of polling each of them.
+
+Every change of the status, start date or end date of an execution is
+published as an `ExecutionEvent`, stored in the database. Events are numbered
+by the database, so that an event identifier received from a server process
+can be used as the cursor of a request served by any other one. The last
+`EXECUTION_EVENTS_BUFFER_SIZE` events are kept, so that clients can ask for
+the events that followed the last one they received.
+
+Changes are published right after they are committed, by the server process
+that makes them, which wakes its waiting clients up at once. The clients of
+the other processes are woken up by a watcher thread, started when a client
+first waits for events, which looks for new events every
+`EXECUTION_EVENTS_POLL_INTERVAL` seconds.
+"""
+import time
+import logging
+import threading
+import traceback
+from typing import List
+from server import app
+from server.database import db
+from server.database.models.execution import Execution as ExecutionDB
+from server.database.models.execution_event import (ExecutionEvent as
+                                                    ExecutionEventDB)
+from server.database.queries.executions import get_execution
+from server.database.queries.execution_events import (
+    get_last_event_id, get_events_after, get_last_published_states,
+    delete_events_until)
+from server.resources.models.execution_event import ExecutionEvent
+
+
+class ExecutionEventBus():
+    def __init__(self):
+        self._condition = threading.Condition()
+        # Identifier of the last event known by this process
+        self._last_event_id = 0
+        self._watcher = None
+
+    @property
+    def last_event_id(self) -> int:
+        return get_last_event_id(db.session)
+
+    def publish(self, execution_db: ExecutionDB):
+        """Publishes the current state of `execution_db`, unless it was
+        already published."""
+        self.publish_all([execution_db])
+
+    def publish_all(self, executions_db: List[ExecutionDB]):
+        executions_db = [e for e in executions_db if e]
+        if not executions_db:
+            return
+        states = get_last_published_states(
+            [execution_db.identifier for execution_db in executions_db],
+            db.session)
+        events = []
+        for execution_db in executions_db:
+            state = (execution_db.status, execution_db.start_date,
+                     execution_db.end_date)
+            if states.get(execution_db.identifier) == state:
+                continue
+            states[execution_db.identifier] = state
+            events.append(
+                ExecutionEventDB(
+                    execution_identifier=execution_db.identifier,
+                    status=execution_db.status,
+                    start_date=execution_db.start_date,
+                    end_date=execution_db.end_date,
+                    creator_username=execution_db.creator_username))
+        if not events:
+            return
+
+        db.session.add_all(events)
+        db.session.flush()
+        last_event_id = events[-1].event_id
+        delete_events_until(
+            last_event_id - app.config['EXECUTION_EVENTS_BUFFER_SIZE'],
+            db.session)
+        db.session.commit()
+        self._notify(last_event_id)
+
+    def wait(self, username: str, after: int,
+             timeout: float) -> List[ExecutionEvent]:
+        """Returns the events of the executions of `username` published after
+        the event `after`, waiting up to `timeout` seconds for one."""
+        self._start_watcher()
+        deadline = time.monotonic() + timeout
+        while True:
+            known_event_id = self._last_event_id
+            events = [
+                to_event_model(event)
+                for event in get_events_after(after, username, db.session)
+            ]
+            remaining = deadline - time.monotonic()
+            if events or remaining <= 0:
+                return events
+            # Release the connection of the session while waiting
+            db.session.commit()
+            # Events of other users wake every client up as well
+            with self._condition:
+                if self._last_event_id == known_event_id:
+                    self._condition.wait(remaining)
+
+    def _notify(self, event_id: int):
+        with self._condition:
+            if event_id > self._last_event_id:
+                self._last_event_id = event_id
+                self._condition.notify_all()
+
+    def _start_watcher(self):
+        if app.config["TESTING"] or self._watcher:
+            return
+        with self._condition:
+            if self._watcher:
+                return
+            self._watcher = threading.Thread(
+                target=self._watch, name="execution-events", daemon=True)
+            self._watcher.start()
+
+    def _watch(self):
+        with app.app_context():
+            while True:
+                try:
+                    self._notify(get_last_event_id(db.session))
+                except Exception:
+                    logger = logging.getLogger('server-error')
+                    logger.error(traceback.format_exc())
+                finally:
+                    db.session.remove()
+                time.sleep(app.config['EXECUTION_EVENTS_POLL_INTERVAL'])
+
+
+EXECUTION_EVENTS = ExecutionEventBus()
+
+
+def publish_execution_event(execution_identifier: str, db_session):
+    """Publishes the state of an execution, after a change was committed."""
+    EXECUTION_EVENTS.publish(get_execution(execution_identifier, db_session))
+
+
+def to_event_model(event_db: ExecutionEventDB) -> ExecutionEvent:
+    return ExecutionEvent(
+        event_id=event_db.event_id,
+        identifier=event_db.execution_identifier,
+        status=event_db.status,
+        start_date=event_db.start_date,
+        end_date=event_db.end_date,
+        creator_username=event_db.creator_username)
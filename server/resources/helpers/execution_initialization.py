@@ -0,0 +1,222 @@
+"""Executions are initialized in a background thread pool of
+`EXECUTION_INITIALIZATION_WORKERS` threads, so that creating an execution does
+not hold a request thread while its invocation is validated.
+
+`POST /executions` returns the new execution with the 'Initializing' status.
+Its inputs and descriptor are then written to its `.carmin-files` folder and
+its invocation is validated, which moves it to 'Ready', or to
+'InitializationFailed' with the reason written to its standard error.
+Executions submitted with `play` are then queued as soon as they are 'Ready'.
+
+Initializations are durable as the queue is: the 'Initializing' status, the
+root URL of the request and the `play` flag are stored with the execution,
+and the executions still 'Initializing' are submitted again when the server
+starts. When the server runs several processes, executions are initialized by
+the supervisor process (see `server.supervisor`), which polls them, so that
+reloading the workers does not drop initializations.
+"""
+import os
+import time
+import logging
+import threading
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from server import app
+from server.database import db
+from server.database.models.execution import (Execution as ExecutionDB,
+                                              ExecutionStatus)
+from server.database.queries.executions import (get_execution,
+                                                get_initializing_executions)
+from server.common.error_codes_and_messages import (
+    ErrorCodeAndMessageFormatter, INVOCATION_INITIALIZATION_FAILED)
+from server.resources.helpers.executions import (
+    write_inputs_to_file, link_descriptor_to_execution_dir,
+    create_absolute_path_inputs, get_execution_carmin_files_dir,
+    std_file_path, STDERR_FILENAME)
+from server.resources.helpers.pipelines import (
+    get_original_descriptor_path_and_type)
+from server.resources.helpers.path_sizes import PATH_SIZE_INDEX
+from server.resources.helpers.execution_events import publish_execution_event
+from server.resources.helpers.execution_play import start_execution
+from server.resources.models.descriptor.descriptor_abstract import Descriptor
+
+
+class ExecutionInitializer():
+    """The initializer of the processes which leave the initializations to
+    the supervisor process is `remote`."""
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        # Executions submitted to the pool, which are waiting or initializing
+        self._pending = set()
+        self.remote = False
+
+    def start(self, poll_interval: float = None):
+        """Submits the executions left initializing by a previous run of the
+        server. With `poll_interval`, the executions created by other
+        processes are polled."""
+        self._submit_initializing()
+        if poll_interval:
+            threading.Thread(
+                target=self._poll,
+                args=(poll_interval, ),
+                name="execution-initialization",
+                daemon=True).start()
+
+    def submit(self, execution_identifier: str,
+               descriptor_path: str = None) -> Future:
+        """Initializes an execution in the background. `descriptor_path` is
+        found from the pipeline of the execution if it is not given. Returns
+        None if the execution is left to another process, or was already
+        submitted."""
+        if self.remote:
+            return None
+        if app.config["TESTING"]:
+            future = Future()
+            future.set_result(
+                initialize_execution(execution_identifier, descriptor_path))
+            return future
+
+        with self._lock:
+            if execution_identifier in self._pending:
+                return None
+            self._pending.add(execution_identifier)
+            if not self._executor:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=app.config['EXECUTION_INITIALIZATION_WORKERS'])
+            executor = self._executor
+        future = executor.submit(run_initialize_execution,
+                                 execution_identifier, descriptor_path)
+        future.add_done_callback(
+            lambda _: self._discard(execution_identifier))
+        return future
+
+    def _discard(self, execution_identifier: str):
+        with self._lock:
+            self._pending.discard(execution_identifier)
+
+    def _submit_initializing(self):
+        identifiers = [
+            execution_db.identifier
+            for execution_db in get_initializing_executions(db.session)
+        ]
+        # Ends the transaction, so that the next poll sees the new executions
+        db.session.commit()
+        for identifier in identifiers:
+            self.submit(identifier)
+
+    def _poll(self, poll_interval: float):
+        with app.app_context():
+            while True:
+                time.sleep(poll_interval)
+                try:
+                    self._submit_initializing()
+                except Exception:
+                    db.session.rollback()
+                    logger = logging.getLogger('server-error')
+                    logger.error(traceback.format_exc())
+
+
+EXECUTION_INITIALIZER = ExecutionInitializer()
+
+
+def run_initialize_execution(execution_identifier: str,
+                             descriptor_path: str = None) -> ExecutionStatus:
+    with app.app_context():
+        try:
+            return initialize_execution(execution_identifier, descriptor_path)
+        except Exception:
+            db.session.rollback()
+            logger = logging.getLogger('server-error')
+            logger.error(traceback.format_exc())
+            return finish_initialization(execution_identifier,
+                                         ExecutionStatus.InitializationFailed)
+        finally:
+            db.session.remove()
+
+
+def initialize_execution(execution_identifier: str,
+                         descriptor_path: str = None) -> ExecutionStatus:
+    """Prepares the files of an execution and validates its invocation.
+    Returns the resulting status, or None if the execution was deleted or
+    initialized in the meantime."""
+    execution_db = get_execution(execution_identifier, db.session)
+    if not execution_db or execution_db.status != ExecutionStatus.Initializing:
+        return None
+    username = execution_db.creator_username
+
+    try:
+        carmin_files_path = get_execution_carmin_files_dir(
+            username, execution_identifier)
+    except FileNotFoundError:
+        return finish_initialization(execution_identifier,
+                                     ExecutionStatus.InitializationFailed)
+
+    error = None
+    if not descriptor_path:
+        (descriptor_path, _), error = get_original_descriptor_path_and_type(
+            execution_db.pipeline_identifier)
+    modified_inputs_path = None
+    if not error:
+        # Writing inputs to inputs file in execution directory, for bosh
+        error = write_inputs_to_file(execution_db, carmin_files_path)
+    if not error:
+        # Linking pipeline descriptor to execution folder
+        error = link_descriptor_to_execution_dir(carmin_files_path,
+                                                 descriptor_path)
+    if not error:
+        # Create a version of the inputs file with correct links
+        modified_inputs_path, error = create_absolute_path_inputs(
+            username, execution_identifier, execution_db.pipeline_identifier,
+            execution_db.input_values, execution_db.url_root)
+    PATH_SIZE_INDEX.invalidate(os.path.dirname(carmin_files_path))
+    if error:
+        return fail_initialization(execution_db, error.error_message)
+
+    descriptor = Descriptor.descriptor_factory_from_type(
+        execution_db.descriptor)
+    # The original descriptor is validated, so that its cached validator is
+    # used by every execution of the pipeline
+    success, validation_error = descriptor.validate(descriptor_path,
+                                                    modified_inputs_path)
+    if not success:
+        return fail_initialization(execution_db, str(validation_error))
+
+    status = finish_initialization(execution_identifier, ExecutionStatus.Ready)
+    if status == ExecutionStatus.Ready and execution_db.play_when_ready:
+        start_execution(get_execution(execution_identifier, db.session))
+    return status
+
+
+def fail_initialization(execution_db: ExecutionDB,
+                        reason: str) -> ExecutionStatus:
+    error = ErrorCodeAndMessageFormatter(INVOCATION_INITIALIZATION_FAILED,
+                                         execution_db.identifier)
+    try:
+        with open(
+                std_file_path(execution_db.creator_username,
+                              execution_db.identifier, STDERR_FILENAME),
+                'w') as file_stderr:
+            file_stderr.write("{}\n{}\n".format(error.error_message, reason))
+    except OSError:
+        pass
+    return finish_initialization(execution_db.identifier,
+                                 ExecutionStatus.InitializationFailed)
+
+
+def finish_initialization(execution_identifier: str,
+                          status: ExecutionStatus) -> ExecutionStatus:
+    """Writes the status of an initialized execution, unless it is not
+    initializing anymore."""
+    finished = db.session.query(ExecutionDB).filter_by(
+        identifier=execution_identifier,
+        status=ExecutionStatus.Initializing).update(
+            {
+                "status": status
+            }, synchronize_session='fetch')
+    db.session.commit()
+    if not finished:
+        return None
+    publish_execution_event(execution_identifier, db.session)
+    return status
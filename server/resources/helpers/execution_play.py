@@ -1,70 +1,231 @@
 import sys
 import os
-from subprocess import Popen, TimeoutExpired
-from multiprocessing import Pool, current_process
+import asyncio
+import logging
+import threading
+import traceback
 from server import app
 from server.platform_properties import PLATFORM_PROPERTIES
 from server.database import db
 from server.database.models.user import User
-from server.database.models.execution import ExecutionStatus, current_milli_time
+from server.database.models.execution import (
+    Execution as ExecutionDB, ExecutionStatus, current_milli_time)
 from server.database.models.execution_process import ExecutionProcess
-from server.database.queries.executions import get_execution
+from server.database.queries.executions import (get_execution,
+                                                get_queued_executions)
 from server.resources.models.execution import Execution
 from server.resources.helpers.path import get_user_data_directory
+from server.resources.helpers.path_sizes import PATH_SIZE_INDEX
 from server.resources.helpers.executions import (
-    get_execution_dir, get_descriptor_path, std_file_path, STDOUT_FILENAME,
-    STDERR_FILENAME)
+    get_execution_dir, get_descriptor_path, std_file_path,
+    get_execution_as_model, get_absolute_path_inputs_path,
+    get_running_marker_path, STDOUT_FILENAME, STDERR_FILENAME)
 from server.resources.helpers.execution_kill import kill_execution_processes
+from server.resources.helpers.execution_events import (
+    EXECUTION_EVENTS, publish_execution_event)
+from server.resources.helpers.execution_results import (
+    write_output_manifest, run_write_output_manifest)
 from server.resources.models.descriptor.descriptor_abstract import Descriptor
 
 
-def start_execution(user: User, execution: Execution, descriptor: Descriptor,
-                    inputs_path: str):
-    #  Launch the execution process
+class ExecutionSupervisor():
+    """ExecutionSupervisor runs the executions from a single asyncio event
+    loop, in a background thread of the server. The loop launches the
+    execution commands as subprocesses and waits for them without blocking,
+    so a running execution only costs a subprocess and a coroutine. At most
+    `MAX_CONCURRENT_EXECUTIONS` executions run at a time.
+
+    The queue is durable: pending executions are stored in the database with
+    the 'Queued' status, and the supervisor only holds their identifiers.
+    Queued executions are submitted again when the supervisor starts.
+
+    When the server runs several processes, the supervisor runs in a
+    dedicated one (see `server.wsgi`) and polls the queue. The supervisor of
+    the other processes is `remote`: it leaves the queued executions to the
+    dedicated process.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+        # Executions submitted to the loop, which are waiting or running
+        self._pending = set()
+        self.remote = False
+
+    def start(self, poll_interval: float = None):
+        """Starts the event loop and submits the executions left in the
+        queue by a previous run of the server. With `poll_interval`, the
+        queue is polled for the executions queued by other processes."""
+        self._start_loop()
+        for execution_db in get_queued_executions(db.session):
+            self.submit(execution_db.identifier)
+        if poll_interval:
+            asyncio.run_coroutine_threadsafe(
+                self._poll_queue(poll_interval), self._loop)
+
+    def submit(self, execution_identifier: str):
+        if self.remote:
+            return
+        self._start_loop()
+        asyncio.run_coroutine_threadsafe(
+            self._supervise(execution_identifier), self._loop)
+
+    async def _supervise(self, execution_identifier: str):
+        if execution_identifier in self._pending:
+            return
+        self._pending.add(execution_identifier)
+        try:
+            async with self._semaphore:
+                await run_execution(execution_identifier)
+        except Exception:
+            db.session.rollback()
+            logger = logging.getLogger('server-error')
+            logger.error(traceback.format_exc())
+        finally:
+            self._pending.discard(execution_identifier)
+
+    async def _poll_queue(self, poll_interval: float):
+        while True:
+            await asyncio.sleep(poll_interval)
+            try:
+                identifiers = [
+                    execution_db.identifier
+                    for execution_db in get_queued_executions(db.session)
+                ]
+                # Ends the transaction, so that the next poll sees the new
+                # executions
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                logger = logging.getLogger('server-error')
+                logger.error(traceback.format_exc())
+                continue
+            for identifier in identifiers:
+                if identifier not in self._pending:
+                    asyncio.ensure_future(self._supervise(identifier))
+
+    def _start_loop(self):
+        with self._lock:
+            if self._loop:
+                return
+            self._loop = asyncio.new_event_loop()
+            if sys.version_info < (3, 8):
+                # Before Python 3.8, subprocesses can only be awaited from a
+                # loop whose child watcher is attached from the main thread
+                asyncio.get_child_watcher().attach_loop(self._loop)
+            threading.Thread(
+                target=self._run_loop,
+                name="execution-supervisor",
+                daemon=True).start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._semaphore = asyncio.Semaphore(
+            app.config['MAX_CONCURRENT_EXECUTIONS'])
+        with app.app_context():
+            self._loop.run_forever()
+
+    def stop(self):
+        with self._lock:
+            if self._loop:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._loop = None
+
+
+EXECUTION_SUPERVISOR = ExecutionSupervisor()
+
+
+def start_execution(execution_db: ExecutionDB):
+    """Adds the execution to the queue of executions waiting to be run by
+    the supervisor."""
+    execution_db.status = ExecutionStatus.Queued
+    db.session.commit()
+    EXECUTION_EVENTS.publish(execution_db)
+
     if app.config["TESTING"]:
-        execution_process(
-            user=user,
-            execution=execution,
-            descriptor=descriptor,
-            inputs_path=inputs_path)
+        run_until_complete(run_execution(execution_db.identifier))
     else:
-        pool = Pool(processes=1)
-        pool.apply_async(
-            func=execution_process,
-            kwds={
-                "user": user,
-                "execution": execution,
-                "descriptor": descriptor,
-                "inputs_path": inputs_path
-            })
-        pool.close()
-
-
-def execution_process(user: User, execution: Execution, descriptor: Descriptor,
-                      inputs_path: str):
-    # 1 Write the current execution pid to database
-    execution_process = ExecutionProcess(
-        execution_identifier=execution.identifier,
-        pid=current_process().pid,
-        is_execution=False)
-    db.session.add(execution_process)
-    db.session.commit()
+        EXECUTION_SUPERVISOR.submit(execution_db.identifier)
+
 
-    # 2 Change the execution status in the database
-    execution_db = get_execution(execution.identifier, db.session)
-    execution_db.status = ExecutionStatus.Running
-    execution_db.start_date = current_milli_time()
+def run_until_complete(coroutine):
+    """Runs a coroutine in a new event loop of the current thread."""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def cancel_queued_execution(execution_identifier: str, db_session) -> bool:
+    """Marks a queued execution as killed, so that it is never run.
+    Returns False if the execution was not queued anymore."""
+    cancelled = db_session.query(ExecutionDB).filter_by(
+        identifier=execution_identifier,
+        status=ExecutionStatus.Queued).update(
+            {
+                "status": ExecutionStatus.Killed,
+                "end_date": current_milli_time()
+            },
+            synchronize_session='fetch')
+    db_session.commit()
+    if cancelled:
+        publish_execution_event(execution_identifier, db_session)
+    return bool(cancelled)
+
+
+async def run_execution(execution_identifier: str):
+    # The execution may have been killed while it was queued
+    claimed = db.session.query(ExecutionDB).filter_by(
+        identifier=execution_identifier,
+        status=ExecutionStatus.Queued).update(
+            {
+                "status": ExecutionStatus.Running,
+                "start_date": current_milli_time()
+            },
+            synchronize_session='fetch')
     db.session.commit()
+    if not claimed:
+        return
+    publish_execution_event(execution_identifier, db.session)
+
+    execution_db = get_execution(execution_identifier, db.session)
+    user = db.session.query(User).filter_by(
+        username=execution_db.creator_username).first()
+    execution, _ = get_execution_as_model(user.username, execution_db)
+    descriptor = Descriptor.descriptor_factory_from_type(
+        execution_db.descriptor)
+    inputs_path = get_absolute_path_inputs_path(user.username,
+                                                execution_identifier)
+    await execution_process(
+        user=user,
+        execution=execution,
+        descriptor=descriptor,
+        inputs_path=inputs_path)
 
-    # 3 Launch the bosh execution
+
+async def execution_process(user: User, execution: Execution,
+                            descriptor: Descriptor, inputs_path: str):
+    # The session is shared by every execution of the supervisor: database
+    # writes must never wait on the event loop in the middle of a transaction.
+    loop = asyncio.get_event_loop()
+
+    # 1 Launch the bosh execution
     user_data_dir = get_user_data_directory(user.username)
     execution_dir = get_execution_dir(user.username, execution.identifier)
     descriptor_path = get_descriptor_path(user.username, execution.identifier)
     timeout = execution.timeout
     if timeout is None:
         timeout = PLATFORM_PROPERTIES.get("defaultExecutionTimeout")
-    if not timeout:
-        timeout = None
+
+    # The sizes of the directories of the execution are not cached while it
+    # runs
+    running_marker_path = get_running_marker_path(user.username,
+                                                  execution.identifier)
+    open(running_marker_path, 'w').close()
 
     with open(
             std_file_path(user.username, execution.identifier,
@@ -72,15 +233,16 @@ def execution_process(user: User, execution: Execution, descriptor: Descriptor,
             'w') as file_stdout, open(
                 std_file_path(user.username, execution.identifier,
                               STDERR_FILENAME), 'w') as file_stderr:
+        timer = None
         try:
-            process = Popen(
-                descriptor.execute(user_data_dir, descriptor_path,
-                                   inputs_path),
+            process = await asyncio.create_subprocess_exec(
+                *descriptor.execute(user_data_dir, descriptor_path,
+                                    inputs_path),
                 stdout=file_stdout,
                 stderr=file_stderr,
                 cwd=execution_dir)
 
-            # Insert Popen process in DB
+            # 2 Write the execution pid to database, so that it can be killed
             execution_process_popen = ExecutionProcess(
                 execution_identifier=execution.identifier,
                 pid=process.pid,
@@ -88,35 +250,83 @@ def execution_process(user: User, execution: Execution, descriptor: Descriptor,
             db.session.add(execution_process_popen)
             db.session.commit()
 
-            exit_code = process.wait(timeout=timeout)
-        except TimeoutExpired as timeout_expired:  # Timeout
-            kill_execution_processes([execution_process_popen])
-            file_stderr.writelines(
-                "Execution timed out after {} seconds".format(
-                    timeout_expired.timeout))
-            ExecutionFailed(execution_db)
-        except Exception:  # Any other execution issue
-            ExecutionFailed(execution_db)
-            kill_execution_processes([execution_process_popen])
-        else:
-            # 4 Execution successfully completed - Writing to database
-            if exit_code == 0:
-                execution_db.status = ExecutionStatus.Finished
+            # 3 Wait for the execution, killing it if it times out
+            killed_on_timeout = []
+
+            def kill_on_timeout():
+                # Killing waits for the processes to end, out of the loop
+                killed_on_timeout.append(
+                    loop.run_in_executor(None, kill_execution_processes,
+                                         [ExecutionProcess(pid=process.pid)]))
+
+            if timeout:
+                timer = loop.call_later(timeout, kill_on_timeout)
+            exit_code = await process.wait()
+            if timer:
+                timer.cancel()
+
+            if killed_on_timeout:
+                await killed_on_timeout[0]
+                file_stderr.writelines(
+                    "Execution timed out after {} seconds".format(timeout))
+                status = ExecutionStatus.ExecutionFailed
+            elif exit_code == 0:
+                status = ExecutionStatus.Finished
             else:
-                execution_db.status = ExecutionStatus.ExecutionFailed
-            db.session.commit()
+                status = ExecutionStatus.ExecutionFailed
+        except Exception:  # Any other execution issue
+            if timer:
+                timer.cancel()
+            logger = logging.getLogger('server-error')
+            logger.error(traceback.format_exc())
+            status = ExecutionStatus.ExecutionFailed
         finally:
-            # Delete Execution processes from the database
-            db.session.delete(execution_process)
-            db.session.delete(execution_process_popen)
-            # Insert endtime
-            execution_db.end_date = current_milli_time()
+            # 4 Delete the execution processes from the database. No other
+            # coroutine can have pending changes here, as they all commit
+            # without awaiting: the rollback only discards a failed commit
+            # of this execution.
+            db.session.rollback()
+            db.session.query(ExecutionProcess).filter_by(
+                execution_identifier=execution.identifier).delete(
+                    synchronize_session=False)
             db.session.commit()
 
             # Delete temporary absolute input paths files
-            os.remove(inputs_path)
+            try:
+                os.remove(inputs_path)
+            except OSError:
+                # The execution directory may have been removed
+                pass
+
+            # The execution wrote its results in its directory
+            try:
+                os.remove(running_marker_path)
+            except OSError:
+                pass
+            PATH_SIZE_INDEX.invalidate_tree(execution_dir)
+
+    # 5 Write the final status. An execution killed in the meantime is not
+    # running anymore and keeps its status.
+    finish_execution(execution.identifier, status)
+
+    # 6 List the results, which do not change anymore, in their manifest,
+    # computing their checksums
+    if app.config["TESTING"]:
+        write_output_manifest(execution_dir)
+    else:
+        await loop.run_in_executor(None, run_write_output_manifest,
+                                   execution_dir)
 
 
-def ExecutionFailed(execution_db):
-    execution_db.status = ExecutionStatus.ExecutionFailed
+def finish_execution(execution_identifier: str, status: ExecutionStatus):
+    finished = db.session.query(ExecutionDB).filter_by(
+        identifier=execution_identifier,
+        status=ExecutionStatus.Running).update(
+            {
+                "status": status,
+                "end_date": current_milli_time()
+            },
+            synchronize_session='fetch')
     db.session.commit()
+    if finished:
+        publish_execution_event(execution_identifier, db.session)
@@ -1,28 +1,159 @@
+"""The output files of an execution are listed in a manifest, written in its
+`.carmin-files` folder once the execution completes, so that its results are
+served without walking its directory each time.
+
+The manifest records the path, size, modification time, mime type and MD5
+checksum of every output file, and the modification time of every directory
+of the output tree. It is valid as long as none of these directories was
+modified, which catches files being added, removed or renamed; otherwise the
+execution directory is walked again.
+"""
 import os
 try:
     from os import scandir, walk
 except ImportError:
     from scandir import scandir, walk
-from typing import List
-from server.resources.helpers.executions import CARMIN_FILES_FOLDER, get_execution_dir
+import json
+import uuid
+import logging
+import mimetypes
+import traceback
+from typing import Dict, List
+from server import app
+from server.database import db
+from server.common.error_codes_and_messages import PATH_DOES_NOT_EXIST
+from server.resources.helpers.executions import (
+    CARMIN_FILES_FOLDER, OUTPUTS_MANIFEST_FILENAME, get_execution_dir)
+from server.resources.helpers.checksums import (get_file_checksums,
+                                                get_precomputed_algorithms)
 from server.resources.models.error_code_and_message import ErrorCodeAndMessage
 from server.resources.models.path import Path
 
 
 def get_output_files(username: str, execution_identifier: str
-                     ) -> (List[str], ErrorCodeAndMessage):
+                     ) -> (List[Path], ErrorCodeAndMessage):
     try:
         execution_dir = get_execution_dir(username, execution_identifier)
     except FileNotFoundError:
         return None, PATH_DOES_NOT_EXIST
 
-    excluded_dirs = [CARMIN_FILES_FOLDER]
-    output_files = list()
-    for root, dirs, files in walk(execution_dir):
-        dirs[:] = [d for d in dirs if d not in CARMIN_FILES_FOLDER]
+    manifest = load_output_manifest(execution_dir)
+    if manifest is None:
+        return [
+            Path.object_from_pathname(real_path)
+            for real_path in walk_output_files(execution_dir)
+        ], None
+
+    data_directory = app.config['DATA_DIRECTORY']
+    return [
+        Path(
+            platform_path=Path.platform_path_from_pathname(
+                os.path.join(data_directory, output["path"])),
+            last_modification_date=output["lastModificationDate"],
+            is_directory=False,
+            size=output["size"],
+            mime_type=output["mimeType"],
+            execution_id=execution_identifier) for output in manifest["files"]
+    ], None
+
+
+def get_returned_files(username: str, execution_identifier: str) -> List[str]:
+    """Returns the urls of the output files of an execution. Unlike
+    `get_output_files`, files are not accessed, only listed."""
+    try:
+        execution_dir = get_execution_dir(username, execution_identifier)
+    except FileNotFoundError:
+        return []
+
+    manifest = load_output_manifest(execution_dir)
+    if manifest is None:
+        real_paths = walk_output_files(execution_dir)
+    else:
+        real_paths = [
+            os.path.join(app.config['DATA_DIRECTORY'], output["path"])
+            for output in manifest["files"]
+        ]
+    return [
+        Path.platform_path_from_pathname(real_path)
+        for real_path in real_paths
+    ]
+
 
+def walk_output_files(execution_dir: str) -> List[str]:
+    """Returns the real path of every output file of an execution."""
+    output_files = []
+    for root, dirs, files in walk(execution_dir):
+        dirs[:] = [d for d in dirs if d != CARMIN_FILES_FOLDER]
         for f in files:
+            output_files.append(os.path.realpath(os.path.join(root, f)))
+    return output_files
+
+
+def get_output_manifest_path(execution_dir: str) -> str:
+    return os.path.join(execution_dir, CARMIN_FILES_FOLDER,
+                        OUTPUTS_MANIFEST_FILENAME)
+
+
+def run_write_output_manifest(execution_dir: str):
+    with app.app_context():
+        try:
+            write_output_manifest(execution_dir)
+        except Exception:
+            logger = logging.getLogger('server-error')
+            logger.error(traceback.format_exc())
+        finally:
+            db.session.remove()
+
+
+def write_output_manifest(execution_dir: str):
+    """Lists the output files of a completed execution in its manifest.
+    Checksums are stored in the checksum store as well, along with the
+    precomputed ones, so that each output file is read once."""
+    data_directory = app.config['DATA_DIRECTORY']
+    algorithms = ["md5"] + [
+        algorithm for algorithm in get_precomputed_algorithms()
+        if algorithm != "md5"
+    ]
+    directories = {}
+    files = []
+    for root, dirs, filenames in walk(execution_dir):
+        dirs[:] = [d for d in dirs if d != CARMIN_FILES_FOLDER]
+        directories[os.path.relpath(root, execution_dir)] = os.stat(
+            root).st_mtime_ns
+        for f in filenames:
             real_path = os.path.realpath(os.path.join(root, f))
-            output_files.append(Path.object_from_pathname(real_path))
+            try:
+                file_stat = os.stat(real_path)
+                md5 = get_file_checksums(real_path, algorithms)["md5"]
+            except OSError:
+                # Broken link
+                continue
+            mime_type, _ = mimetypes.guess_type(real_path)
+            files.append({
+                "path": os.path.relpath(real_path, data_directory),
+                "size": file_stat.st_size,
+                "lastModificationDate": file_stat.st_mtime,
+                "mimeType": mime_type,
+                "md5": md5
+            })
+
+    manifest_path = get_output_manifest_path(execution_dir)
+    temp_manifest_path = "{}.{}.tmp".format(manifest_path, uuid.uuid4().hex)
+    with open(temp_manifest_path, 'w') as manifest_file:
+        json.dump({"directories": directories, "files": files}, manifest_file)
+    os.replace(temp_manifest_path, manifest_path)
 
-    return output_files, None
+
+def load_output_manifest(execution_dir: str) -> Dict:
+    """Returns the manifest of an execution, or None if there is none or if
+    the output tree changed since it was written."""
+    try:
+        with open(get_output_manifest_path(execution_dir)) as manifest_file:
+            manifest = json.load(manifest_file)
+        for directory, mtime in manifest["directories"].items():
+            path = os.path.normpath(os.path.join(execution_dir, directory))
+            if os.stat(path).st_mtime_ns != mtime:
+                return None
+    except (OSError, ValueError, KeyError):
+        return None
+    return manifest
@@ -3,10 +3,11 @@ import json
 import shutil
 import tempfile
 from boutiques import bosh
-from typing import Dict
+from typing import Dict, List, Tuple
 from server import app
 from server.database.models.user import User, Role
 from server.database.models.execution import Execution as ExecutionDB
+from server.database.queries.executions import get_execution
 from server.platform_properties import PLATFORM_PROPERTIES
 from server.resources.models.error_code_and_message import ErrorCodeAndMessage
 from server.resources.models.pipeline import Pipeline, PipelineSchema
@@ -15,11 +16,16 @@ from server.common.error_codes_and_messages import (
     INVALID_PIPELINE_IDENTIFIER, EXECUTION_IDENTIFIER_MUST_NOT_BE_SET,
     INVALID_QUERY_PARAMETER, INVALID_EXECUTION_TIMEOUT, PATH_DOES_NOT_EXIST,
     UNEXPECTED_ERROR, ErrorCodeAndMessageFormatter)
-from server.resources.models.execution import Execution, EXECUTION_COMPLETED_STATUSES
+from server.resources.models.execution import (
+    Execution, ExecutionSchema, EXECUTION_COMPLETED_STATUSES)
 from server.resources.helpers.pipelines import get_pipeline
+from server.resources.helpers.path_sizes import PATH_SIZE_INDEX
 from server.resources.helpers.pathnames import (
     INPUTS_FILENAME, EXECUTIONS_DIRNAME, DESCRIPTOR_FILENAME,
-    CARMIN_FILES_FOLDER, STDOUT_FILENAME, STDERR_FILENAME)
+    DESCRIPTOR_HASH_FILENAME, CARMIN_FILES_FOLDER, STDOUT_FILENAME,
+    STDERR_FILENAME, OUTPUTS_MANIFEST_FILENAME, EXECUTION_RUNNING_FILENAME)
+from server.resources.helpers.descriptor_store import (
+    DESCRIPTOR_STORE, get_stored_descriptor_path)
 
 
 def create_user_executions_dir(username: str):
@@ -53,6 +59,7 @@ def create_execution_directory(execution: ExecutionDB, user: User
 
 def delete_execution_directory(execution_dir_path: str):
     shutil.rmtree(execution_dir_path, ignore_errors=True)
+    PATH_SIZE_INDEX.invalidate(execution_dir_path)
 
 
 def get_execution_dir(username: str, execution_identifier: str) -> str:
@@ -99,6 +106,12 @@ def write_absolute_path_inputs_to_file(
     return inputs_json_file, None
 
 
+def get_running_marker_path(username: str, execution_identifier: str) -> str:
+    return os.path.join(
+        get_execution_carmin_files_dir(username, execution_identifier),
+        EXECUTION_RUNNING_FILENAME)
+
+
 def get_absolute_path_inputs_path(username: str,
                                   execution_identifier: str) -> str:
     carmin_files_dir = get_execution_carmin_files_dir(username,
@@ -108,27 +121,39 @@ def get_absolute_path_inputs_path(username: str,
     return absolute_path_inputs_path
 
 
-def input_files_exist(input_values: Dict, pipeline: Pipeline,
-                      url_root: str) -> (bool, str):
-    pipeline_parameters = pipeline.parameters
+def input_files_exist(input_values: Dict,
+                      pipeline: Pipeline,
+                      url_root: str,
+                      existing_paths: Dict[str, bool] = None) -> (bool, str):
+    """Checks that the input files of an execution exist. Paths already
+    found in `existing_paths` are not checked again, so that executions
+    sharing input files only check them once."""
+    if existing_paths is None:
+        existing_paths = {}
+    file_parameters = set(
+        parameter.identifier for parameter in pipeline.parameters
+        if parameter.parameter_type == "File"
+        and not parameter.is_returned_value)
 
     for key in input_values:
-        for parameter in pipeline_parameters:
-            if parameter.parameter_type == "File" and not parameter.is_returned_value and parameter.identifier == key:
-                exists, path = platform_path_exists(url_root,
-                                                    input_values[key])
-                if not exists:
-                    return False, path
+        if key not in file_parameters:
+            continue
+        platform_paths = input_values[key]
+        if not isinstance(platform_paths, list):
+            platform_paths = [platform_paths]
+        for platform_path in platform_paths:
+            if platform_path not in existing_paths:
+                existing_paths[platform_path], _ = platform_path_exists(
+                    url_root, platform_path)
+            if not existing_paths[platform_path]:
+                return False, platform_path
     return True, None
 
 
 def create_absolute_path_inputs(username: str, execution_identifier: str,
-                                pipeline_identifier: str,
+                                pipeline_identifier: str, input_values: Dict,
                                 url_root: str) -> (str, ErrorCodeAndMessage):
-    input_values, error = load_inputs(username, execution_identifier)
-    if error:
-        return None, error
-
+    input_values = dict(input_values)
     pipeline = get_pipeline(pipeline_identifier)
     if not pipeline:
         return None, INVALID_PIPELINE_IDENTIFIER
@@ -165,45 +190,129 @@ def get_inputs_file_path(username: str, execution_identifier: str) -> str:
         execution_identifier, CARMIN_FILES_FOLDER, INPUTS_FILENAME)
 
 
-def get_execution_as_model(username: str,
-                           execution_db) -> (Execution, ErrorCodeAndMessage):
+# Execution attributes by name in the API
+EXECUTION_FIELDS = {
+    field.dump_to or name: name
+    for name, field in ExecutionSchema().fields.items()
+}
+# Listing the returned files of an execution walks its whole directory: they
+# are only listed when requested
+DEFAULT_EXECUTION_LIST_FIELDS = [
+    name for name in EXECUTION_FIELDS.values() if name != 'returned_files'
+]
+
+
+def parse_execution_fields(fields_parameter: str
+                           ) -> (List[str], ErrorCodeAndMessage):
+    """Returns the attributes selected by a comma-separated `fields` query
+    parameter, or the default ones if it is not set."""
+    if not fields_parameter:
+        return DEFAULT_EXECUTION_LIST_FIELDS, None
+    fields = []
+    for field in fields_parameter.split(','):
+        field = field.strip()
+        if field not in EXECUTION_FIELDS:
+            return None, ErrorCodeAndMessageFormatter(INVALID_QUERY_PARAMETER,
+                                                      field, 'fields')
+        fields.append(EXECUTION_FIELDS[field])
+    return fields, None
+
+
+def parse_execution_cursor(after_parameter: str, username: str, db_session
+                           ) -> (Tuple[int, str], ErrorCodeAndMessage):
+    """Returns the (created_at, identifier) position given by an `after` query
+    parameter, which is either `<created_at>,<identifier>` or the identifier
+    of an execution of the user."""
+    if not after_parameter:
+        return None, None
+    if ',' in after_parameter:
+        created_at, identifier = after_parameter.split(',', 1)
+        try:
+            return (int(created_at), identifier), None
+        except ValueError:
+            pass
+    else:
+        execution_db = get_execution(after_parameter, db_session)
+        if execution_db and execution_db.creator_username == username:
+            return (execution_db.created_at, execution_db.identifier), None
+    return None, ErrorCodeAndMessageFormatter(INVALID_QUERY_PARAMETER,
+                                              after_parameter, 'after')
+
+
+def get_execution_as_model(username: str, execution_db, fields: List[str] = None
+                           ) -> (Execution, ErrorCodeAndMessage):
+    """Returns the API model of `execution_db`. Only the attributes listed in
+    `fields` are set, so that the files of the execution are only read when
+    `returned_files` are requested. All the attributes are set if `fields` is
+    None."""
     if not execution_db:
         return None, INVALID_MODEL_PROVIDED
-    inputs, error = load_inputs(username, execution_db.identifier)
-    if error:
-        inputs = {"error": "Error retrieving inputs for execution."}
-    dummy_exec = Execution()
+    if fields is None:
+        fields = list(EXECUTION_FIELDS.values())
+
     execution_kwargs = {
         prop: execution_db.__dict__[prop]
-        for prop in dummy_exec.__dict__.keys() if prop in execution_db.__dict__
+        for prop in fields if prop in execution_db.__dict__
     }
-    exe = Execution(input_values=inputs, **execution_kwargs)
-    if exe.status in EXECUTION_COMPLETED_STATUSES:
+    exe = Execution(**execution_kwargs)
+    if 'input_values' in fields and exe.input_values is None:
+        # The inputs of the executions that could not be migrated are only
+        # stored in their inputs file
+        inputs, error = load_inputs(username, execution_db.identifier)
+        if error:
+            inputs = {"error": "Error retrieving inputs for execution."}
+        exe.input_values = inputs
+    if 'returned_files' in fields and (execution_db.status in
+                                       EXECUTION_COMPLETED_STATUSES):
         """This implementation does not currently respect the current
         (0.3) API specification. It simply returns a list of output files that
         were generated from the execution."""
-        from server.resources.helpers.execution_results import get_output_files
-        output_files, error = get_output_files(username, exe.identifier)
-        path_list = []
-        for output in output_files:
-            path_list.append(output.platform_path)
-        exe.returned_files = path_list
+        from server.resources.helpers.execution_results import get_returned_files
+        exe.returned_files = get_returned_files(username,
+                                                execution_db.identifier)
     return exe, None
 
 
 def validate_request_model(model: Execution,
                            url_root: str) -> (bool, ErrorCodeAndMessage):
+    error = check_request_model(model, url_root)
+    return error is None, error
+
+
+def validate_request_models(models: List[Execution],
+                            url_root: str) -> List[ErrorCodeAndMessage]:
+    """Returns the validation error of each model, or None if it is valid.
+    Each pipeline is loaded, and each input file checked, once for the
+    whole list."""
+    pipelines = {}
+    existing_paths = {}
+    return [
+        check_request_model(model, url_root, pipelines, existing_paths)
+        for model in models
+    ]
+
+
+def check_request_model(model: Execution,
+                        url_root: str,
+                        pipelines: Dict[str, Pipeline] = None,
+                        existing_paths: Dict[str, bool] = None
+                        ) -> ErrorCodeAndMessage:
     if model.identifier:
-        return False, EXECUTION_IDENTIFIER_MUST_NOT_BE_SET
-    pipeline = get_pipeline(model.pipeline_identifier)
+        return EXECUTION_IDENTIFIER_MUST_NOT_BE_SET
+    if pipelines is None:
+        pipelines = {}
+    if model.pipeline_identifier not in pipelines:
+        pipelines[model.pipeline_identifier] = get_pipeline(
+            model.pipeline_identifier)
+    pipeline = pipelines[model.pipeline_identifier]
     if not pipeline:
-        return False, INVALID_PIPELINE_IDENTIFIER
+        return INVALID_PIPELINE_IDENTIFIER
     files_exist, error = input_files_exist(model.input_values, pipeline,
-                                           url_root)
+                                           url_root, existing_paths)
     if not files_exist:
         error_code_and_message = ErrorCodeAndMessageFormatter(
             INVALID_INPUT_FILE, error)
-        return False, error_code_and_message
+        return error_code_and_message
 
     # Timeout validation
     min_authorized_execution_timeout = PLATFORM_PROPERTIES.get(
@@ -216,8 +325,8 @@ def validate_request_model(model: Execution,
         error_code_and_message = ErrorCodeAndMessageFormatter(
             INVALID_EXECUTION_TIMEOUT, min_authorized_execution_timeout,
             max_authorized_execution_timeout or "(no maximum timeout)")
-        return False, error_code_and_message
-    return True, None
+        return error_code_and_message
+    return None
 
 
 def query_converter(value):
@@ -227,14 +336,15 @@ def query_converter(value):
     return converted_value
 
 
-def copy_descriptor_to_execution_dir(execution_path,
+def link_descriptor_to_execution_dir(execution_path,
                                      descriptor_path) -> ErrorCodeAndMessage:
+    """References the pipeline descriptor from the execution folder, through
+    the descriptor store."""
     if not os.path.exists(descriptor_path):
         return PATH_DOES_NOT_EXIST
 
     try:
-        shutil.copyfile(descriptor_path,
-                        os.path.join(execution_path, DESCRIPTOR_FILENAME))
+        DESCRIPTOR_STORE.link(descriptor_path, execution_path)
     except OSError:
         return UNEXPECTED_ERROR
 
@@ -242,9 +352,18 @@ def copy_descriptor_to_execution_dir(execution_path,
 
 
 def get_descriptor_path(username: str, execution_identifier: str) -> str:
-    return os.path.join(
-        get_execution_carmin_files_dir(username, execution_identifier),
-        DESCRIPTOR_FILENAME)
+    carmin_files_dir = get_execution_carmin_files_dir(username,
+                                                      execution_identifier)
+    descriptor_path = os.path.join(carmin_files_dir, DESCRIPTOR_FILENAME)
+    if os.path.exists(descriptor_path):
+        return descriptor_path
+    # The descriptor is only referenced by its hash in the descriptor store
+    try:
+        with open(os.path.join(carmin_files_dir,
+                               DESCRIPTOR_HASH_FILENAME)) as hash_file:
+            return get_stored_descriptor_path(hash_file.read().strip())
+    except OSError:
+        return descriptor_path
 
 
 def std_file_path(username: str, execution_identifier: str,
@@ -254,17 +373,6 @@ def std_file_path(username: str, execution_identifier: str,
         execution_identifier, CARMIN_FILES_FOLDER, filename)
 
 
-def get_std_file(username: str, execution_identifier: str,
-                 filename: str) -> (str, ErrorCodeAndMessage):
-    file_path = std_file_path(username, execution_identifier, filename)
-
-    try:
-        with open(file_path) as f:
-            return f.read(), None
-    except OSError:
-        return None, PATH_DOES_NOT_EXIST
-
-
 def is_safe_for_get(user: User, execution_db: ExecutionDB):
     if user.role == Role.admin:
         return True
@@ -1,11 +1,18 @@
 import os
-import tarfile
-import tempfile
-import zipfile
+try:
+    from os import scandir
+except ImportError:
+    from scandir import scandir
+import fnmatch
+import shutil
+import logging
+import traceback
 import mimetypes
-import hashlib
+import json
 import base64
-from typing import List
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, List
 from binascii import Error
 from flask import Response, make_response, send_file
 from server import app
@@ -14,38 +21,137 @@ from server.resources.models.error_code_and_message import ErrorCodeAndMessage
 from server.database.models.user import User, Role
 from server.resources.models.path import Path, PathSchema
 from server.resources.models.path_md5 import PathMD5
+from server.resources.models.path_checksum import PathChecksum
+from server.resources.models.archive_extraction import ArchiveExtraction
 from server.common.error_codes_and_messages import (
     ErrorCodeAndMessageMarshaller, ErrorCodeAndMessageFormatter,
     PATH_IS_DIRECTORY, INVALID_PATH, PATH_EXISTS, INVALID_MODEL_PROVIDED,
-    NOT_AN_ARCHIVE, INVALID_BASE_64, UNEXPECTED_ERROR)
-
-
-def get_content(complete_path: str) -> Response:
-    """Helper function for the `content` action used in the GET method."""
+    NOT_AN_ARCHIVE, INVALID_BASE_64, UNEXPECTED_ERROR, INVALID_QUERY_PARAMETER)
+from server.resources.helpers.path_sizes import PATH_SIZE_INDEX
+from server.resources.helpers.checksums import (
+    CHECKSUM_ALGORITHMS, get_file_checksum, precompute_checksums_in_background)
+from server.resources.helpers.execution import (
+    extract_execution_identifier_from_path, is_executions_directory)
+from server.resources.helpers.archives import (
+    TAR_FORMAT, ARCHIVE_FORMATS, DEFAULT_COMPRESSION_LEVEL, stream_archive,
+    archive_filename, archive_mimetype, detect_archive_format,
+    extract_archive, merge_directory)
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+LIST_SORT_NAME = 'name'
+LIST_SORT_DATE = 'lastModificationDate'
+LIST_SORT_SIZE = 'size'
+LIST_SORT_KEYS = [LIST_SORT_NAME, LIST_SORT_DATE, LIST_SORT_SIZE]
+
+
+def get_content(complete_path: str,
+                archive_format: str = TAR_FORMAT,
+                compression_level: str = None) -> (Response, ErrorCodeAndMessage):
+    """Helper function for the `content` action used in the GET method.
+    Directories are sent as an archive, generated while it is sent."""
     if os.path.isdir(complete_path):
-        tarball = make_tarball(complete_path)
-        response = send_file(
-            tarball, mimetype="application/gzip", as_attachment=True)
-        os.remove(tarball)
-        return response
+        if archive_format not in ARCHIVE_FORMATS:
+            return None, ErrorCodeAndMessageFormatter(
+                INVALID_QUERY_PARAMETER, archive_format, 'format')
+        if compression_level is None:
+            compression_level = DEFAULT_COMPRESSION_LEVEL
+        else:
+            try:
+                level = int(compression_level)
+            except ValueError:
+                level = -1
+            if not 0 <= level <= 9:
+                return None, ErrorCodeAndMessageFormatter(
+                    INVALID_QUERY_PARAMETER, compression_level, 'compression')
+            compression_level = level
+
+        response = Response(
+            stream_archive(complete_path, archive_format, compression_level),
+            mimetype=archive_mimetype(archive_format, compression_level))
+        response.headers.set(
+            'Content-Disposition',
+            'attachment',
+            filename=archive_filename(complete_path, archive_format,
+                                      compression_level))
+        return response, None
+
+    # Conditional responses handle the `Range`, `If-None-Match` and
+    # `If-Modified-Since` headers, with an ETag derived from the modification
+    # time and size of the file. The file itself is handed over to the WSGI
+    # server, which can stream it with sendfile (or to the front-end server
+    # when `USE_X_SENDFILE` is set).
     mimetype, _ = mimetypes.guess_type(complete_path)
-    response = send_file(complete_path)
-    if mimetype:
-        response.mimetype = mimetype
-    return response
-
+    return send_file(
+        complete_path,
+        mimetype=mimetype or 'application/octet-stream',
+        conditional=True), None
+
+
+def get_path_list(relative_path_to_resource: str,
+                  offset: int = None,
+                  limit: int = None,
+                  sort: str = LIST_SORT_NAME,
+                  name_filter: str = None) -> (List[Path], ErrorCodeAndMessage):
+    """Helper function for the `list` action used in the GET method.
+
+    The directory is read in a single `scandir` pass, and the entries are
+    sorted on the results of their `stat`. Only the requested page is turned
+    into Path objects. `sort` is one of LIST_SORT_KEYS, prefixed with '-' for
+    a descending order, and `name_filter` is a shell-style pattern.
+    """
+    sort_key = sort[1:] if sort.startswith('-') else sort
+    if sort_key not in LIST_SORT_KEYS:
+        return None, ErrorCodeAndMessageFormatter(INVALID_QUERY_PARAMETER,
+                                                  sort, 'sort')
 
-def get_path_list(relative_path_to_resource: str) -> List[Path]:
-    """Helper function for the `list` action used in the GET method."""
-    result_list = []
     absolute_path_to_resource = make_absolute(relative_path_to_resource)
-    directory_list = os.listdir(absolute_path_to_resource)
-    for f_d in directory_list:
-        if not f_d.startswith('.'):
-            result_list.append(
-                Path.object_from_pathname(
-                    os.path.join(absolute_path_to_resource, f_d)))
-    return result_list
+    entries = []
+    for entry in scandir(absolute_path_to_resource):
+        if entry.name.startswith('.'):
+            continue
+        if name_filter and not fnmatch.fnmatchcase(entry.name, name_filter):
+            continue
+        try:
+            entries.append((entry, entry.stat(), entry.is_dir()))
+        except OSError:
+            # The entry was removed, or is a broken link
+            continue
+
+    def entry_size(entry, stat_result, is_dir):
+        if is_dir:
+            return Path.get_path_size(entry.path, True)
+        return stat_result.st_size
+
+    if sort_key == LIST_SORT_NAME:
+        entries.sort(key=lambda e: e[0].name)
+    elif sort_key == LIST_SORT_DATE:
+        entries.sort(key=lambda e: e[1].st_mtime)
+    else:
+        entries.sort(key=lambda e: entry_size(*e))
+    if sort.startswith('-'):
+        entries.reverse()
+
+    offset = offset or 0
+    if limit is not None:
+        entries = entries[offset:offset + limit]
+    else:
+        entries = entries[offset:]
+
+    # The entries of a directory belong to the same execution as the
+    # directory, except in the directory of the executions of a user, where
+    # each subdirectory is an execution.
+    execution_id = extract_execution_identifier_from_path(
+        absolute_path_to_resource)
+    in_executions_directory = is_executions_directory(
+        absolute_path_to_resource)
+
+    return [
+        Path.object_from_stat(
+            entry.path, stat_result, is_dir, execution_id
+            or (entry.name if in_executions_directory and is_dir else None))
+        for entry, stat_result, is_dir in entries
+    ], None
 
 
 def is_safe_path(path: str, follow_symlinks: bool = True) -> bool:
@@ -55,7 +161,7 @@ def is_safe_path(path: str, follow_symlinks: bool = True) -> bool:
     base_dir = app.config['DATA_DIRECTORY']
     if follow_symlinks:
         return os.path.realpath(path).startswith(base_dir)
-    return os.path.abspath(path).startwith(base_dir)
+    return os.path.abspath(path).startswith(base_dir)
 
 
 def is_data_accessible(path: str, user: User) -> bool:
@@ -99,46 +205,227 @@ def make_absolute(relative_path: str) -> str:
     return os.path.normpath(os.path.join(data_path, relative_path))
 
 
+def upload_stream(stream, requested_file_path: str
+                  ) -> (Path, ErrorCodeAndMessage):
+    """Writes the content of `stream` to `requested_file_path`, one chunk at a
+    time, so that the memory used does not depend on the size of the file."""
+    chunks = iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b"")
+    return write_file_atomically(requested_file_path, chunks)
+
+
+def write_file_atomically(requested_file_path: str, chunks: Iterable[bytes]
+                          ) -> (Path, ErrorCodeAndMessage):
+    """Writes `chunks` to a hidden temporary file next to
+    `requested_file_path`, then renames it into place: the file is never seen
+    partially written, and is left unchanged if the upload fails."""
+    temp_file_path = os.path.join(
+        os.path.dirname(requested_file_path), ".{}.{}.upload".format(
+            os.path.basename(requested_file_path),
+            uuid.uuid4().hex))
+    try:
+        with open(temp_file_path, 'xb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(temp_file_path, requested_file_path)
+    except OSError:
+        return None, UNEXPECTED_ERROR
+    finally:
+        if os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+
+    PATH_SIZE_INDEX.invalidate(requested_file_path)
+    precompute_checksums_in_background(requested_file_path)
+    return Path.object_from_pathname(requested_file_path), None
+
+
 def upload_file(upload_data: UploadData,
                 requested_file_path: str) -> (Path, ErrorCodeAndMessage):
     try:
         raw_content = base64.decodebytes(upload_data.base64_content.encode())
     except Error as e:
         return None, ErrorCodeAndMessageFormatter(INVALID_BASE_64, e)
-    try:
-        with open(requested_file_path, 'wb') as f:
-            f.write(raw_content)
-    except OSError:
-        return None, UNEXPECTED_ERROR
-    path = Path.object_from_pathname(requested_file_path)
-    return path, None
+    # Replacing the file breaks its hard links, such as the descriptors
+    # linked to the descriptor store, instead of writing through them
+    return write_file_atomically(requested_file_path, [raw_content])
 
 
 def upload_archive(upload_data: UploadData,
-                   requested_dir_path: str) -> (Path, ErrorCodeAndMessage):
+                   requested_dir_path: str) -> (Future, ErrorCodeAndMessage):
+    """Writes the decoded archive to a hidden file next to
+    `requested_dir_path`, and extracts it there in the background. The
+    returned future gives the error of the extraction, if any. Clients follow
+    the extraction with `get_extraction_status`."""
     try:
         raw_content = base64.decodebytes(upload_data.base64_content.encode())
     except Error as e:
         return None, ErrorCodeAndMessageFormatter(INVALID_BASE_64, e)
-    file_name = '{}.zip'.format(requested_dir_path)
+    if os.path.isfile(requested_dir_path):
+        return None, PATH_EXISTS
 
+    archive_path = os.path.join(
+        os.path.dirname(requested_dir_path), ".{}.{}.archive".format(
+            os.path.basename(requested_dir_path),
+            uuid.uuid4().hex))
     try:
-        with open(file_name, 'wb') as f:
+        with open(archive_path, 'xb') as f:
             f.write(raw_content)
+        if not detect_archive_format(archive_path):
+            os.remove(archive_path)
+            return None, ErrorCodeAndMessageFormatter(
+                NOT_AN_ARCHIVE, "unsupported archive format")
+        created = not os.path.isdir(requested_dir_path)
+        os.makedirs(requested_dir_path, exist_ok=True)
     except OSError:
+        if os.path.exists(archive_path):
+            os.remove(archive_path)
         return None, UNEXPECTED_ERROR
+    write_extraction_status(requested_dir_path, EXTRACTION_EXTRACTING,
+                            archive_path=archive_path)
+    return ARCHIVE_EXTRACTOR.submit(archive_path, requested_dir_path,
+                                    created), None
+
+
+EXTRACTION_EXTRACTING = "Extracting"
+EXTRACTION_FAILED = "Failed"
+EXTRACTION_COMPLETED = "Completed"
+
+
+class ArchiveExtractor():
+    """ArchiveExtractor extracts uploaded archives in a background thread pool
+    of `ARCHIVE_EXTRACTION_WORKERS` threads, so that large archives do not
+    hold a request thread. Archives are extracted in a hidden directory, then
+    merged into their destination once complete."""
+
+    def __init__(self):
+        self._executor = None
+
+    def submit(self, archive_path: str, destination: str,
+               created: bool) -> Future:
+        if app.config["TESTING"]:
+            future = Future()
+            future.set_result(
+                extract_uploaded_archive(archive_path, destination, created))
+            return future
+
+        if not self._executor:
+            self._executor = ThreadPoolExecutor(
+                max_workers=app.config['ARCHIVE_EXTRACTION_WORKERS'])
+        return self._executor.submit(run_extract_uploaded_archive,
+                                     archive_path, destination, created)
+
+
+ARCHIVE_EXTRACTOR = ArchiveExtractor()
+
+
+def run_extract_uploaded_archive(archive_path: str, destination: str,
+                                 created: bool) -> ErrorCodeAndMessage:
+    with app.app_context():
+        try:
+            error = extract_uploaded_archive(archive_path, destination,
+                                             created)
+            if error:
+                logger = logging.getLogger('server-error')
+                logger.error("Extraction of '{}' failed: {}".format(
+                    destination, error.error_message))
+            return error
+        except Exception:
+            logger = logging.getLogger('server-error')
+            logger.error(traceback.format_exc())
+            write_extraction_status(
+                destination, EXTRACTION_FAILED, error=UNEXPECTED_ERROR)
+            return UNEXPECTED_ERROR
+
+
+def extract_uploaded_archive(archive_path: str, destination: str,
+                             created: bool) -> ErrorCodeAndMessage:
+    extraction_path = os.path.join(
+        os.path.dirname(destination), ".{}.{}.extract".format(
+            os.path.basename(destination),
+            uuid.uuid4().hex))
     try:
-        with zipfile.ZipFile(file_name, mode='r') as zf:
-            zf.extractall(path=requested_dir_path)
-    except zipfile.BadZipFile as e:
         try:
-            os.remove(file_name)
-        except:
-            pass
-        return None, ErrorCodeAndMessageFormatter(NOT_AN_ARCHIVE, e)
-    os.remove(file_name)
-    path = Path.object_from_pathname(requested_dir_path)
-    return path, None
+            error = extract_archive(archive_path, extraction_path,
+                                    app.config['MAX_ARCHIVE_ENTRIES'],
+                                    app.config['MAX_ARCHIVE_SIZE'],
+                                    is_safe_path)
+            if not error and os.path.isdir(extraction_path):
+                merge_directory(extraction_path, destination)
+        finally:
+            shutil.rmtree(extraction_path, ignore_errors=True)
+
+        if error and created:
+            try:
+                # Only removed if nothing was written to it in the meantime
+                os.rmdir(destination)
+            except OSError:
+                pass
+        PATH_SIZE_INDEX.invalidate(destination)
+        if error:
+            write_extraction_status(
+                destination, EXTRACTION_FAILED, error=error)
+        else:
+            remove_extraction_status(destination)
+            precompute_checksums_in_background(destination)
+    finally:
+        # Removed last, as an 'Extracting' status without archive means that
+        # the extraction was interrupted
+        os.remove(archive_path)
+    return error
+
+
+def get_extraction_status_path(destination: str) -> str:
+    """The status of the extraction of an archive is stored in a hidden file
+    next to its destination, which may be removed if the extraction
+    fails."""
+    return os.path.join(
+        os.path.dirname(destination), ".{}.extraction".format(
+            os.path.basename(destination)))
+
+
+def write_extraction_status(destination: str,
+                            status: str,
+                            error: ErrorCodeAndMessage = None,
+                            archive_path: str = None):
+    status_path = get_extraction_status_path(destination)
+    temp_status_path = "{}.{}.tmp".format(status_path, uuid.uuid4().hex)
+    try:
+        with open(temp_status_path, 'w') as status_file:
+            json.dump({
+                "status": status,
+                "error": error and ErrorCodeAndMessageMarshaller(error),
+                "archive": archive_path
+            }, status_file)
+        os.replace(temp_status_path, status_path)
+    except OSError:
+        if os.path.exists(temp_status_path):
+            os.remove(temp_status_path)
+
+
+def remove_extraction_status(destination: str):
+    try:
+        os.remove(get_extraction_status_path(destination))
+    except FileNotFoundError:
+        pass
+
+
+def get_extraction_status(destination: str) -> ArchiveExtraction:
+    """Returns the status of the extraction of the last archive uploaded to
+    `destination`. The status of a completed extraction is not kept:
+    'Completed' is returned when there is none."""
+    try:
+        with open(get_extraction_status_path(destination)) as status_file:
+            status = json.load(status_file)
+    except (OSError, ValueError):
+        return ArchiveExtraction(EXTRACTION_COMPLETED)
+
+    if status["status"] == EXTRACTION_EXTRACTING and not os.path.exists(
+            status["archive"]):
+        # The server stopped during the extraction
+        return ArchiveExtraction(EXTRACTION_FAILED, UNEXPECTED_ERROR)
+    error = status.get("error")
+    return ArchiveExtraction(
+        status["status"],
+        ErrorCodeAndMessage.schema.load(error).data if error else None)
 
 
 def create_directory(requested_data_path: str, path_required: bool = True
@@ -155,19 +442,16 @@ def create_directory(requested_data_path: str, path_required: bool = True
 
 
 def generate_md5(data_path: str) -> PathMD5:
-    hash_md5 = hashlib.md5()
-    with open(data_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_md5.update(chunk)
-    return PathMD5(hash_md5.hexdigest())
-
-
-def make_tarball(data_path: str) -> tarfile:
-    temp_file = os.path.join(tempfile.gettempdir(),
-                             os.path.basename(data_path)) + ".tar.gz"
-    with tarfile.open(temp_file, mode='w:gz') as archive:
-        archive.add(data_path, arcname=os.path.basename(data_path))
-    return temp_file
+    return PathMD5(get_file_checksum(data_path, "md5"))
+
+
+def generate_checksum(data_path: str,
+                      algorithm: str) -> (PathChecksum, ErrorCodeAndMessage):
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        return None, ErrorCodeAndMessageFormatter(INVALID_QUERY_PARAMETER,
+                                                  algorithm, 'algorithm')
+    return PathChecksum(algorithm, get_file_checksum(data_path,
+                                                     algorithm)), None
 
 
 def parent_dir_exists(requested_data_path: str) -> bool:
@@ -0,0 +1,144 @@
+"""The path size index keeps the size of every directory whose size was
+requested, so that the size of a directory does not require a walk of its
+whole subtree each time.
+
+Each directory is cached separately, with the total size of its own files
+and the list of its subdirectories, as long as its modification time is
+unchanged. Adding, removing or renaming an entry changes the modification
+time of its directory only, so the size of a directory is validated by
+checking the modification time of every directory of its subtree: a
+directory whose entries changed is scanned again, the others are not.
+
+Modifying a file in place does not change the modification time of its
+directory: after writing to a file of the data directory, the server touches
+its directory with `invalidate`, so that every server process scans it again.
+Running executions write to their files all along: their directories are not
+cached until they end. The least recently used directories are dropped once
+the index holds `PATH_SIZE_INDEX_SIZE` directories.
+"""
+import os
+try:
+    from os import scandir
+except ImportError:
+    from scandir import scandir
+import time
+import threading
+from collections import OrderedDict
+from server import app
+from server.resources.helpers.descriptor_store import is_descriptor_store
+from server.resources.helpers.pathnames import (
+    EXECUTIONS_DIRNAME, CARMIN_FILES_FOLDER, EXECUTION_RUNNING_FILENAME)
+
+# Directory timestamps are only updated every few milliseconds: a directory
+# modified less than this many nanoseconds ago may change again without its
+# modification time changing, and is not cached yet.
+RECENT_MODIFICATION_NS = 1000 * 1000 * 1000
+
+
+class PathSizeIndex():
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Directory path: (modification time, size of its own files, paths
+        # of its subdirectories)
+        self._sizes = OrderedDict()
+
+    def get_size(self, directory: str, cache: bool = None) -> int:
+        """Returns the size of all the files contained in `directory`
+        (recursively). Symbolic links to directories are not followed.
+        `cache` is False within the directory of a running execution."""
+        directory = os.path.abspath(directory)
+        if cache is None:
+            cache = not is_running_execution_path(directory)
+        mtime = os.stat(directory).st_mtime_ns
+        with self._lock:
+            cached = self._sizes.get(directory)
+            if cached and not cache:
+                del self._sizes[directory]
+            elif cached and cached[0] == mtime:
+                self._sizes.move_to_end(directory)
+        if cache and cached and cached[0] == mtime:
+            _, size, subdirectories = cached
+        else:
+            size, subdirectories = scan_directory(directory)
+            recent = time.time() * 1e9 - mtime < RECENT_MODIFICATION_NS
+            if cache and not recent:
+                self._store(directory, (mtime, size, subdirectories))
+
+        for subdirectory in subdirectories:
+            try:
+                size += self.get_size(
+                    subdirectory,
+                    cache and not is_running_execution_directory(subdirectory))
+            except OSError:
+                # The subdirectory was removed in the meantime
+                continue
+        return size
+
+    def _store(self, directory: str, entry: tuple):
+        with self._lock:
+            self._sizes[directory] = entry
+            self._sizes.move_to_end(directory)
+            while len(self._sizes) > app.config['PATH_SIZE_INDEX_SIZE']:
+                self._sizes.popitem(last=False)
+
+    def invalidate(self, path: str):
+        """Touches the directory of `path` (or `path` itself if it is a
+        directory), after one of its files was modified in place, so that its
+        size is computed again by every process."""
+        path = os.path.abspath(path)
+        directory = path if os.path.isdir(path) else os.path.dirname(path)
+        try:
+            os.utime(directory)
+        except OSError:
+            # The directory was removed
+            pass
+        with self._lock:
+            self._sizes.pop(path, None)
+            self._sizes.pop(directory, None)
+
+    def invalidate_tree(self, directory: str):
+        """Touches every directory of `directory`, after files of its whole
+        subtree were modified in place."""
+        for subdirectory, _, _ in os.walk(directory):
+            self.invalidate(subdirectory)
+
+
+def scan_directory(directory: str) -> (int, list):
+    """Returns the total size of the files of `directory`, and the paths of
+    its subdirectories."""
+    size = 0
+    subdirectories = []
+    for entry in scandir(directory):
+        try:
+            if not entry.is_dir():
+                size += entry.stat().st_size
+            elif not entry.is_symlink() and not is_descriptor_store(
+                    entry.path):
+                subdirectories.append(entry.path)
+        except OSError:
+            # The entry was removed, or is a broken link
+            continue
+    return size, subdirectories
+
+
+def is_running_execution_directory(directory: str) -> bool:
+    """Returns True if `directory` is the directory of a running execution,
+    which holds a running marker while its command runs."""
+    return (os.path.basename(os.path.dirname(directory)) == EXECUTIONS_DIRNAME
+            and os.path.exists(
+                os.path.join(directory, CARMIN_FILES_FOLDER,
+                             EXECUTION_RUNNING_FILENAME)))
+
+
+def is_running_execution_path(path: str) -> bool:
+    """Returns True if `path` is in the directory of a running execution."""
+    while True:
+        if is_running_execution_directory(path):
+            return True
+        parent = os.path.dirname(path)
+        if parent == path:
+            return False
+        path = parent
+
+
+PATH_SIZE_INDEX = PathSizeIndex()
@@ -1,7 +1,11 @@
 INPUTS_FILENAME = "inputs.json"
 EXECUTIONS_DIRNAME = "executions"
 DESCRIPTOR_FILENAME = "descriptor.json"
+DESCRIPTOR_HASH_FILENAME = "descriptor.sha256"
+DESCRIPTOR_STORE_DIRNAME = ".carmin-descriptors"
 CARMIN_FILES_FOLDER = ".carmin-files"
+EXECUTION_RUNNING_FILENAME = "running"
+OUTPUTS_MANIFEST_FILENAME = "outputs.json"
 
 STDOUT_FILENAME = "stdout.txt"
 STDERR_FILENAME = "stderr.txt"
@@ -0,0 +1,192 @@
+"""The pipeline registry keeps every CARMIN pipeline of the pipeline directory
+in memory, so that pipeline queries do not need any filesystem access.
+
+It is built once at start up (see `startup_validation.start_up`) and indexed
+by identifier, study and property. Updates swap a complete new index at once,
+so readers never see a partially updated registry.
+"""
+import os
+try:
+    from os import walk
+except ImportError:
+    from scandir import walk
+import json
+import logging
+import threading
+from typing import Dict, List
+from server import app
+from server.resources.models.pipeline import Pipeline, PipelineSchema
+from server.resources.models.descriptor.supported_descriptors import SUPPORTED_DESCRIPTORS
+
+
+class RegisteredPipeline():
+    """RegisteredPipeline is a pipeline loaded in the registry.
+
+    Attributes:
+        pipeline (Pipeline): The CARMIN pipeline.
+        path (str): Absolute path to the CARMIN pipeline file.
+        study_identifier (str): Study (subdirectory of the pipeline directory)
+        the pipeline belongs to. None for pipelines at the root of the
+        pipeline directory, which belong to every study.
+    """
+
+    def __init__(self,
+                 pipeline: Pipeline,
+                 path: str,
+                 study_identifier: str = None):
+        self.pipeline = pipeline
+        self.path = path
+        self.study_identifier = study_identifier
+
+
+class PipelineIndex():
+    """PipelineIndex is an immutable snapshot of the registry content."""
+
+    def __init__(self, pipeline_directory: str = None,
+                 entries: Dict[str, RegisteredPipeline] = None):
+        self.pipeline_directory = pipeline_directory
+        self.entries = entries or {}
+        self.by_identifier = {}
+        self.by_study = {}
+        self.by_property = {}
+
+        for path in sorted(self.entries):
+            entry = self.entries[path]
+            self.by_identifier.setdefault(entry.pipeline.identifier,
+                                          []).append(entry)
+            self.by_study.setdefault(entry.study_identifier, []).append(entry)
+            for pipeline_property in entry.pipeline.properties or {}:
+                self.by_property.setdefault(pipeline_property,
+                                            []).append(entry)
+
+
+class PipelineRegistry():
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = PipelineIndex()
+
+    def load(self, pipeline_directory: str):
+        """Loads every CARMIN pipeline found in `pipeline_directory`, replacing
+        the current content of the registry."""
+        entries = {}
+        for subdir, dirs, files in walk(pipeline_directory):
+            # We exclude the descriptor folders as they include the
+            # original, non-converted descriptors
+            dirs[:] = [
+                i for i in dirs if i not in SUPPORTED_DESCRIPTORS.keys()
+            ]
+            for file in files:
+                path = os.path.join(subdir, file)
+                entry = self._load_entry(pipeline_directory, path)
+                if entry:
+                    entries[entry.path] = entry
+
+        with self._lock:
+            self._index = PipelineIndex(pipeline_directory, entries)
+
+    def ensure_loaded(self):
+        """Loads the registry if it was not built for the current
+        PIPELINE_DIRECTORY."""
+        pipeline_directory = app.config['PIPELINE_DIRECTORY']
+        if self._index.pipeline_directory != pipeline_directory:
+            self.load(pipeline_directory)
+
+    def update(self, path: str) -> bool:
+        """Reloads a single CARMIN pipeline file. The pipeline is removed from
+        the registry if the file does not exist or is invalid."""
+        self.ensure_loaded()
+        with self._lock:
+            index = self._index
+            entries = dict(index.entries)
+            entries.pop(os.path.realpath(path), None)
+            entry = self._load_entry(index.pipeline_directory, path)
+            if entry:
+                entries[entry.path] = entry
+            self._index = PipelineIndex(index.pipeline_directory, entries)
+        return entry is not None
+
+    def remove(self, path: str):
+        self.ensure_loaded()
+        with self._lock:
+            index = self._index
+            entries = dict(index.entries)
+            if entries.pop(os.path.realpath(path), None):
+                self._index = PipelineIndex(index.pipeline_directory, entries)
+
+    def find(self,
+             pipeline_identifier: str = None,
+             study_identifier: str = None,
+             pipeline_property: str = None,
+             property_value: str = None) -> List[RegisteredPipeline]:
+        self.ensure_loaded()
+        index = self._index
+
+        if pipeline_identifier:
+            candidates = index.by_identifier.get(pipeline_identifier, [])
+        elif pipeline_property:
+            candidates = index.by_property.get(pipeline_property, [])
+        elif study_identifier:
+            candidates = (index.by_study.get(None, []) +
+                          index.by_study.get(study_identifier, []))
+        else:
+            candidates = [index.entries[p] for p in sorted(index.entries)]
+
+        return [
+            entry for entry in candidates
+            if self._matches(entry, study_identifier, pipeline_property,
+                             property_value)
+        ]
+
+    def get(self, pipeline_identifier: str) -> RegisteredPipeline:
+        """Returns the pipeline found at the root of the pipeline directory
+        with the given identifier, or None."""
+        self.ensure_loaded()
+        for entry in self._index.by_identifier.get(pipeline_identifier, []):
+            if entry.study_identifier is None:
+                return entry
+        return None
+
+    @staticmethod
+    def _matches(entry: RegisteredPipeline, study_identifier: str,
+                 pipeline_property: str, property_value: str) -> bool:
+        if study_identifier and entry.study_identifier not in (
+                None, study_identifier):
+            return False
+        properties = entry.pipeline.properties or {}
+        if pipeline_property:
+            if pipeline_property not in properties:
+                return False
+            if property_value and property_value != properties[pipeline_property]:
+                return False
+        return True
+
+    @staticmethod
+    def _load_entry(pipeline_directory: str, path: str) -> RegisteredPipeline:
+        filename = os.path.basename(path)
+        if filename.startswith(".") or not filename.endswith(".json"):
+            return None
+
+        real_path = os.path.realpath(path)
+        if not os.path.isfile(real_path):
+            return None
+        try:
+            with open(real_path) as pipeline_json:
+                pipeline, errors = PipelineSchema().load(
+                    json.load(pipeline_json))
+        except (OSError, ValueError):
+            errors = True
+        if errors:
+            # We log the invalid pipeline, but just continue instead of crashing
+            logger = logging.getLogger('server-error')
+            logger.error("Invalid pipeline at {}".format(path))
+            return None
+
+        relative_dir = os.path.relpath(
+            os.path.dirname(os.path.abspath(path)), pipeline_directory)
+        study_identifier = None
+        if relative_dir != os.curdir:
+            study_identifier = relative_dir.split(os.sep)[0]
+        return RegisteredPipeline(pipeline, real_path, study_identifier)
+
+
+PIPELINE_REGISTRY = PipelineRegistry()
@@ -0,0 +1,158 @@
+"""The pipeline watcher keeps the pipeline registry up to date with the
+descriptors found in `PIPELINE_DIRECTORY/<descriptor_type>/`.
+
+When a descriptor is added or modified, only that descriptor is exported
+again and its CARMIN pipeline is swapped in the registry. When a descriptor is
+removed, its CARMIN pipeline is removed as well.
+
+Changes are detected with inotify when `inotify_simple` is installed, and by
+polling the modification times of the descriptors otherwise.
+
+When the server runs several processes, only one of them exports the
+descriptors. The other ones keep their registry up to date by watching the
+exported CARMIN pipelines, with a `PipelineRegistryWatcher`.
+"""
+import os
+try:
+    from os import scandir
+except ImportError:
+    from scandir import scandir
+import logging
+import threading
+from typing import Dict, Tuple
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+from server import app
+from server.resources.models.descriptor.supported_descriptors import SUPPORTED_DESCRIPTORS
+from server.resources.helpers.pipeline_registry import PIPELINE_REGISTRY
+from server.resources.helpers.pipelines import (
+    export_pipeline, get_carmin_pipeline_path, get_export_hash_path)
+
+
+class PipelineWatcher(threading.Thread):
+    def __init__(self, pipeline_directory: str, poll_interval: float = 5):
+        super().__init__(name="pipeline-watcher", daemon=True)
+        self.pipeline_directory = pipeline_directory
+        self.poll_interval = poll_interval
+        self._stop_event = threading.Event()
+        self._descriptors = self.scan()
+
+    def run(self):
+        if INotify:
+            try:
+                self._watch_inotify()
+                return
+            except OSError:
+                # inotify is not available on this system, or the watch
+                # limit was reached.
+                pass
+        while not self._stop_event.wait(self.poll_interval):
+            self.poll()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def watched_directories(self) -> Dict[str, str]:
+        """Returns the watched directories, keyed by descriptor type."""
+        return {
+            descriptor_type: os.path.join(self.pipeline_directory,
+                                          descriptor_type)
+            for descriptor_type in SUPPORTED_DESCRIPTORS
+        }
+
+    def is_watched(self, entry) -> bool:
+        return not entry.name.startswith(".") and entry.is_file()
+
+    def scan(self) -> Dict[str, Tuple[str, int, int]]:
+        """Returns the modification time and size of every descriptor, keyed
+        by descriptor path."""
+        descriptors = {}
+        for descriptor_type, descriptor_dir in self.watched_directories(
+        ).items():
+            try:
+                entries = list(scandir(descriptor_dir))
+            except OSError:
+                continue
+            for entry in entries:
+                if not self.is_watched(entry):
+                    continue
+                stat = entry.stat()
+                descriptors[entry.path] = (descriptor_type, stat.st_mtime_ns,
+                                           stat.st_size)
+        return descriptors
+
+    def poll(self):
+        """Compares the descriptors with the ones of the previous scan and
+        reloads the ones that changed."""
+        descriptors = self.scan()
+        for path, descriptor in descriptors.items():
+            if self._descriptors.get(path) != descriptor:
+                self.descriptor_changed(descriptor[0], path)
+        for path, descriptor in self._descriptors.items():
+            if path not in descriptors:
+                self.descriptor_removed(descriptor[0], path)
+        self._descriptors = descriptors
+
+    def descriptor_changed(self, descriptor_type: str, descriptor_path: str):
+        carmin_pipeline, error = export_pipeline(descriptor_type,
+                                                 descriptor_path)
+        if error:
+            logger = logging.getLogger('server-error')
+            logger.error(error)
+            return
+        PIPELINE_REGISTRY.update(carmin_pipeline)
+
+    def descriptor_removed(self, descriptor_type: str, descriptor_path: str):
+        carmin_pipeline = get_carmin_pipeline_path(descriptor_type,
+                                                   descriptor_path)
+        for path in [carmin_pipeline, get_export_hash_path(carmin_pipeline)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        PIPELINE_REGISTRY.remove(carmin_pipeline)
+
+    def _watch_inotify(self):
+        inotify = INotify()
+        watch_flags = (flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM
+                       | flags.DELETE)
+        for directory in self.watched_directories().values():
+            inotify.add_watch(directory, watch_flags)
+
+        try:
+            while not self._stop_event.is_set():
+                # Events are only used as a trigger: the modification times
+                # tell which descriptors actually changed.
+                if inotify.read(timeout=int(self.poll_interval * 1000)):
+                    self.poll()
+        finally:
+            inotify.close()
+
+
+class PipelineRegistryWatcher(PipelineWatcher):
+    """PipelineRegistryWatcher reloads the CARMIN pipelines exported by the
+    pipeline watcher of another process."""
+
+    def watched_directories(self) -> Dict[str, str]:
+        return {None: self.pipeline_directory}
+
+    def is_watched(self, entry) -> bool:
+        return super().is_watched(entry) and entry.name.endswith(".json")
+
+    def descriptor_changed(self, descriptor_type: str, carmin_pipeline: str):
+        PIPELINE_REGISTRY.update(carmin_pipeline)
+
+    def descriptor_removed(self, descriptor_type: str, carmin_pipeline: str):
+        PIPELINE_REGISTRY.remove(carmin_pipeline)
+
+
+def start_pipeline_watcher(export: bool = True) -> PipelineWatcher:
+    """Starts watching the pipeline directory. Without `export`, only the
+    exported CARMIN pipelines are watched."""
+    watcher_class = PipelineWatcher if export else PipelineRegistryWatcher
+    watcher = watcher_class(app.config['PIPELINE_DIRECTORY'],
+                            app.config['PIPELINE_WATCH_INTERVAL'])
+    watcher.start()
+    return watcher
@@ -1,18 +1,20 @@
 import os
 try:
-    from os import scandir, walk
+    from os import scandir
 except ImportError:
-    from scandir import scandir, walk
+    from scandir import scandir
 import json
+import time
+import hashlib
 import logging
-from boutiques import bosh
+from multiprocessing import Pool
 from server import app
 from server.resources.models.descriptor.descriptor_abstract import Descriptor
 from server.resources.models.descriptor.supported_descriptors import SUPPORTED_DESCRIPTORS
-from server.resources.models.pipeline import Pipeline, PipelineSchema
+from server.resources.models.pipeline import Pipeline
+from server.resources.helpers.pipeline_registry import PIPELINE_REGISTRY
 from server.common.error_codes_and_messages import (
-    ErrorCodeAndMessageAdditionalDetails, ErrorCodeAndMessageFormatter,
-    INVALID_PIPELINE_IDENTIFIER, UNEXPECTED_ERROR, PATH_DOES_NOT_EXIST)
+    INVALID_PIPELINE_IDENTIFIER, PATH_DOES_NOT_EXIST)
 from server.resources.models.error_code_and_message import ErrorCodeAndMessage
 
 
@@ -20,37 +22,12 @@ def pipelines(pipeline_identifier: str = None,
               study_identifier: str = None,
               pipeline_property: str = None,
               property_value: str = None):
-    response = []
-    pipeline_path = app.config['PIPELINE_DIRECTORY']
-    for subdir, dirs, files in walk(pipeline_path):
-        if study_identifier:
-            dirs[:] = [i for i in dirs if i == study_identifier]
-
-        # We exclude the descriptor folders as they include the
-        # original, non-converted descriptors
-        dirs[:] = [i for i in dirs if i not in SUPPORTED_DESCRIPTORS.keys()]
-
-        for file in files:
-            real_path = os.path.realpath(os.path.join(subdir, file))
-            if file.endswith(".json"):
-                with open(real_path) as pipeline_json:
-                    pipeline, errors = PipelineSchema().load(
-                        json.load(pipeline_json))
-                    if errors:
-                        return ErrorCodeAndMessageAdditionalDetails(
-                            UNEXPECTED_ERROR, errors)
-                    else:
-                        response.append(pipeline)
-    if pipeline_property:
-        response = [i for i in response if pipeline_property in i.properties]
-        if property_value:
-            response = [
-                i for i in response
-                if property_value == i.properties[pipeline_property]
-            ]
-    if pipeline_identifier:
-        response = [i for i in response if pipeline_identifier == i.identifier]
-    return response
+    return [
+        entry.pipeline
+        for entry in PIPELINE_REGISTRY.find(
+            pipeline_identifier, study_identifier, pipeline_property,
+            property_value)
+    ]
 
 
 def get_all_pipelines(_type: str = None) -> list:
@@ -69,40 +46,153 @@ def get_all_pipelines(_type: str = None) -> list:
 
 def get_pipeline(pipeline_identifier: str,
                  only_path: bool = False) -> Pipeline:
-    all_pipelines = get_all_pipelines()
+    """Returns the pipeline with the given identifier from the pipeline
+    registry, or its path if `only_path` is True."""
+    entry = PIPELINE_REGISTRY.get(pipeline_identifier)
+    if not entry:
+        return None
+    return entry.path if only_path else entry.pipeline
 
-    for pipeline in all_pipelines:
-        with open(pipeline.path) as f:
-            try:
-                pipeline_json = json.load(f)
-                if pipeline_json["identifier"] == pipeline_identifier:
-                    return pipeline if only_path else PipelineSchema().load(
-                        pipeline_json).data
-            except json.JSONDecodeError:
-                # We log the invalid pipeline, but just continue instead of crashing
-                logger = logging.getLogger('server-error')
-                logger.error("Invalid pipeline at {}".format(pipeline.path))
 
-    return None
+def load_all_pipelines():
+    PIPELINE_REGISTRY.load(app.config['PIPELINE_DIRECTORY'])
 
 
 def export_all_pipelines() -> (bool, str):
-    for descriptor_type in SUPPORTED_DESCRIPTORS:
-        all_pipelines = get_all_pipelines(descriptor_type)
-
-        for pipeline in all_pipelines:
-            carmin_pipeline = os.path.join(app.config['PIPELINE_DIRECTORY'],
-                                           "{}_{}".format(
-                                               descriptor_type, pipeline.name))
-
-            descriptor = Descriptor.descriptor_factory_from_type(
-                descriptor_type)
-            export, error = descriptor.export(pipeline.path, carmin_pipeline)
-            if error:
-                return False, error
+    """Exports all the descriptors of the pipeline directory across a pool
+    of processes. Descriptors whose CARMIN pipeline is up to date are
+    skipped."""
+    export_tasks = [(descriptor_type, pipeline.path)
+                    for descriptor_type in SUPPORTED_DESCRIPTORS
+                    for pipeline in get_all_pipelines(descriptor_type)]
+
+    start_time = time.time()
+    if len(export_tasks) > 1:
+        with Pool(processes=app.config['PIPELINE_EXPORT_WORKERS']) as pool:
+            export_results = pool.starmap(timed_export_pipeline, export_tasks)
+    else:
+        export_results = [
+            timed_export_pipeline(*task) for task in export_tasks
+        ]
+
+    logger = logging.getLogger('server-startup')
+    first_error = None
+    for descriptor_path, exported, duration, error in export_results:
+        if error:
+            logger.error("Export failed for '{}' after {:.3f}s".format(
+                descriptor_path, duration))
+            first_error = first_error or error
+        elif exported:
+            logger.info("Exported '{}' in {:.3f}s".format(
+                descriptor_path, duration))
+        else:
+            logger.info("Skipped up to date '{}' in {:.3f}s".format(
+                descriptor_path, duration))
+    logger.info("Exported {} of {} descriptors in {:.3f}s".format(
+        len([r for r in export_results if r[1]]), len(export_results),
+        time.time() - start_time))
+
+    if first_error:
+        return False, first_error
     return True, None
 
 
+def timed_export_pipeline(descriptor_type: str,
+                          descriptor_path: str) -> (str, bool, float, str):
+    start_time = time.time()
+    _, exported, error = export_outdated_pipeline(descriptor_type,
+                                                  descriptor_path)
+    return descriptor_path, exported, time.time() - start_time, error
+
+
+def export_pipeline(descriptor_type: str,
+                    descriptor_path: str) -> (str, str):
+    """Exports a single descriptor to its CARMIN pipeline, at the root of the
+    pipeline directory. Returns the path to the CARMIN pipeline."""
+    carmin_pipeline, _, error = export_outdated_pipeline(
+        descriptor_type, descriptor_path)
+    return carmin_pipeline, error
+
+
+def export_outdated_pipeline(descriptor_type: str,
+                             descriptor_path: str) -> (str, bool, str):
+    """Exports the descriptor unless its CARMIN pipeline was exported from the
+    same descriptor content, by the same exporter version, and was not
+    modified since, in which case the export is skipped. Returns the path to
+    the CARMIN pipeline and whether the export happened."""
+    carmin_pipeline = get_carmin_pipeline_path(descriptor_type,
+                                               descriptor_path)
+    descriptor = Descriptor.descriptor_factory_from_type(descriptor_type)
+    try:
+        export_key = [
+            get_file_hash(descriptor_path),
+            descriptor.exporter_version()
+        ]
+    except OSError:
+        return None, False, "Descriptor at '{}' could not be read.".format(
+            descriptor_path)
+
+    hash_path = get_export_hash_path(carmin_pipeline)
+    stored_hash = read_export_hash(hash_path)
+    if stored_hash[:2] == export_key:
+        try:
+            if stored_hash[2] == get_file_hash(carmin_pipeline):
+                return carmin_pipeline, False, None
+        except OSError:
+            pass
+
+    export, error = descriptor.export(descriptor_path, carmin_pipeline)
+    if error:
+        return None, False, error
+
+    try:
+        write_export_hash(hash_path,
+                          export_key + [get_file_hash(carmin_pipeline)])
+    except OSError:
+        # The pipeline will simply be exported again next time
+        pass
+    return carmin_pipeline, True, None
+
+
+def read_export_hash(hash_path: str) -> list:
+    """Returns the hash of the descriptor, the exporter version and the hash
+    of the CARMIN pipeline stored at the last export, one per line."""
+    try:
+        with open(hash_path) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return []
+    return lines if len(lines) == 3 else []
+
+
+def write_export_hash(hash_path: str, export_hash: list):
+    with open(hash_path, 'w') as f:
+        f.write("\n".join(export_hash) + "\n")
+
+
+def get_file_hash(path: str) -> str:
+    hash_sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            hash_sha256.update(chunk)
+    return hash_sha256.hexdigest()
+
+
+def get_export_hash_path(carmin_pipeline_path: str) -> str:
+    """The hash of the descriptor a CARMIN pipeline was exported from is
+    stored in a hidden file next to the CARMIN pipeline, along with the
+    exporter version and the hash of the CARMIN pipeline."""
+    return os.path.join(
+        os.path.dirname(carmin_pipeline_path),
+        ".{}.sha256".format(os.path.basename(carmin_pipeline_path)))
+
+
+def get_carmin_pipeline_path(descriptor_type: str,
+                             descriptor_path: str) -> str:
+    return os.path.join(app.config['PIPELINE_DIRECTORY'], "{}_{}".format(
+        descriptor_type, os.path.basename(descriptor_path)))
+
+
 def get_original_descriptor_path_and_type(
         pipeline_identifier: str) -> ((str, str), ErrorCodeAndMessage):
 
@@ -111,10 +201,10 @@ def get_original_descriptor_path_and_type(
     if not carmin_descriptor_path:
         return (None, None), INVALID_PIPELINE_IDENTIFIER
 
-    descriptor_type = carmin_descriptor_path.name[:carmin_descriptor_path.name.
-                                                  index("_")]
-    original_descriptor_filename = carmin_descriptor_path.name[
-        carmin_descriptor_path.name.index("_") + 1:]
+    carmin_descriptor_name = os.path.basename(carmin_descriptor_path)
+    descriptor_type = carmin_descriptor_name[:carmin_descriptor_name.index("_")]
+    original_descriptor_filename = carmin_descriptor_name[
+        carmin_descriptor_name.index("_") + 1:]
     original_descriptor_path = os.path.join(app.config['PIPELINE_DIRECTORY'],
                                             descriptor_type,
                                             original_descriptor_filename)
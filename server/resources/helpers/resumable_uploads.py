@@ -0,0 +1,246 @@
+"""Resumable uploads send a file in several `PUT /path/{completePath}`
+requests, each with an `application/octet-stream` body and a
+`Content-Range: bytes <first>-<last>/<size>` header. A failed request only
+requires its chunk to be sent again.
+
+The data received so far is kept in an upload session, under the hidden
+`.uploads` directory of the user, until the last chunk is received. The
+file is then renamed into place. A `Content-Range: bytes */<size>` request
+without body returns the range received so far, so that a client can find
+where to resume. Every chunk can be checked with a `Content-MD5` header.
+
+The requests of a session hold an exclusive lock on it, taken on a lock file
+next to its directory, so that the chunks of a session are written one at a
+time, whichever server process receives them. Sessions without a new chunk
+for `UPLOAD_SESSION_TTL` seconds are abandoned: they are deleted when the
+user starts another upload, and at start up.
+"""
+import os
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+import json
+import time
+import shutil
+import base64
+import hashlib
+from contextlib import contextmanager
+from werkzeug.http import parse_content_range_header
+from server import app
+from server.common.error_codes_and_messages import (
+    ErrorCodeAndMessageFormatter, INVALID_CONTENT_RANGE,
+    UPLOAD_OFFSET_MISMATCH, INCOMPLETE_CHUNK, CHUNK_CHECKSUM_MISMATCH,
+    UNEXPECTED_ERROR)
+from server.resources.models.error_code_and_message import ErrorCodeAndMessage
+from server.resources.helpers.path_sizes import PATH_SIZE_INDEX
+
+UPLOADS_DIRNAME = ".uploads"
+SESSION_FILENAME = "session.json"
+PART_FILENAME = "data.part"
+LOCK_EXTENSION = ".lock"
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadSession():
+    """UploadSession is the state of a resumable upload.
+
+    Attributes:
+        directory (str): Directory holding the state of the session.
+        target_path (str): Absolute path of the uploaded file.
+        size (int): Size of the complete file, in bytes.
+    """
+
+    def __init__(self, directory: str, target_path: str, size: int):
+        self.directory = directory
+        self.target_path = target_path
+        self.size = size
+
+    @property
+    def part_path(self) -> str:
+        return os.path.join(self.directory, PART_FILENAME)
+
+    @property
+    def offset(self) -> int:
+        """Number of bytes received so far."""
+        try:
+            return os.path.getsize(self.part_path)
+        except FileNotFoundError:
+            return 0
+
+    @property
+    def complete(self) -> bool:
+        return self.offset == self.size
+
+    def delete(self):
+        """Deletes the session. Its lock must be held."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        try:
+            os.remove(self.directory + LOCK_EXTENSION)
+        except FileNotFoundError:
+            pass
+        PATH_SIZE_INDEX.invalidate(self.directory)
+
+
+def get_upload_session_directory(user_data_directory: str,
+                                 target_path: str) -> str:
+    # Sessions are named after their target, so that clients can resume an
+    # upload without keeping track of a session identifier
+    session_id = hashlib.sha256(target_path.encode()).hexdigest()
+    return os.path.join(user_data_directory, UPLOADS_DIRNAME, session_id)
+
+
+@contextmanager
+def lock_upload_session(user_data_directory: str, target_path: str,
+                        blocking: bool = True):
+    """Holds the exclusive lock of the upload session of `target_path`.
+    Yields False if `blocking` is False and the lock is held by another
+    request."""
+    directory = get_upload_session_directory(user_data_directory,
+                                             target_path)
+    if not fcntl:
+        yield True
+        return
+    lock_path = directory + LOCK_EXTENSION
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    while True:
+        with open(lock_path, 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX
+                            if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            # The lock file is removed with its session, possibly while this
+            # request was waiting for it
+            try:
+                locked = (os.fstat(lock_file.fileno()).st_ino ==
+                          os.stat(lock_path).st_ino)
+            except FileNotFoundError:
+                locked = False
+            if locked:
+                yield True
+                return
+
+
+def get_or_create_upload_session(user_data_directory: str, target_path: str,
+                                 size: int) -> UploadSession:
+    """Returns the upload session of `target_path`. A new session is started
+    if there is none, or if the existing one is for a file of another size.
+    The lock of the session must be held."""
+    directory = get_upload_session_directory(user_data_directory,
+                                             target_path)
+    session_file_path = os.path.join(directory, SESSION_FILENAME)
+    try:
+        with open(session_file_path) as session_file:
+            session = json.load(session_file)
+        if session["size"] == size:
+            return UploadSession(directory, target_path, size)
+    except (OSError, ValueError, KeyError):
+        pass
+
+    delete_expired_upload_sessions(user_data_directory)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    with open(session_file_path, 'w') as session_file:
+        json.dump({"path": target_path, "size": size}, session_file)
+    open(os.path.join(directory, PART_FILENAME), 'wb').close()
+    return UploadSession(directory, target_path, size)
+
+
+def delete_expired_upload_sessions(user_data_directory: str):
+    """Deletes the sessions of the user without a new chunk for
+    `UPLOAD_SESSION_TTL` seconds. Sessions in use are left alone."""
+    uploads_directory = os.path.join(user_data_directory, UPLOADS_DIRNAME)
+    expiration_time = time.time() - app.config['UPLOAD_SESSION_TTL']
+    try:
+        session_files = [
+            os.path.join(uploads_directory, name, SESSION_FILENAME)
+            for name in os.listdir(uploads_directory)
+            if not name.endswith(LOCK_EXTENSION)
+        ]
+    except FileNotFoundError:
+        return
+    for session_file_path in session_files:
+        try:
+            with open(session_file_path) as session_file:
+                session = json.load(session_file)
+            directory = os.path.dirname(session_file_path)
+            part_path = os.path.join(directory, PART_FILENAME)
+            if os.path.getmtime(part_path) > expiration_time:
+                continue
+            with lock_upload_session(user_data_directory, session["path"],
+                                     blocking=False) as locked:
+                if (locked and os.path.getmtime(part_path) <= expiration_time):
+                    UploadSession(directory, session["path"],
+                                  session["size"]).delete()
+        except (OSError, ValueError, KeyError):
+            continue
+
+
+def parse_upload_content_range(content_range_header: str):
+    """Returns the first byte, the end (exclusive) and the total size of the
+    chunk described by a Content-Range header. First byte and end are None
+    for a `bytes */<size>` status request."""
+    content_range = parse_content_range_header(content_range_header)
+    if (not content_range or content_range.units != "bytes"
+            or content_range.length is None
+            or (content_range.stop or 0) > content_range.length):
+        return (None, None, None), ErrorCodeAndMessageFormatter(
+            INVALID_CONTENT_RANGE, content_range_header)
+    return (content_range.start, content_range.stop,
+            content_range.length), None
+
+
+def write_chunk(session: UploadSession, stream, start: int, stop: int,
+                content_md5: str = None) -> ErrorCodeAndMessage:
+    """Appends the chunk read from `stream` to the upload session. The chunk
+    is dropped if it is incomplete or does not match its checksum."""
+    offset = session.offset
+    if start != offset:
+        return ErrorCodeAndMessageFormatter(UPLOAD_OFFSET_MISMATCH, offset)
+
+    chunk_md5 = hashlib.md5()
+    written = 0
+    try:
+        with open(session.part_path, 'r+b') as part_file:
+            part_file.seek(offset)
+            try:
+                expected = stop - start
+                while written < expected:
+                    data = stream.read(min(CHUNK_SIZE, expected - written))
+                    if not data:
+                        break
+                    part_file.write(data)
+                    chunk_md5.update(data)
+                    written += len(data)
+
+                if written != expected:
+                    error = ErrorCodeAndMessageFormatter(
+                        INCOMPLETE_CHUNK, written, expected)
+                elif content_md5 and base64.b64encode(
+                        chunk_md5.digest()).decode() != content_md5:
+                    error = CHUNK_CHECKSUM_MISMATCH
+                else:
+                    error = None
+            except Exception:
+                # The client disconnected in the middle of the chunk
+                part_file.truncate(offset)
+                raise
+            if error:
+                part_file.truncate(offset)
+    except OSError:
+        return UNEXPECTED_ERROR
+    PATH_SIZE_INDEX.invalidate(session.part_path)
+    return error
+
+
+def finalize_upload(session: UploadSession) -> ErrorCodeAndMessage:
+    """Moves the complete file to its target path and ends the session."""
+    try:
+        os.replace(session.part_path, session.target_path)
+    except OSError:
+        return UNEXPECTED_ERROR
+    session.delete()
+    PATH_SIZE_INDEX.invalidate(session.target_path)
+    return None
@@ -1,12 +1,32 @@
-from flask import Response
+"""Standard output and error of executions can be read incrementally while
+the execution runs.
+
+`GET /executions/{id}/stdout` accepts `Range` headers, or an `offset` query
+parameter which returns everything written after `offset` bytes, along with
+the `X-Next-Offset` header to use for the next request. With `follow=true`,
+the response is sent in chunks as the execution writes, until it stops
+running or the stream is closed after `STREAM_MAX_DURATION` seconds (see
+`server.resources.helpers.streams`).
+"""
+import os
+import time
+from flask import Response, request, send_file, stream_with_context
+from server import app
 from server.database import db
 from server.common.utils import marshal
 from server.common.error_codes_and_messages import (
-    ErrorCodeAndMessageFormatter, EXECUTION_NOT_FOUND, UNAUTHORIZED)
+    ErrorCodeAndMessageFormatter, EXECUTION_NOT_FOUND, UNAUTHORIZED,
+    PATH_DOES_NOT_EXIST)
+from server.database.models.execution import (Execution as ExecutionDB,
+                                              ExecutionStatus)
 from server.database.queries.executions import get_execution
 from server.resources.helpers.executions import (
-    get_execution_as_model, get_std_file, STDERR_FILENAME, is_safe_for_get)
-from server.resources.decorators import login_required
+    std_file_path, is_safe_for_get, query_converter)
+from server.resources.helpers.streams import (STREAM_SLOTS, Stream,
+                                              too_many_streams)
+
+STD_CHUNK_SIZE = 64 * 1024
+FOLLOWED_STATUSES = [ExecutionStatus.Queued, ExecutionStatus.Running]
 
 
 def std_file_resource(user, execution_identifier, path_to_file):
@@ -17,16 +37,72 @@ def std_file_resource(user, execution_identifier, path_to_file):
         return marshal(error), 400
 
     if not is_safe_for_get(user, execution_db):
-        return UNAUTHORIZED
+        return marshal(UNAUTHORIZED), 400
 
-    execution, error = get_execution_as_model(execution_db.creator_username,
-                                              execution_db)
-    if error:
-        return marshal(error), 400
+    file_path = std_file_path(execution_db.creator_username,
+                              execution_identifier, path_to_file)
+    if not os.path.isfile(file_path):
+        return marshal(PATH_DOES_NOT_EXIST), 400
+
+    offset = request.args.get('offset', type=query_converter)
+    follow = request.args.get(
+        'follow', default='', type=str).lower() in ('1', 'true')
+
+    if follow:
+        stream = STREAM_SLOTS.open_stream()
+        if not stream:
+            return too_many_streams()
+        response = Response(
+            stream_with_context(
+                follow_std_file(file_path, execution_identifier, offset or 0,
+                                stream)),
+            mimetype='text/plain')
+        response.call_on_close(stream.close)
+        return response
+
+    if offset is None:
+        # Conditional responses handle the `Range` header
+        return send_file(file_path, mimetype='text/plain', conditional=True)
+
+    size = os.path.getsize(file_path)
+    response = Response(
+        read_std_file(file_path, offset, size), mimetype='text/plain')
+    response.headers['X-Next-Offset'] = max(offset, size)
+    return response
+
+
+def read_std_file(file_path: str, start: int, stop: int):
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            chunk = f.read(min(STD_CHUNK_SIZE, remaining))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+
+def follow_std_file(file_path: str, execution_identifier: str, offset: int,
+                    stream: Stream):
+    """Yields what is written to the file after `offset`, until the
+    execution stops running or `stream` is closed."""
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        while True:
+            # The status is read first, so that nothing written before the
+            # execution stopped is missed
+            running = is_execution_running(execution_identifier)
+            for chunk in iter(lambda: f.read(STD_CHUNK_SIZE), b""):
+                yield chunk
+            if not running or not stream.is_open():
+                return
+            time.sleep(app.config['STD_FOLLOW_INTERVAL'])
 
-    std, error = get_std_file(user.username, execution_identifier,
-                              path_to_file)
-    if error:
-        return marshal(error), 400
 
-    return Response(std, mimetype='text/plain')
+def is_execution_running(execution_identifier: str) -> bool:
+    status = db.session.query(ExecutionDB.status).filter_by(
+        identifier=execution_identifier).scalar()
+    # Ends the transaction, so that the next query sees the new status
+    db.session.commit()
+    return status in FOLLOWED_STATUSES
@@ -0,0 +1,69 @@
+"""Streamed responses, such as the execution event stream and the followed
+standard output of executions, hold a server thread for as long as the client
+stays connected.
+
+So that streams cannot take every thread of a worker, each worker process
+serves at most `MAX_STREAMS_PER_WORKER` streams at a time, and further
+streams are refused with a 503 response and a `Retry-After` header. A stream
+is also closed after `STREAM_MAX_DURATION` seconds, or when its worker
+process is stopping, so that reloading the workers does not wait for the
+streams to end. Clients resume a closed stream by reconnecting.
+"""
+import time
+import threading
+from server import app
+from server.common.utils import marshal
+from server.common.error_codes_and_messages import TOO_MANY_STREAMS
+
+# Seconds after which a refused client should try again
+STREAM_RETRY_AFTER = 5
+
+# Set when the worker process is stopping
+STREAMS_STOPPING = threading.Event()
+
+
+class Stream():
+    def __init__(self, slots: 'StreamSlots'):
+        self._slots = slots
+        self._closed = False
+        self.deadline = time.monotonic() + app.config['STREAM_MAX_DURATION']
+
+    def is_open(self) -> bool:
+        return (not self._closed and not STREAMS_STOPPING.is_set()
+                and time.monotonic() < self.deadline)
+
+    def remaining(self) -> float:
+        return max(self.deadline - time.monotonic(), 0)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._slots.release()
+
+
+class StreamSlots():
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._count = 0
+
+    def open_stream(self) -> Stream:
+        """Returns a new stream, or None if too many streams are open. The
+        stream must be closed when its response is."""
+        with self._lock:
+            if self._count >= app.config['MAX_STREAMS_PER_WORKER']:
+                return None
+            self._count += 1
+        return Stream(self)
+
+    def release(self):
+        with self._lock:
+            self._count -= 1
+
+
+STREAM_SLOTS = StreamSlots()
+
+
+def too_many_streams():
+    return marshal(TOO_MANY_STREAMS), 503, {
+        'Retry-After': STREAM_RETRY_AFTER
+    }
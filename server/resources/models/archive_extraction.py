@@ -0,0 +1,41 @@
+from marshmallow import Schema, fields, post_load, post_dump
+from .error_code_and_message import ErrorCodeAndMessageSchema
+
+
+class ArchiveExtractionSchema(Schema):
+    SKIP_VALUES = list([None])
+
+    class Meta:
+        ordered = True
+
+    status = fields.Str(required=True)
+    error = fields.Nested(ErrorCodeAndMessageSchema)
+
+    @post_load
+    def to_model(self, data):
+        return ArchiveExtraction(**data)
+
+    @post_dump
+    def remove_skip_values(self, data):
+        return {
+            key: value
+            for key, value in data.items() if value not in self.SKIP_VALUES
+        }
+
+
+class ArchiveExtraction():
+    """ArchiveExtraction is the state of the extraction of the last archive
+    uploaded to a directory.
+
+    Attributes:
+        status (str): 'Extracting', 'Failed' or 'Completed'.
+        error (ErrorCodeAndMessage): Why the extraction failed.
+    """
+    schema = ArchiveExtractionSchema()
+
+    def __init__(self, status: str, error=None):
+        self.status = status
+        self.error = error
+
+    def __eq__(self, other):
+        return self.__dict__ == other.__dict__
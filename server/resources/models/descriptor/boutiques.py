@@ -1,17 +1,113 @@
 import os
+import json
+import hashlib
+import threading
+from functools import lru_cache
+from collections import OrderedDict
+from typing import Dict
+import pkg_resources
 from boutiques import bosh
-from jsonschema import ValidationError
+from boutiques.invocationSchemaHandler import generateInvocationSchema
+from jsonschema import Draft4Validator, ValidationError, SchemaError
+from jsonschema.exceptions import best_match
 from server import app
 from server.resources.models.descriptor.descriptor_abstract import Descriptor
 
 
+class BoutiquesValidator():
+    """BoutiquesValidator is a parsed and validated Boutiques descriptor,
+    along with the compiled validator of its invocation schema."""
+
+    def __init__(self, descriptor: Dict):
+        self.descriptor = descriptor
+        schema = (descriptor.get("invocation-schema")
+                  or generateInvocationSchema(descriptor))
+        Draft4Validator.check_schema(schema)
+        self.validator = Draft4Validator(schema)
+
+    def validate(self, input_values: Dict):
+        """Raises a ValidationError if `input_values` is not a valid
+        invocation of the descriptor."""
+        input_values = dict(input_values)
+        for descriptor_input in self.descriptor.get("inputs") or []:
+            default_value = descriptor_input.get("default-value")
+            if (default_value is not None
+                    and input_values.get(descriptor_input["id"]) is None):
+                input_values[descriptor_input["id"]] = default_value
+        error = best_match(self.validator.iter_errors(input_values))
+        if error:
+            raise error
+
+
+class BoutiquesValidatorCache():
+    """The validator cache keeps the validators of the last
+    `DESCRIPTOR_CACHE_SIZE` descriptors, keyed by descriptor path and content
+    hash, so that a descriptor is only parsed and validated again once it
+    changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (descriptor path, descriptor hash): BoutiquesValidator
+        self._validators = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_validator(self, descriptor_path: str) -> BoutiquesValidator:
+        with open(descriptor_path, 'rb') as descriptor_file:
+            content = descriptor_file.read()
+        key = (os.path.realpath(descriptor_path),
+               hashlib.sha256(content).hexdigest())
+        with self._lock:
+            validator = self._validators.get(key)
+            if validator:
+                self._validators.move_to_end(key)
+                self.hits += 1
+                return validator
+            self.misses += 1
+
+        # Raises a ValidationError if the descriptor is invalid
+        bosh(["validate", descriptor_path])
+        validator = BoutiquesValidator(
+            json.loads(content.decode(), object_pairs_hook=OrderedDict))
+
+        with self._lock:
+            self._validators[key] = validator
+            while len(self._validators) > app.config['DESCRIPTOR_CACHE_SIZE']:
+                self._validators.popitem(last=False)
+        return validator
+
+    def clear(self):
+        with self._lock:
+            self._validators.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+BOUTIQUES_VALIDATORS = BoutiquesValidatorCache()
+
+
 class Boutiques(Descriptor):
     @classmethod
     def validate(cls, descriptor_path, input_path):
         try:
-            bosh(["invocation", descriptor_path, "-i", input_path])
-        except ValidationError as e:
+            with open(input_path) as input_file:
+                input_values = json.load(input_file)
+        except (OSError, ValueError) as e:
+            return False, str(e)
+        return cls.validate_input_values(descriptor_path, input_values)
+
+    @classmethod
+    def validate_input_values(cls, descriptor_path: str,
+                              input_values: Dict) -> (bool, str):
+        """Validates an invocation in memory, with the cached validator of
+        the descriptor."""
+        try:
+            validator = BOUTIQUES_VALIDATORS.get_validator(descriptor_path)
+            validator.validate(input_values)
+        except (ValidationError, SchemaError) as e:
             return False, e.message
+        except (OSError, ValueError) as e:
+            return False, str(e)
         return True, None
 
     @classmethod
@@ -31,9 +127,19 @@ class Boutiques(Descriptor):
             return False, "Boutiques descriptor at '{}' was exported without error, but no output file was created."
         return True, None
 
+    @classmethod
+    def exporter_version(cls) -> str:
+        return get_boutiques_version()
+
     @classmethod
     def execute(cls, user_data_dir, descriptor, input_data):
         return [
             "bosh", "exec", "launch", "-v{0}:{0}".format(user_data_dir),
             descriptor, input_data
         ]
+
+
+@lru_cache(maxsize=None)
+def get_boutiques_version() -> str:
+    return "boutiques {}".format(
+        pkg_resources.get_distribution("boutiques").version)
@@ -23,10 +23,17 @@ class Descriptor(ABC):
     def execute(cls, user_data_dir, descriptor, input_data):
         pass
 
+    @classmethod
+    def exporter_version(cls) -> str:
+        """Version of the tool exporting the descriptors, so that they are
+        exported again when it changes."""
+        return ""
+
     @classmethod
     def descriptor_factory_from_type(cls, typ):
         from server.resources.models.descriptor.supported_descriptors import SUPPORTED_DESCRIPTORS
-        return SUPPORTED_DESCRIPTORS.get(typ.lower())()
+        descriptor_class = SUPPORTED_DESCRIPTORS.get(typ.lower())
+        return descriptor_class() if descriptor_class else None
 
     @classmethod
     def descriptor_factory_from_path(cls, path_to_descriptor):
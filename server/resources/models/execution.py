@@ -7,6 +7,7 @@ from marshmallow_enum import EnumField
 class ExecutionStatus(enum.Enum):
     Initializing = "Initializing"
     Ready = "Ready"
+    Queued = "Queued"
     Running = "Running"
     Finished = "Finished"
     InitializationFailed = "InitializationFailed"
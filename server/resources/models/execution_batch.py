@@ -0,0 +1,42 @@
+from marshmallow import Schema, fields, post_load, post_dump
+from .execution import Execution, ExecutionSchema
+from .error_code_and_message import (ErrorCodeAndMessage,
+                                     ErrorCodeAndMessageSchema)
+
+
+class ExecutionBatchResultSchema(Schema):
+    SKIP_VALUES = list([None])
+
+    class Meta:
+        ordered = True
+
+    execution = fields.Nested(ExecutionSchema)
+    error = fields.Nested(ErrorCodeAndMessageSchema)
+
+    @post_load
+    def to_model(self, data):
+        return ExecutionBatchResult(**data)
+
+    @post_dump
+    def remove_skip_values(self, data):
+        return {
+            key: value
+            for key, value in data.items() if value not in self.SKIP_VALUES
+        }
+
+
+class ExecutionBatchResult():
+    """ExecutionBatchResult is the result of the creation of one execution of
+    a batch: either the created execution, or the reason it was not created.
+
+    Attributes:
+        execution (Execution):
+        error (ErrorCodeAndMessage):
+    """
+    schema = ExecutionBatchResultSchema()
+
+    def __init__(self,
+                 execution: Execution = None,
+                 error: ErrorCodeAndMessage = None):
+        self.execution = execution
+        self.error = error
@@ -0,0 +1,58 @@
+from marshmallow import Schema, fields, post_load, post_dump
+from marshmallow_enum import EnumField
+from .execution import ExecutionStatus
+
+
+class ExecutionEventSchema(Schema):
+    SKIP_VALUES = list([None])
+
+    class Meta:
+        ordered = True
+
+    event_id = fields.Int(
+        required=True, dump_to='eventId', load_from='eventId')
+    identifier = fields.Str(required=True)
+    status = EnumField(ExecutionStatus, required=True)
+    start_date = fields.Int(dump_to='startDate', load_from='startDate')
+    end_date = fields.Int(dump_to='endDate', load_from='endDate')
+
+    @post_load
+    def to_model(self, data):
+        return ExecutionEvent(**data)
+
+    @post_dump
+    def remove_skip_values(self, data):
+        return {
+            key: value
+            for key, value in data.items() if value not in self.SKIP_VALUES
+        }
+
+
+class ExecutionEvent():
+    """ExecutionEvent is a change of the status, start date or end date of an
+    execution.
+
+    Attributes:
+        event_id (int): Increasing identifier of the event, to get the
+            events that follow it.
+        identifier (str): Identifier of the execution.
+        status (ExecutionStatus):
+        start_date (int):
+        end_date (int):
+        creator_username (str): Only used to dispatch the event.
+    """
+    schema = ExecutionEventSchema()
+
+    def __init__(self,
+                 event_id: int,
+                 identifier: str,
+                 status: ExecutionStatus,
+                 start_date: int = None,
+                 end_date: int = None,
+                 creator_username: str = None):
+        self.event_id = event_id
+        self.identifier = identifier
+        self.status = status
+        self.start_date = start_date
+        self.end_date = end_date
+        self.creator_username = creator_username
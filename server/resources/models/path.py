@@ -1,10 +1,12 @@
 import os
+import stat
 from pathlib import PurePath
 import mimetypes
 from server import app
 from flask_restful import request
 from marshmallow import Schema, fields, post_load, post_dump
 from server.resources.helpers.execution import extract_execution_identifier_from_path
+from server.resources.helpers.path_sizes import PATH_SIZE_INDEX
 
 
 class PathSchema(Schema):
@@ -80,28 +82,51 @@ class Path():
         Path object based on the associated file or directory.
         """
 
-        is_directory = os.path.isdir(absolute_path_to_resource)
-        mime_type = None
-
-        if not is_directory:
-            mime_type, _ = mimetypes.guess_type(absolute_path_to_resource)
+        stat_result = os.stat(absolute_path_to_resource)
+        is_directory = stat.S_ISDIR(stat_result.st_mode)
 
-        # TODO: Add execution_id to Path object
         execution_id = extract_execution_identifier_from_path(
             absolute_path_to_resource)
 
-        rel_path = PurePath(
-            os.path.relpath(absolute_path_to_resource,
-                            app.config['DATA_DIRECTORY'])).as_posix()
+        return Path.object_from_stat(absolute_path_to_resource, stat_result,
+                                     is_directory, execution_id)
+
+    @classmethod
+    def object_from_stat(cls,
+                         absolute_path_to_resource: str,
+                         stat_result: os.stat_result,
+                         is_directory: bool,
+                         execution_id: str = None):
+        """object_from_stat returns a Path object based on the result of a
+        previous `stat` of the resource, for callers that already have it,
+        such as directory listings.
+        """
+        mime_type = None
+        if is_directory:
+            size = Path.get_path_size(absolute_path_to_resource, True)
+        else:
+            mime_type, _ = mimetypes.guess_type(absolute_path_to_resource)
+            size = stat_result.st_size
 
         return Path(
-            platform_path='{}path/{}'.format(request.url_root, rel_path),
-            last_modification_date=os.path.getmtime(absolute_path_to_resource),
-            is_directory=os.path.isdir(absolute_path_to_resource),
-            size=Path.get_path_size(absolute_path_to_resource, is_directory),
+            platform_path=Path.platform_path_from_pathname(
+                absolute_path_to_resource),
+            last_modification_date=stat_result.st_mtime,
+            is_directory=is_directory,
+            size=size,
             mime_type=mime_type,
             execution_id=execution_id)
 
+    @classmethod
+    def platform_path_from_pathname(cls,
+                                    absolute_path_to_resource: str) -> str:
+        """platform_path_from_pathname returns the url of a resource, without
+        accessing the resource itself."""
+        rel_path = PurePath(
+            os.path.relpath(absolute_path_to_resource,
+                            app.config['DATA_DIRECTORY'])).as_posix()
+        return '{}path/{}'.format(request.url_root, rel_path)
+
     @classmethod
     def get_path_size(cls, absolute_path: str, is_dir: bool) -> int:
         """get_path_size returns the size of the resource.
@@ -112,12 +137,6 @@ class Path():
         Returns:
             (int): Size of the resource.
         """
-        size = 0
         if is_dir:
-            for dirpath, _, filenames in os.walk(absolute_path):
-                for f in filenames:
-                    fp = os.path.join(dirpath, f)
-                    size += os.path.getsize(fp)
-        else:
-            size = os.path.getsize(absolute_path)
-        return size
+            return PATH_SIZE_INDEX.get_size(absolute_path)
+        return os.path.getsize(absolute_path)
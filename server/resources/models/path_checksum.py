@@ -0,0 +1,24 @@
+from marshmallow import Schema, fields, post_load
+
+
+class PathChecksumSchema(Schema):
+    class Meta:
+        ordered = True
+
+    algorithm = fields.Str(required=True)
+    checksum = fields.Str(required=True)
+
+    @post_load
+    def to_model(self, data):
+        return PathChecksum(**data)
+
+
+class PathChecksum():
+    schema = PathChecksumSchema()
+
+    def __init__(self, algorithm: str, checksum: str):
+        self.algorithm = algorithm
+        self.checksum = checksum
+
+    def __eq__(self, other):
+        return self.__dict__ == other.__dict__
@@ -1,6 +1,7 @@
 import os
 import json
 import shutil
+import base64
 from flask_restful import Resource, request
 from flask import Response, make_response
 from server.common.utils import marshal
@@ -8,16 +9,26 @@ from server.common.error_codes_and_messages import (
     ErrorCodeAndMessageFormatter, ErrorCodeAndMessageAdditionalDetails,
     INVALID_MODEL_PROVIDED, UNAUTHORIZED, INVALID_PATH, INVALID_ACTION,
     MD5_ON_DIR, LIST_ACTION_ON_FILE, ACTION_REQUIRED, UNEXPECTED_ERROR,
-    PATH_IS_DIRECTORY, INVALID_REQUEST, PATH_DOES_NOT_EXIST)
+    PATH_IS_DIRECTORY, INVALID_REQUEST, PATH_DOES_NOT_EXIST, CHECKSUM_ON_DIR)
 from .models.upload_data import UploadDataSchema
 from .models.boolean_response import BooleanResponse
 from .models.path import Path as PathModel
 from .models.path import PathSchema
 from .decorators import login_required, unmarshal_request
 from .helpers.path import (is_safe_for_delete, upload_file, upload_archive,
-                           create_directory, generate_md5, is_safe_for_put,
+                           create_directory, generate_md5, generate_checksum,
+                           is_safe_for_put, upload_stream,
+                           write_file_atomically, get_user_data_directory,
                            is_safe_for_get, make_absolute, get_content,
-                           get_path_list)
+                           get_path_list, get_extraction_status)
+from .helpers.path_sizes import PATH_SIZE_INDEX
+from .helpers.checksums import precompute_checksums_in_background
+from .helpers.resumable_uploads import (
+    parse_upload_content_range, lock_upload_session,
+    get_or_create_upload_session, write_chunk, finalize_upload)
+from server.database import db
+from server.database.queries.checksums import delete_checksums
+from .helpers.executions import query_converter
 
 
 class Path(Resource):
@@ -41,14 +52,22 @@ class Path(Resource):
         if not is_safe_for_get(requested_data_path, user):
             return marshal(INVALID_PATH), 401
 
-        if not os.path.exists(requested_data_path) and action != 'exists':
+        # A directory whose archive extraction failed may have been removed
+        if not os.path.exists(requested_data_path) and action not in (
+                'exists', 'extraction'):
             return marshal(PATH_DOES_NOT_EXIST), 401
 
         if not action:
             return marshal(ACTION_REQUIRED), 400
 
         if action == 'content':
-            return get_content(requested_data_path)
+            content, error = get_content(
+                requested_data_path,
+                request.args.get('format', default='tar', type=str).lower(),
+                request.args.get('compression', type=str))
+            if error:
+                return marshal(error), 400
+            return content
         elif action == 'properties':
             path = PathModel.object_from_pathname(requested_data_path)
             return marshal(path)
@@ -58,24 +77,57 @@ class Path(Resource):
         elif action == 'list':
             if not os.path.isdir(requested_data_path):
                 return marshal(LIST_ACTION_ON_FILE), 400
-            directory_list = get_path_list(complete_path)
+            directory_list, error = get_path_list(
+                complete_path,
+                offset=request.args.get('offset', type=query_converter),
+                limit=request.args.get('limit', type=query_converter),
+                sort=request.args.get('sort', default='name', type=str),
+                name_filter=request.args.get('name', type=str))
+            if error:
+                return marshal(error), 400
             return marshal(directory_list)
+        elif action == 'extraction':
+            return marshal(get_extraction_status(requested_data_path))
         elif action == 'md5':
             if os.path.isdir(requested_data_path):
                 return marshal(MD5_ON_DIR), 400
             md5 = generate_md5(requested_data_path)
             return marshal(md5)
+        elif action == 'checksum':
+            if os.path.isdir(requested_data_path):
+                return marshal(CHECKSUM_ON_DIR), 400
+            checksum, error = generate_checksum(
+                requested_data_path,
+                request.args.get('algorithm', default='md5', type=str).lower())
+            if error:
+                return marshal(error), 400
+            return marshal(checksum)
         else:
             return marshal(INVALID_ACTION), 400
 
     @login_required
     def put(self, user, complete_path: str = ''):
-        data = request.data
         requested_data_path = make_absolute(complete_path)
 
         if not is_safe_for_put(requested_data_path, user):
             return marshal(INVALID_PATH), 401
 
+        if request.mimetype == 'application/octet-stream':
+            # Request body is the binary content of the file, streamed to
+            # disk without being loaded in memory
+            if os.path.isdir(requested_data_path):
+                error = ErrorCodeAndMessageFormatter(PATH_IS_DIRECTORY,
+                                                     complete_path)
+                return marshal(error), 400
+            if request.headers.get('Content-Range'):
+                return self.put_chunk(user, requested_data_path)
+            path, error = upload_stream(request.stream, requested_data_path)
+            if error:
+                return marshal(error), 400
+            return marshal(path), 201
+
+        data = request.data
+
         if request.headers.get(
                 'Content-Type',
                 default='').lower() == 'application/carmin+json' and data:
@@ -97,20 +149,25 @@ class Path(Resource):
                 return marshal(path), 201
 
             if model.upload_type == "Archive":
-                path, error = upload_archive(model, requested_data_path)
+                extraction, error = upload_archive(model, requested_data_path)
+                if error:
+                    return marshal(error), 400
+                if not extraction.done():
+                    # The archive is still being extracted in the background
+                    return marshal(
+                        PathModel.object_from_pathname(requested_data_path)), 202
+                error = extraction.result()
                 if error:
                     return marshal(error), 400
-                return marshal(path), 201
-        if data:
-            # Content-Type is not 'application/carmin+json',
-            # request data is taken as raw text
-            try:
-                with open(requested_data_path, 'w') as f:
-                    f.write(data.decode('utf-8', errors='ignore'))
                 return marshal(
                     PathModel.object_from_pathname(requested_data_path)), 201
-            except OSError:
+        if data:
+            # Content-Type is not 'application/carmin+json',
+            # request data is written as is
+            path, error = write_file_atomically(requested_data_path, [data])
+            if error:
                 return marshal(INVALID_PATH), 400
+            return marshal(path), 201
         if not data:
             path, error = create_directory(requested_data_path)
             if error:
@@ -121,6 +178,43 @@ class Path(Resource):
 
         return marshal(INVALID_REQUEST), 400
 
+    def put_chunk(self, user, requested_data_path: str):
+        """Receives a chunk of a resumable upload. See
+        `helpers.resumable_uploads` for a description of the protocol."""
+        (start, stop, size), error = parse_upload_content_range(
+            request.headers.get('Content-Range'))
+        if error:
+            return marshal(error), 400
+
+        user_data_directory = get_user_data_directory(user.username)
+        with lock_upload_session(user_data_directory, requested_data_path):
+            session = get_or_create_upload_session(
+                user_data_directory, requested_data_path, size)
+            if start is not None:
+                error = write_chunk(session, request.stream, start, stop,
+                                    request.headers.get('Content-MD5'))
+                if error:
+                    return marshal(error), 400
+
+            if not session.complete:
+                # 308 'Resume Incomplete', with the range received so far
+                response = Response(status=308)
+                if session.offset:
+                    response.headers['Range'] = 'bytes=0-{}'.format(
+                        session.offset - 1)
+                return response
+
+            error = finalize_upload(session)
+            if error:
+                return marshal(error), 400
+        md5 = generate_md5(requested_data_path)
+        precompute_checksums_in_background(requested_data_path)
+        digest = base64.b64encode(bytes.fromhex(md5.md5)).decode()
+        return marshal(PathModel.object_from_pathname(
+            requested_data_path)), 201, {
+                'Digest': 'md5={}'.format(digest)
+            }
+
     @login_required
     def delete(self, user, complete_path: str = ''):
         requested_data_path = make_absolute(complete_path)
@@ -137,4 +231,6 @@ class Path(Resource):
                 return marshal(PATH_DOES_NOT_EXIST), 400
             except OSError:
                 return marshal(UNEXPECTED_ERROR), 500
+        PATH_SIZE_INDEX.invalidate(requested_data_path)
+        delete_checksums(os.path.realpath(requested_data_path), db.session)
         return Response(status=204)
@@ -11,25 +11,36 @@ from .config import (SQLITE_DEFAULT_PROD_DB_URI, DEFAULT_PROD_DB_URI)
 from .resources.models.platform_properties import PlatformPropertiesSchema
 from server import app
 from server.database import db
+from server.database.migrations import migrate
 from .database.models.user import User, Role
 from .database.models.execution import Execution, ExecutionStatus
 from .database.models.execution_process import ExecutionProcess
 from .database.queries.executions import get_execution_processes
-from server.resources.helpers.pipelines import export_all_pipelines
+from server.resources.helpers.pipelines import (export_all_pipelines,
+                                               load_all_pipelines)
 from server.common.error_codes_and_messages import PATH_EXISTS
 from server.resources.models.descriptor.supported_descriptors import SUPPORTED_DESCRIPTORS
 from server.platform_properties import PLATFORM_PROPERTIES
-from server.resources.helpers.execution_kill import (get_process_alive_count,
-                                                     kill_execution_processes)
+from server.resources.helpers.execution_events import EXECUTION_EVENTS
+from server.resources.helpers.execution_kill import (
+    kill_all_execution_processes, kill_execution_processes)
+from server.resources.helpers.execution_initialization import (
+    fail_initialization)
+from server.resources.helpers.executions import get_running_marker_path
+from server.resources.helpers.resumable_uploads import (
+    delete_expired_upload_sessions)
 
 
 def start_up():
+    migrate(db)
     create_dirs_for_supported_descriptors()
     pipeline_and_data_directory_present()
     export_pipelines()
+    load_all_pipelines()
     properties_validation()
     find_or_create_admin()
     purge_executions()
+    purge_upload_sessions()
 
 
 def properties_validation(config_data: Dict = None) -> bool:
@@ -125,43 +136,37 @@ def create_dirs_for_supported_descriptors():
 
 
 def purge_executions():
-    # Let's get all executions running
+    # Executions are supervised by the server process. The executions still
+    # marked as 'Running' lost their supervisor when the server stopped: they
+    # will never complete. We kill their remaining processes and mark them as
+    # 'Unknown'.
     executions = db.session.query(Execution).filter_by(
         status=ExecutionStatus.Running)
 
     for e in executions:
-        # Look at if it has some processes linked to it
         execution_processes = get_execution_processes(e.identifier, db.session)
-
-        if not execution_processes:  # Most probably due to the execution being in termination process
-            continue
-
-        actual_execution_processes = [
-            e for e in execution_processes if e.is_execution
-        ]
-        execution_parent_processes = [
-            e for e in execution_processes if not e.is_execution
-        ]
-
-        process_still_alive_count = 0
-        process_still_alive_count += get_process_alive_count(
-            actual_execution_processes)
-        process_still_alive_count += get_process_alive_count(
-            execution_parent_processes)
-
-        # The execution is going as expected
-        if process_still_alive_count == len(execution_processes):
-            continue
-
-        # The execution is supposed to be still running but some of the processes it launched are no more active
-        # We will mark the execution as "ExecutionFailed" and kill the remaining processes
-        kill_execution_processes(execution_parent_processes)
-        kill_execution_processes(actual_execution_processes)
+        kill_all_execution_processes(execution_processes)
 
         e.status = ExecutionStatus.Unknown
+        try:
+            os.remove(get_running_marker_path(e.creator_username,
+                                              e.identifier))
+        except OSError:
+            pass
         for execution_process in execution_processes:
             db.session.delete(execution_process)
         db.session.commit()
+        EXECUTION_EVENTS.publish(e)
+
+    # The executions still marked as 'Initializing' are initialized again
+    # once the server is started, from the root URL of the request which
+    # created them. The executions created before this URL was stored will
+    # never be initialized.
+    executions = db.session.query(Execution).filter_by(
+        status=ExecutionStatus.Initializing, url_root=None).all()
+    for e in executions:
+        fail_initialization(
+            e, "The initialization was interrupted by a server restart.")
 
     # Now that the executions marked as 'Running' have been purged, let's clean up the remaining execution processes
     remaining_processes = db.session.query(ExecutionProcess)
@@ -171,4 +176,13 @@ def purge_executions():
         db.session.commit()
 
 
+
+def purge_upload_sessions():
+    """Deletes the abandoned upload sessions of every user."""
+    data_directory = app.config['DATA_DIRECTORY']
+    for entry in os.scandir(data_directory):
+        if entry.is_dir() and not entry.name.startswith('.'):
+            delete_expired_upload_sessions(entry.path)
+
+
 from server.resources.helpers.register import register_user
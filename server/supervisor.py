@@ -0,0 +1,39 @@
+"""The supervisor process initializes and runs the executions, and exports the
+pipelines, when the server runs several worker processes (see `server.wsgi`).
+
+The workers only store the new and queued executions in the database: the
+supervisor polls them every `EXECUTION_QUEUE_POLL_INTERVAL` seconds, so that
+`MAX_CONCURRENT_EXECUTIONS` applies to the whole server, and so that the
+executions outlive the workers.
+"""
+import signal
+import threading
+from server import app
+from server.resources.helpers.pipeline_watcher import start_pipeline_watcher
+from server.resources.helpers.execution_play import EXECUTION_SUPERVISOR
+from server.resources.helpers.execution_initialization import (
+    EXECUTION_INITIALIZER)
+
+
+def main():
+    stopped = threading.Event()
+
+    def stop(signum, frame):
+        stopped.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    # Reloading the workers does not concern the supervisor
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    EXECUTION_SUPERVISOR.start(app.config['EXECUTION_QUEUE_POLL_INTERVAL'])
+    EXECUTION_INITIALIZER.start(app.config['EXECUTION_QUEUE_POLL_INTERVAL'])
+    watcher = start_pipeline_watcher()
+    while not stopped.wait(1):
+        pass
+    watcher.stop()
+    EXECUTION_SUPERVISOR.stop()
+
+
+if __name__ == '__main__':
+    main()
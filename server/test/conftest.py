@@ -3,6 +3,7 @@ from server.server_helper import create_app
 from server.api import declare_api
 from server.database import db as _db
 from server.config import TestConfig
+from server.resources.helpers.api_keys import API_KEY_CACHE
 
 
 @pytest.yield_fixture(autouse=True, scope='session')
@@ -38,6 +39,8 @@ def session(db):
 
     # overload the default session with the session above
     db.session = session
+    # users are created again for every test
+    API_KEY_CACHE.clear()
 
     yield session
     session.close()
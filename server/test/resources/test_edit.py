@@ -2,12 +2,14 @@ import pytest
 import copy
 import json
 import os
+import logging
 from server import app
 from server.common.error_codes_and_messages import (
     USER_DOES_NOT_EXIST, UNAUTHORIZED, INVALID_MODEL_PROVIDED)
 from server.test.utils import error_from_response
 from server.test.conftest import test_client, session
 from server.test.fakedata.users import admin, standard_user, standard_user_2
+from server.resources.helpers.api_keys import API_KEY_CACHE
 
 
 @pytest.fixture(autouse=True)
@@ -109,3 +111,31 @@ class TestEditResource():
         error = error_from_response(response)
         INVALID_MODEL_PROVIDED.error_detail = "'password' is required"
         assert error == INVALID_MODEL_PROVIDED
+
+    def test_edit_password_invalidates_api_key_cache(self, test_client):
+        for _ in range(2):
+            test_client.post(
+                "/users/edit",
+                headers={"apiKey": standard_user().api_key},
+                data=json.dumps({
+                    "password": standard_user().password + "2"
+                }))
+        # Each password change drops the user from the cache
+        assert API_KEY_CACHE.hits == 0 and API_KEY_CACHE.misses == 2
+
+        for _ in range(2):
+            test_client.get(
+                "/executions", headers={"apiKey": standard_user().api_key})
+        assert API_KEY_CACHE.hits == 1 and API_KEY_CACHE.misses == 3
+
+    def test_api_key_cache_stats_logged(self, test_client, monkeypatch):
+        messages = []
+        monkeypatch.setitem(app.config, 'API_KEY_CACHE_STATS_INTERVAL', 0)
+        monkeypatch.setattr(
+            logging.getLogger('request-response'), 'info', messages.append)
+        for _ in range(3):
+            test_client.get(
+                "/executions", headers={"apiKey": standard_user().api_key})
+        # Counts are logged from the second lookup, before it is made
+        assert [m for m in messages if "API key cache" in m][-1].endswith(
+            "1 hits, 1 misses (50.0% hit rate)")
@@ -1,10 +1,16 @@
+import os
 import json
 import copy
 import pytest
 
 from server import app
-from server.database.models.execution import Execution as ExecutionDB
-from server.resources.helpers.executions import get_execution_as_model
+from server.database.models.execution import Execution as ExecutionDB, ExecutionStatus
+from server.resources.helpers.executions import (
+    get_execution_as_model, get_inputs_file_path, std_file_path,
+    STDERR_FILENAME)
+from server.startup_validation import purge_executions
+from server.resources.helpers.execution_initialization import (
+    EXECUTION_INITIALIZER)
 from server.resources.models.execution import ExecutionSchema, Execution
 from server.common.error_codes_and_messages import EXECUTION_NOT_FOUND, ErrorCodeAndMessageFormatter
 from server.test.fakedata.executions import (
@@ -63,6 +69,17 @@ class TestExecutionResource():
         execution = ExecutionSchema().load(json_response).data
         assert isinstance(execution, Execution)
 
+    def test_get_execution_without_inputs_file(self, test_client,
+                                               execution_id, pipeline):
+        os.remove(
+            get_inputs_file_path(standard_user().username, execution_id))
+        response = test_client.get(
+            '/executions/{}'.format(execution_id),
+            headers={"apiKey": standard_user().api_key})
+        execution = ExecutionSchema().load(load_json_data(response)).data
+        assert execution.input_values == post_valid_execution(
+            pipeline.identifier).input_values
+
     def test_get_invalid_execution(self, test_client):
         execution_id = "invalid"
         response = test_client.get(
@@ -158,3 +175,53 @@ class TestExecutionResource():
                                               execution)
         assert (execution.pipeline_identifier !=
                 PATCH_NO_CHANGE_PARAMETER["pipelineIdentifier"])
+
+    def test_delete_queued_execution(self, test_client, session,
+                                     execution_id):
+        execution = session.query(ExecutionDB).filter_by(
+            identifier=execution_id).first()
+        execution.status = ExecutionStatus.Queued
+        session.commit()
+
+        response = test_client.delete(
+            '/executions/{}'.format(execution_id),
+            headers={"apiKey": standard_user().api_key})
+        assert response.status_code == 204
+
+        execution = session.query(ExecutionDB).filter_by(
+            identifier=execution_id).first()
+        assert execution.status == ExecutionStatus.Killed
+        assert execution.end_date
+
+    def test_purge_initializing_execution(self, session, execution_id):
+        # The execution was created before its request URL was stored
+        execution = session.query(ExecutionDB).filter_by(
+            identifier=execution_id).first()
+        execution.status = ExecutionStatus.Initializing
+        execution.url_root = None
+        session.commit()
+
+        purge_executions()
+
+        execution = session.query(ExecutionDB).filter_by(
+            identifier=execution_id).first()
+        assert execution.status == ExecutionStatus.InitializationFailed
+        with open(
+                std_file_path(standard_user().username, execution_id,
+                              STDERR_FILENAME)) as stderr:
+            assert "interrupted" in stderr.read()
+
+    def test_resume_initializing_execution(self, session, execution_id):
+        execution = session.query(ExecutionDB).filter_by(
+            identifier=execution_id).first()
+        execution.status = ExecutionStatus.Initializing
+        session.commit()
+
+        # Initializations interrupted by a restart of the server, or by a
+        # reload of its workers, are resumed
+        purge_executions()
+        EXECUTION_INITIALIZER.start()
+
+        execution = session.query(ExecutionDB).filter_by(
+            identifier=execution_id).first()
+        assert execution.status == ExecutionStatus.Ready
@@ -0,0 +1,148 @@
+import json
+import pytest
+from server import app
+from server.test.fakedata.users import standard_user, standard_user_2
+from server.test.utils import load_json_data, error_from_response
+from server.test.conftest import test_client, session
+from server.common.error_codes_and_messages import TOO_MANY_STREAMS
+from server.resources.models.execution import ExecutionSchema
+from server.resources.models.execution_event import ExecutionEventSchema
+from server.resources.models.descriptor.boutiques import Boutiques
+from server.resources.helpers.execution_events import (EXECUTION_EVENTS,
+                                                       ExecutionEventBus)
+from server.database.models.execution import (Execution as ExecutionDB,
+                                              ExecutionStatus)
+from server.test.fakedata.executions import post_valid_execution
+from server.test.fakedata.pipelines import (
+    PipelineStub, BOUTIQUES_NO_SLEEP_ORIGINAL, BOUTIQUES_NO_SLEEP_CONVERTED)
+
+
+@pytest.fixture
+def pipeline_no_sleep():
+    return PipelineStub(BOUTIQUES_NO_SLEEP_ORIGINAL,
+                        BOUTIQUES_NO_SLEEP_CONVERTED, "no_sleep.json")
+
+
+@pytest.fixture(autouse=True)
+def test_config(tmpdir_factory, session, pipeline_no_sleep):
+    session.add(standard_user(encrypted=True))
+    session.add(standard_user_2(encrypted=True))
+    session.commit()
+
+    pipelines_root = tmpdir_factory.mktemp('pipelines')
+    pipelines_root.join(pipeline_no_sleep.get_converted_filename()).write(
+        pipeline_no_sleep.get_converted_json())
+    boutiques_dir = pipelines_root.mkdir('boutiques')
+    boutiques_dir.join(pipeline_no_sleep.get_original_filename()).write(
+        pipeline_no_sleep.get_original_json())
+    app.config['PIPELINE_DIRECTORY'] = str(pipelines_root)
+
+    data_root = tmpdir_factory.mktemp('data')
+    user_dir = data_root.mkdir(standard_user().username)
+    user_dir.join('test.txt').write('Jane Doe')
+    user_dir.mkdir('executions')
+    app.config['DATA_DIRECTORY'] = str(data_root)
+
+
+@pytest.fixture
+def execution_id(test_client, pipeline_no_sleep) -> str:
+    response = test_client.post(
+        '/executions',
+        headers={"apiKey": standard_user().api_key},
+        data=json.dumps(ExecutionSchema().dump(
+            post_valid_execution(pipeline_no_sleep.identifier)).data))
+    return ExecutionSchema().load(load_json_data(response)).data.identifier
+
+
+def get_events(test_client, user, after: int):
+    response = test_client.get(
+        '/executions/events?after={}&timeout=0'.format(after),
+        headers={"apiKey": user.api_key})
+    assert response.status_code == 200
+    return ExecutionEventSchema(many=True).load(load_json_data(response)).data
+
+
+class TestExecutionEventsResource():
+    def test_get_events(self, test_client, execution_id, monkeypatch):
+        events = [
+            event for event in get_events(test_client, standard_user(), 0)
+            if event.identifier == execution_id
+        ]
+        assert [event.status for event in events] == [
+            ExecutionStatus.Initializing, ExecutionStatus.Ready
+        ]
+
+        monkeypatch.setattr(
+            Boutiques, "execute",
+            classmethod(
+                lambda cls, user_data_dir, descriptor, input_data: ["true"]))
+        test_client.put(
+            '/executions/{}/play'.format(execution_id),
+            headers={"apiKey": standard_user().api_key})
+
+        events = get_events(test_client, standard_user(), events[-1].event_id)
+        assert [event.status for event in events] == [
+            ExecutionStatus.Queued, ExecutionStatus.Running,
+            ExecutionStatus.Finished
+        ]
+        assert events[1].start_date and events[2].end_date
+
+    def test_get_events_of_other_user(self, test_client, execution_id):
+        events = get_events(test_client, standard_user_2(), 0)
+        assert execution_id not in [event.identifier for event in events]
+
+    def test_get_events_too_many_streams(self, test_client, monkeypatch):
+        # Waiting requests share the stream slots of the worker
+        monkeypatch.setitem(app.config, 'MAX_STREAMS_PER_WORKER', 0)
+        response = test_client.get(
+            '/executions/events?timeout=0',
+            headers={"apiKey": standard_user().api_key})
+        assert response.status_code == 503
+        assert response.headers['Retry-After']
+        assert error_from_response(response) == TOO_MANY_STREAMS
+
+    def test_get_event_stream(self, test_client, execution_id):
+        # The stream resumes after the event given as Last-Event-ID
+        response = test_client.get(
+            '/executions/events',
+            headers={
+                "apiKey": standard_user().api_key,
+                "Accept": "text/event-stream",
+                "Last-Event-ID": str(EXECUTION_EVENTS.last_event_id - 1)
+            },
+            buffered=False)
+        assert response.mimetype == 'text/event-stream'
+        stream = iter(response.response)
+        assert next(stream).decode().startswith("retry: ")
+        message = next(stream).decode()
+        response.close()
+        assert message.startswith("id: ")
+        assert json.loads(message.split("data: ", 1)[1])[
+            "identifier"] == execution_id
+
+    def test_event_cursor_shared_between_buses(self, session, execution_id):
+        # Each server process has its own bus
+        bus, other_bus = ExecutionEventBus(), ExecutionEventBus()
+        after = bus.last_event_id
+        assert other_bus.last_event_id == after
+
+        execution = session.query(ExecutionDB).filter_by(
+            identifier=execution_id).first()
+        execution.status = ExecutionStatus.Queued
+        session.commit()
+        bus.publish(execution)
+
+        events = other_bus.wait(standard_user().username, after, 0)
+        assert [(event.identifier, event.status) for event in events] == [
+            (execution_id, ExecutionStatus.Queued)
+        ]
+        assert [event.event_id for event in events] == [
+            event.event_id
+            for event in bus.wait(standard_user().username, after, 0)
+        ]
+        assert not other_bus.wait(standard_user().username,
+                                  events[-1].event_id, 0)
+
+        # The state is published once, whichever process publishes it
+        other_bus.publish(execution)
+        assert other_bus.last_event_id == events[-1].event_id
@@ -7,6 +7,9 @@ from server.test.fakedata.users import standard_user
 from server.test.utils import load_json_data, error_from_response
 from server.test.conftest import test_client, session
 from server.resources.models.execution import ExecutionSchema
+from server.resources.models.descriptor.boutiques import Boutiques
+from server.resources.helpers.executions import std_file_path, STDERR_FILENAME
+from server.database.models.execution import Execution as ExecutionDB, ExecutionStatus
 from server.test.fakedata.executions import post_valid_execution
 from server.test.fakedata.pipelines import (
     PipelineStub, BOUTIQUES_SLEEP_ORIGINAL, BOUTIQUES_SLEEP_CONVERTED,
@@ -92,3 +95,53 @@ class TestExecutionPlayResource():
 
         with open(output_path) as f:
             assert f.read() == 'Welcome to CARMIN-Server, Jane Doe.\n'
+
+    def test_put_execution_play_timeout(self, test_client, session,
+                                        test_config, post_execution_sleep,
+                                        monkeypatch):
+        monkeypatch.setattr(
+            Boutiques, "execute",
+            classmethod(lambda cls, user_data_dir, descriptor, input_data: [
+                "sleep", "30"]))
+        execution = session.query(ExecutionDB).filter_by(
+            identifier=post_execution_sleep).first()
+        execution.timeout = 1
+        session.commit()
+
+        response = test_client.put(
+            '/executions/{}/play'.format(post_execution_sleep),
+            headers={
+                "apiKey": standard_user().api_key,
+            })
+        assert response.status_code == 204
+
+        execution = session.query(ExecutionDB).filter_by(
+            identifier=post_execution_sleep).first()
+        assert execution.status == ExecutionStatus.ExecutionFailed
+        assert execution.end_date
+        with open(
+                std_file_path(standard_user().username, post_execution_sleep,
+                              STDERR_FILENAME)) as f:
+            assert f.read() == "Execution timed out after 1 seconds"
+
+    def test_put_execution_play_inputs_removed(self, test_client, session,
+                                               test_config,
+                                               post_execution_sleep,
+                                               monkeypatch):
+        # The execution removes its absolute inputs file itself
+        monkeypatch.setattr(
+            Boutiques, "execute",
+            classmethod(lambda cls, user_data_dir, descriptor, input_data: [
+                "rm", input_data]))
+
+        response = test_client.put(
+            '/executions/{}/play'.format(post_execution_sleep),
+            headers={
+                "apiKey": standard_user().api_key,
+            })
+        assert response.status_code == 204
+
+        execution = session.query(ExecutionDB).filter_by(
+            identifier=post_execution_sleep).first()
+        assert execution.status == ExecutionStatus.Finished
+        assert execution.end_date
@@ -1,6 +1,7 @@
 import json
 import copy
 import os
+import hashlib
 import pytest
 from server import app
 from server.resources.models.path import PathSchema
@@ -12,6 +13,8 @@ from server.test.fakedata.users import standard_user, standard_user_2
 from server.test.utils import load_json_data, error_from_response
 from server.test.conftest import test_client, session
 from server.resources.models.execution import ExecutionSchema
+from server.resources.models.descriptor.boutiques import Boutiques
+from server.resources.helpers import checksums
 from server.test.fakedata.executions import post_valid_execution
 from server.test.fakedata.pipelines import (
     PipelineStub, BOUTIQUES_NO_SLEEP_ORIGINAL, BOUTIQUES_NO_SLEEP_CONVERTED)
@@ -88,7 +91,7 @@ class TestExecutionResults():
         error = error_from_response(response)
         expected_error_code_and_message = ErrorCodeAndMessageFormatter(
             CANNOT_GET_RESULT_NOT_COMPLETED_EXECUTION,
-            ExecutionStatus.Initializing.name)
+            ExecutionStatus.Ready.name)
         assert error == expected_error_code_and_message
 
     def test_get_results_user_not_owner(self, test_client, test_config,
@@ -116,3 +119,61 @@ class TestExecutionResults():
             app.config['DATA_DIRECTORY'])
         relative_returned_path = paths[0].platform_path.split("/path/", 1)[1]
         assert relative_returned_path == output_file_path
+
+    def test_get_results_from_manifest(self, test_client, test_config,
+                                       post_execution_no_sleep, monkeypatch):
+        monkeypatch.setattr(
+            Boutiques, "execute",
+            classmethod(lambda cls, user_data_dir, descriptor, input_data: [
+                "sh", "-c", "echo result > result.txt"]))
+        test_client.put(
+            '/executions/{}/play'.format(post_execution_no_sleep),
+            headers={"apiKey": standard_user().api_key})
+        execution_dir = os.path.join(app.config['DATA_DIRECTORY'],
+                                     standard_user().username, "executions",
+                                     post_execution_no_sleep)
+        with open(os.path.join(execution_dir, ".carmin-files",
+                               "outputs.json")) as f:
+            manifest = json.load(f)
+        assert [(output["size"], output["md5"])
+                for output in manifest["files"]
+                ] == [(7, hashlib.md5(b"result\n").hexdigest())]
+
+        response = test_client.get(
+            '/executions/{}/results'.format(post_execution_no_sleep),
+            headers={"apiKey": standard_user().api_key})
+        paths = PathSchema(many=True).load(load_json_data(response)).data
+        assert [path.platform_path.rsplit("/", 1)[1]
+                for path in paths] == ["result.txt"]
+
+        # The manifest is out of date once the output tree changes
+        with open(os.path.join(execution_dir, "added.txt"), 'w') as f:
+            f.write("added")
+        response = test_client.get(
+            '/executions/{}/results'.format(post_execution_no_sleep),
+            headers={"apiKey": standard_user().api_key})
+        paths = PathSchema(many=True).load(load_json_data(response)).data
+        assert sorted(path.platform_path.rsplit("/", 1)[1]
+                      for path in paths) == ["added.txt", "result.txt"]
+
+    def test_results_checksums_computed_once(self, test_client, test_config,
+                                             post_execution_no_sleep,
+                                             monkeypatch):
+        monkeypatch.setattr(
+            Boutiques, "execute",
+            classmethod(lambda cls, user_data_dir, descriptor, input_data: [
+                "sh", "-c", "echo result > result.txt"]))
+        monkeypatch.setitem(app.config, 'PRECOMPUTED_CHECKSUMS',
+                            ['md5', 'sha256'])
+        reads = []
+        compute_checksums = checksums.compute_checksums
+
+        def count_reads(path, algorithms):
+            reads.append((os.path.basename(path), sorted(algorithms)))
+            return compute_checksums(path, algorithms)
+
+        monkeypatch.setattr(checksums, "compute_checksums", count_reads)
+        test_client.put(
+            '/executions/{}/play'.format(post_execution_no_sleep),
+            headers={"apiKey": standard_user().api_key})
+        assert reads == [("result.txt", ["md5", "sha256"])]
@@ -10,7 +10,8 @@ from server import app
 from server.config import TestConfig
 from server.resources.models.execution import ExecutionSchema
 from server.resources.helpers.executions import get_execution_carmin_files_dir
-from server.common.error_codes_and_messages import ErrorCodeAndMessageFormatter, EXECUTION_NOT_FOUND, PATH_DOES_NOT_EXIST
+from server.common.error_codes_and_messages import ErrorCodeAndMessageFormatter, EXECUTION_NOT_FOUND, PATH_DOES_NOT_EXIST, TOO_MANY_STREAMS
+from server.database.models.execution import Execution as ExecutionDB, ExecutionStatus
 
 
 @pytest.fixture
@@ -86,3 +87,53 @@ class TestExecutionStdOutResource():
         expected_error_code_and_message = ErrorCodeAndMessageFormatter(
             EXECUTION_NOT_FOUND, invalid_execution_id)
         assert error == expected_error_code_and_message
+
+    def test_get_execution_std_out_with_offset(self, test_client,
+                                               execution_id, write_std_out):
+        response = test_client.get(
+            '/executions/{}/stdout?offset=8'.format(execution_id),
+            headers={"apiKey": standard_user().api_key})
+        assert response.data.decode('utf8') == write_std_out[8:]
+        assert response.headers['X-Next-Offset'] == str(len(write_std_out))
+
+    def test_get_execution_std_out_with_range(self, test_client, execution_id,
+                                              write_std_out):
+        response = test_client.get(
+            '/executions/{}/stdout'.format(execution_id),
+            headers={
+                "apiKey": standard_user().api_key,
+                "Range": "bytes=0-3"
+            })
+        assert response.status_code == 206
+        assert response.data.decode('utf8') == write_std_out[:4]
+
+    def test_get_execution_std_out_follow_stopped_execution(
+            self, test_client, execution_id, write_std_out):
+        response = test_client.get(
+            '/executions/{}/stdout?follow=true&offset=5'.format(execution_id),
+            headers={"apiKey": standard_user().api_key})
+        assert response.data.decode('utf8') == write_std_out[5:]
+
+    def test_get_execution_std_out_follow_closed_after_max_duration(
+            self, test_client, session, execution_id, write_std_out,
+            monkeypatch):
+        execution = session.query(ExecutionDB).filter_by(
+            identifier=execution_id).first()
+        execution.status = ExecutionStatus.Running
+        session.commit()
+        monkeypatch.setitem(app.config, 'STREAM_MAX_DURATION', 0)
+
+        response = test_client.get(
+            '/executions/{}/stdout?follow=true'.format(execution_id),
+            headers={"apiKey": standard_user().api_key})
+        assert response.data.decode('utf8') == write_std_out
+
+    def test_get_execution_std_out_follow_too_many_streams(
+            self, test_client, execution_id, write_std_out, monkeypatch):
+        monkeypatch.setitem(app.config, 'MAX_STREAMS_PER_WORKER', 0)
+        response = test_client.get(
+            '/executions/{}/stdout?follow=true'.format(execution_id),
+            headers={"apiKey": standard_user().api_key})
+        assert response.status_code == 503
+        assert response.headers['Retry-After']
+        assert error_from_response(response) == TOO_MANY_STREAMS
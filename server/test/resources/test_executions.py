@@ -11,7 +11,9 @@ from server.common.error_codes_and_messages import (
     EXECUTION_IDENTIFIER_MUST_NOT_BE_SET, INVALID_PIPELINE_IDENTIFIER,
     INVALID_MODEL_PROVIDED, INVALID_INPUT_FILE, INVALID_QUERY_PARAMETER)
 from server.resources.models.pipeline import PipelineSchema
-from server.resources.models.execution import ExecutionSchema
+from server.resources.models.execution import ExecutionSchema, ExecutionStatus
+from server.resources.models.descriptor.boutiques import (
+    Boutiques, BOUTIQUES_VALIDATORS)
 from server.test.fakedata.pipelines import PipelineStub, BOUTIQUES_SLEEP_ORIGINAL, BOUTIQUES_SLEEP_CONVERTED
 from server.test.fakedata.executions import (
     post_valid_execution, post_invalid_execution_file_not_exist,
@@ -20,7 +22,13 @@ from server.test.fakedata.executions import (
 from server.test.fakedata.users import standard_user
 from server.test.utils import load_json_data, error_from_response
 from server.test.conftest import test_client, session
-from server.resources.helpers.executions import INPUTS_FILENAME, DESCRIPTOR_FILENAME
+from server.resources.helpers import descriptor_store
+from server.resources.helpers.executions import (
+    INPUTS_FILENAME, DESCRIPTOR_FILENAME, get_descriptor_path)
+from server.resources.helpers.pathnames import DESCRIPTOR_STORE_DIRNAME
+from server.resources.helpers.path import upload_file
+from server.resources.helpers.path_sizes import PATH_SIZE_INDEX
+from server.resources.models.upload_data import UploadData
 
 
 @pytest.fixture
@@ -82,6 +90,125 @@ class TestExecutionsResource():
         assert os.path.isdir(carmin_files_dir)
         assert INPUTS_FILENAME in os.listdir(carmin_files_dir)
         assert DESCRIPTOR_FILENAME in os.listdir(carmin_files_dir)
+        assert execution.status == ExecutionStatus.Ready
+
+    def test_post_shares_stored_descriptor(self, test_client, pipeline):
+        descriptor_paths = []
+        for _ in range(2):
+            response = test_client.post(
+                '/executions',
+                headers={"apiKey": standard_user().api_key},
+                data=json.dumps(ExecutionSchema().dump(
+                    post_valid_execution(pipeline.identifier)).data))
+            execution = ExecutionSchema().load(load_json_data(response)).data
+            descriptor_paths.append(
+                get_descriptor_path(standard_user().username,
+                                    execution.identifier))
+
+        store_dir = os.path.join(app.config['DATA_DIRECTORY'],
+                                 DESCRIPTOR_STORE_DIRNAME)
+        stored_descriptors = os.listdir(store_dir)
+        assert len(stored_descriptors) == 1
+        stored_path = os.path.join(store_dir, stored_descriptors[0])
+        for descriptor_path in descriptor_paths:
+            assert os.path.samefile(descriptor_path, stored_path)
+        with open(stored_path) as f:
+            assert json.load(f) == BOUTIQUES_SLEEP_ORIGINAL
+
+    def test_upload_over_linked_descriptor(self, test_client, pipeline):
+        response = test_client.post(
+            '/executions',
+            headers={"apiKey": standard_user().api_key},
+            data=json.dumps(ExecutionSchema().dump(
+                post_valid_execution(pipeline.identifier)).data))
+        execution = ExecutionSchema().load(load_json_data(response)).data
+        descriptor_path = get_descriptor_path(standard_user().username,
+                                              execution.identifier)
+        store_dir = os.path.join(app.config['DATA_DIRECTORY'],
+                                 DESCRIPTOR_STORE_DIRNAME)
+        stored_path = os.path.join(store_dir, os.listdir(store_dir)[0])
+
+        # The stored descriptor is left out of the size of the data directory
+        user_dir_size = PATH_SIZE_INDEX.get_size(
+            os.path.join(app.config['DATA_DIRECTORY'],
+                         standard_user().username))
+        assert PATH_SIZE_INDEX.get_size(
+            app.config['DATA_DIRECTORY']) == user_dir_size
+
+        with app.test_request_context():
+            _, error = upload_file(
+                UploadData(base64_content="e30=\n", upload_type="File"),
+                descriptor_path)
+        assert not error
+        with open(descriptor_path) as f:
+            assert json.load(f) == {}
+        # The link to the store is replaced, not written through
+        assert not os.path.samefile(descriptor_path, stored_path)
+        with open(stored_path) as f:
+            assert json.load(f) == BOUTIQUES_SLEEP_ORIGINAL
+
+    def test_post_references_descriptor_by_hash(self, test_client, pipeline,
+                                                monkeypatch):
+        def link_not_supported(source, destination):
+            raise OSError
+
+        monkeypatch.setattr(os, "link", link_not_supported)
+        monkeypatch.setattr(descriptor_store, "reflink", link_not_supported)
+        response = test_client.post(
+            '/executions',
+            headers={"apiKey": standard_user().api_key},
+            data=json.dumps(ExecutionSchema().dump(
+                post_valid_execution(pipeline.identifier)).data))
+        execution = ExecutionSchema().load(load_json_data(response)).data
+        assert execution.status == ExecutionStatus.Ready
+
+        descriptor_path = get_descriptor_path(standard_user().username,
+                                              execution.identifier)
+        assert os.path.dirname(descriptor_path) == os.path.join(
+            app.config['DATA_DIRECTORY'], DESCRIPTOR_STORE_DIRNAME)
+        with open(descriptor_path) as f:
+            assert json.load(f) == BOUTIQUES_SLEEP_ORIGINAL
+
+    def test_post_invalid_invocation(self, test_client, pipeline,
+                                     monkeypatch):
+        monkeypatch.setattr(
+            Boutiques, "validate",
+            classmethod(lambda cls, descriptor_path, input_path: (
+                False, "Invalid invocation")))
+        response = test_client.post(
+            '/executions',
+            headers={"apiKey": standard_user().api_key},
+            data=json.dumps(ExecutionSchema().dump(
+                post_valid_execution(pipeline.identifier)).data))
+        assert response.status_code == 200
+        execution = ExecutionSchema().load(load_json_data(response)).data
+        assert execution.status == ExecutionStatus.InitializationFailed
+
+        response = test_client.get(
+            '/executions/{}/stderr'.format(execution.identifier),
+            headers={"apiKey": standard_user().api_key})
+        assert b"Invalid invocation" in response.data
+
+    def test_post_validates_with_cached_validator(self, test_client,
+                                                  pipeline):
+        BOUTIQUES_VALIDATORS.clear()
+        for _ in range(2):
+            response = test_client.post(
+                '/executions',
+                headers={"apiKey": standard_user().api_key},
+                data=json.dumps(ExecutionSchema().dump(
+                    post_valid_execution(pipeline.identifier)).data))
+            execution = ExecutionSchema().load(load_json_data(response)).data
+            assert execution.status == ExecutionStatus.Ready
+        assert BOUTIQUES_VALIDATORS.misses == 1
+        assert BOUTIQUES_VALIDATORS.hits == 1
+
+        descriptor_path = os.path.join(app.config['PIPELINE_DIRECTORY'],
+                                       pipeline.descriptor_type,
+                                       pipeline.get_original_filename())
+        success, error = Boutiques.validate_input_values(
+            descriptor_path, {"input_file": 1})
+        assert not success and error
 
     def test_post_file_doesnt_exist(self, test_client, pipeline):
         user_execution_dir = os.path.join(app.config['DATA_DIRECTORY'],
@@ -229,3 +356,47 @@ class TestExecutionsResource():
             })
         json_response = load_json_data(response)
         assert len(json_response) == number_of_executions
+
+    def test_get_with_fields(self, test_client, number_of_executions):
+        response = test_client.get(
+            '/executions?fields=identifier,status',
+            headers={
+                "apiKey": standard_user().api_key
+            })
+        json_response = load_json_data(response)
+        assert len(json_response) == number_of_executions
+        assert all(
+            set(execution) == {"identifier", "status"}
+            for execution in json_response)
+
+    def test_get_with_invalid_fields(self, test_client, number_of_executions):
+        response = test_client.get(
+            '/executions?fields=identifier,invalid',
+            headers={
+                "apiKey": standard_user().api_key
+            })
+        error = error_from_response(response)
+        assert error.error_code == INVALID_QUERY_PARAMETER.error_code
+
+    def test_get_with_after(self, test_client, number_of_executions):
+        response = test_client.get(
+            '/executions?limit=4', headers={"apiKey": standard_user().api_key})
+        first_page = load_json_data(response)
+        response = test_client.get(
+            '/executions?after={}'.format(first_page[-1]["identifier"]),
+            headers={"apiKey": standard_user().api_key})
+        next_page = load_json_data(response)
+        response = test_client.get(
+            '/executions?offset=4', headers={"apiKey": standard_user().api_key})
+        assert [execution["identifier"] for execution in next_page] == [
+            execution["identifier"]
+            for execution in load_json_data(response)
+        ]
+        assert len(next_page) == number_of_executions - 4
+
+    def test_get_with_invalid_after(self, test_client, number_of_executions):
+        response = test_client.get(
+            '/executions?after=invalid',
+            headers={"apiKey": standard_user().api_key})
+        error = error_from_response(response)
+        assert error.error_code == INVALID_QUERY_PARAMETER.error_code
@@ -0,0 +1,122 @@
+import json
+import pytest
+from server import app
+from server.test.fakedata.users import standard_user
+from server.test.utils import load_json_data, error_from_response
+from server.test.conftest import test_client, session
+from server.common.error_codes_and_messages import (
+    ErrorCodeAndMessageFormatter, INVALID_MODEL_PROVIDED, INVALID_INPUT_FILE,
+    EXECUTION_BATCH_TOO_LARGE)
+from server.resources.models.execution import ExecutionSchema
+from server.resources.models.execution_batch import ExecutionBatchResultSchema
+from server.resources.models.descriptor.boutiques import Boutiques
+from server.database.models.execution import ExecutionStatus
+from server.test.fakedata.executions import (
+    post_valid_execution, post_invalid_execution_file_not_exist)
+from server.test.fakedata.pipelines import (
+    PipelineStub, BOUTIQUES_NO_SLEEP_ORIGINAL, BOUTIQUES_NO_SLEEP_CONVERTED)
+
+
+@pytest.fixture
+def pipeline_no_sleep():
+    return PipelineStub(BOUTIQUES_NO_SLEEP_ORIGINAL,
+                        BOUTIQUES_NO_SLEEP_CONVERTED, "no_sleep.json")
+
+
+@pytest.fixture(autouse=True)
+def test_config(tmpdir_factory, session, pipeline_no_sleep):
+    session.add(standard_user(encrypted=True))
+    session.commit()
+
+    pipelines_root = tmpdir_factory.mktemp('pipelines')
+    pipelines_root.join(pipeline_no_sleep.get_converted_filename()).write(
+        pipeline_no_sleep.get_converted_json())
+    boutiques_dir = pipelines_root.mkdir('boutiques')
+    boutiques_dir.join(pipeline_no_sleep.get_original_filename()).write(
+        pipeline_no_sleep.get_original_json())
+    app.config['PIPELINE_DIRECTORY'] = str(pipelines_root)
+
+    data_root = tmpdir_factory.mktemp('data')
+    user_dir = data_root.mkdir(standard_user().username)
+    user_dir.join('test.txt').write('Jane Doe')
+    user_dir.mkdir('executions')
+    app.config['DATA_DIRECTORY'] = str(data_root)
+
+
+def post_batch(test_client, executions, play: bool = False):
+    return test_client.post(
+        '/executions/batch{}'.format('?play=true' if play else ''),
+        headers={"apiKey": standard_user().api_key},
+        data=json.dumps(ExecutionSchema(many=True).dump(executions).data))
+
+
+class TestExecutionsBatchResource():
+    def test_post_batch(self, test_client, pipeline_no_sleep):
+        response = post_batch(test_client, [
+            post_valid_execution(pipeline_no_sleep.identifier),
+            post_invalid_execution_file_not_exist(
+                pipeline_no_sleep.identifier),
+            post_valid_execution(pipeline_no_sleep.identifier)
+        ])
+        assert response.status_code == 200
+        results = ExecutionBatchResultSchema(many=True).load(
+            load_json_data(response)).data
+        assert len(results) == 3
+        assert results[1].execution is None
+        assert results[1].error == ErrorCodeAndMessageFormatter(
+            INVALID_INPUT_FILE, "http://localhost/path/{}/does_not_exist.txt".
+            format(standard_user().username))
+        for result in [results[0], results[2]]:
+            assert result.error is None
+            assert result.execution.status == ExecutionStatus.Ready
+        assert results[0].execution.identifier != results[2].execution.identifier
+
+        response = test_client.get(
+            '/executions', headers={"apiKey": standard_user().api_key})
+        assert len(load_json_data(response)) == 2
+
+    def test_post_batch_play(self, test_client, pipeline_no_sleep,
+                             monkeypatch):
+        monkeypatch.setattr(
+            Boutiques, "execute",
+            classmethod(
+                lambda cls, user_data_dir, descriptor, input_data: ["true"]))
+        response = post_batch(
+            test_client,
+            [post_valid_execution(pipeline_no_sleep.identifier)] * 2,
+            play=True)
+        results = load_json_data(response)
+        assert [result["execution"]["status"] for result in results] == [
+            ExecutionStatus.Finished.name, ExecutionStatus.Finished.name
+        ]
+
+    def test_post_batch_invalid_item(self, test_client, pipeline_no_sleep):
+        response = test_client.post(
+            '/executions/batch',
+            headers={"apiKey": standard_user().api_key},
+            data=json.dumps([{
+                "name": "missing_pipeline_identifier"
+            }]))
+        results = ExecutionBatchResultSchema(many=True).load(
+            load_json_data(response)).data
+        assert results[0].error.error_code == INVALID_MODEL_PROVIDED.error_code
+
+    def test_post_batch_not_a_list(self, test_client, pipeline_no_sleep):
+        response = test_client.post(
+            '/executions/batch',
+            headers={"apiKey": standard_user().api_key},
+            data=json.dumps(
+                ExecutionSchema().dump(
+                    post_valid_execution(pipeline_no_sleep.identifier)).data))
+        assert response.status_code == 400
+        assert error_from_response(response) == INVALID_MODEL_PROVIDED
+
+    def test_post_batch_too_large(self, test_client, pipeline_no_sleep,
+                                  monkeypatch):
+        monkeypatch.setitem(app.config, 'MAX_EXECUTION_BATCH_SIZE', 1)
+        response = post_batch(
+            test_client,
+            [post_valid_execution(pipeline_no_sleep.identifier)] * 2)
+        assert response.status_code == 400
+        assert error_from_response(response) == ErrorCodeAndMessageFormatter(
+            EXECUTION_BATCH_TOO_LARGE, 1)
@@ -1,7 +1,13 @@
 import pytest
 import os
 import json
+import io
+import base64
+import hashlib
+import tarfile
 import zipfile
+import time
+import threading
 from server import app
 from server.config import TestConfig
 from server.test.utils import load_json_data, error_from_response
@@ -9,16 +15,32 @@ from server.test.conftest import test_client, session
 from server.common.error_codes_and_messages import (
     MD5_ON_DIR, INVALID_PATH, UNAUTHORIZED, ACTION_REQUIRED, INVALID_ACTION,
     LIST_ACTION_ON_FILE, INVALID_MODEL_PROVIDED, PATH_EXISTS,
-    INVALID_UPLOAD_TYPE, PATH_DOES_NOT_EXIST, PATH_IS_DIRECTORY)
+    INVALID_UPLOAD_TYPE, PATH_DOES_NOT_EXIST, PATH_IS_DIRECTORY,
+    INVALID_QUERY_PARAMETER, CHUNK_CHECKSUM_MISMATCH, UPLOAD_OFFSET_MISMATCH,
+    ARCHIVE_LIMIT_EXCEEDED, ErrorCodeAndMessageFormatter)
 from server.resources.models.path import Path, PathSchema
 from server.resources.models.path_md5 import PathMD5Schema
+from server.resources.models.path_checksum import PathChecksumSchema
 from server.resources.models.upload_data import UploadData, UploadDataSchema
 from server.resources.models.boolean_response import BooleanResponseSchema
 from server.resources.models.error_code_and_message import ErrorCodeAndMessageSchema
 from server.resources.path import generate_md5
+from server.resources.helpers import path as path_helpers
+from server.resources.helpers.resumable_uploads import (
+    lock_upload_session, delete_expired_upload_sessions)
+from server.resources.models.archive_extraction import ArchiveExtractionSchema
+from server.resources.helpers.path_sizes import PathSizeIndex
 from server.test.fakedata.users import standard_user
 
 
+def make_old(directory: str):
+    """Sets the modification time of the directories of `directory` an hour
+    back, as recently modified directories are not cached."""
+    old_time = time.time() - 3600
+    for subdirectory, _, _ in os.walk(directory):
+        os.utime(subdirectory, (old_time, old_time))
+
+
 @pytest.fixture(autouse=True)
 def test_config(tmpdir_factory, session):
     session.add(standard_user(True))
@@ -77,6 +99,19 @@ def put_dir():
     return UploadData(base64_content=base64, upload_type="Archive", md5='')
 
 
+def archive_upload_data(mode: str, files: dict) -> UploadData:
+    archive_bytes = io.BytesIO()
+    with tarfile.open(fileobj=archive_bytes, mode=mode) as archive:
+        for name, content in files.items():
+            tar_info = tarfile.TarInfo(name)
+            tar_info.size = len(content)
+            archive.addfile(tar_info, io.BytesIO(content))
+    return UploadData(
+        base64_content=base64.b64encode(archive_bytes.getvalue()).decode(),
+        upload_type="Archive",
+        md5='')
+
+
 class TestPathResource():
 
     # tests for GET
@@ -117,6 +152,36 @@ class TestPathResource():
                 "apiKey": standard_user().api_key
             })
         assert response.data == b'{"test": "json"}'
+        assert response.headers['Accept-Ranges'] == 'bytes'
+        assert response.headers['ETag']
+
+    def test_get_content_action_with_range(self, test_client):
+        response = test_client.get(
+            '/path/{}/file.json?action=content'.format(
+                standard_user().username),
+            headers={
+                "apiKey": standard_user().api_key,
+                "Range": "bytes=1-6"
+            })
+        assert response.status_code == 206
+        assert response.data == b'"test"'
+        assert response.headers['Content-Range'] == 'bytes 1-6/16'
+
+    def test_get_content_action_with_matching_etag(self, test_client):
+        url = '/path/{}/file.json?action=content'.format(
+            standard_user().username)
+        response = test_client.get(
+            url, headers={"apiKey": standard_user().api_key})
+        etag = response.headers['ETag']
+
+        response = test_client.get(
+            url,
+            headers={
+                "apiKey": standard_user().api_key,
+                "If-None-Match": etag
+            })
+        assert response.status_code == 304
+        assert response.data == b''
 
     def test_get_content_action_with_invalid_file(self, test_client):
         response = test_client.get(
@@ -136,6 +201,58 @@ class TestPathResource():
                 "apiKey": standard_user().api_key
             })
         assert response.headers['Content-Type'] == 'application/gzip'
+        with tarfile.open(fileobj=io.BytesIO(response.data)) as archive:
+            assert archive.getmember('subdirectory').isdir()
+
+    def test_get_content_action_with_dir_uncompressed_tar(self, test_client):
+        response = test_client.get(
+            '/path/{}?action=content&compression=0'.format(
+                standard_user().username),
+            headers={
+                "apiKey": standard_user().api_key
+            })
+        assert response.headers['Content-Type'] == 'application/x-tar'
+        with tarfile.open(
+                fileobj=io.BytesIO(response.data), mode='r:') as archive:
+            assert archive.extractfile('{}/file.json'.format(
+                standard_user().username)).read() == b'{"test": "json"}'
+
+    def test_get_content_action_with_dir_zip(self, test_client):
+        response = test_client.get(
+            '/path/{}?action=content&format=zip'.format(
+                standard_user().username),
+            headers={
+                "apiKey": standard_user().api_key
+            })
+        assert response.headers['Content-Type'] == 'application/zip'
+        with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+            assert archive.read('{}/test.txt'.format(
+                standard_user().username)) == b'content'
+
+    def test_get_content_action_with_dir_invalid_compression(
+            self, test_client):
+        response = test_client.get(
+            '/path/{}/subdirectory?action=content&compression=10'.format(
+                standard_user().username),
+            headers={
+                "apiKey": standard_user().api_key
+            })
+        assert response.status_code == 400
+        error = error_from_response(response)
+        assert error.error_code == INVALID_QUERY_PARAMETER.error_code
+
+    def test_get_content_action_with_dir_non_integer_compression(
+            self, test_client):
+        response = test_client.get(
+            '/path/{}/subdirectory?action=content&compression=best'.format(
+                standard_user().username),
+            headers={
+                "apiKey": standard_user().api_key
+            })
+        assert response.status_code == 400
+        error = error_from_response(response)
+        assert error.error_code == INVALID_QUERY_PARAMETER.error_code
+        assert "best" in error.error_message
 
     def test_get_content_action_with_invalid_dir(self, test_client):
         response = test_client.get(
@@ -167,6 +284,78 @@ class TestPathResource():
         path = PathSchema().load(load_json_data(response)).data
         assert path == dir_object
 
+    def test_get_properties_action_with_dir_after_put(self, test_client):
+        properties_url = '/path/{}?action=properties'.format(
+            standard_user().username)
+        response = test_client.get(
+            properties_url, headers={"apiKey": standard_user().api_key})
+        size = PathSchema().load(load_json_data(response)).data.size
+
+        # Overwriting a file does not change the modification time of its
+        # parent directory
+        response = test_client.put(
+            '/path/{}/test.txt'.format(
+                standard_user().username),
+            headers={"apiKey": standard_user().api_key},
+            data="more content")
+        assert response.status_code == 201
+
+        response = test_client.get(
+            properties_url, headers={"apiKey": standard_user().api_key})
+        path = PathSchema().load(load_json_data(response)).data
+        assert path.size == size + len("more content") - len("content")
+
+    def test_path_size_after_nested_add(self, tmpdir):
+        nested_dir = tmpdir.mkdir('a').mkdir('b')
+        nested_dir.join('f').write(b'0' * 100, mode='wb')
+        make_old(str(tmpdir))
+        index = PathSizeIndex()
+        assert index.get_size(str(tmpdir)) == 100
+
+        # Only the modification time of 'b' changes, and nothing is
+        # invalidated, as when another process writes the file
+        nested_dir.join('g').write(b'0' * 1000, mode='wb')
+        assert index.get_size(str(tmpdir)) == 1100
+
+    def test_path_size_after_in_place_write(self, tmpdir):
+        nested_dir = tmpdir.mkdir('a')
+        nested_dir.join('f').write(b'0' * 100, mode='wb')
+        make_old(str(tmpdir))
+        index, other_index = PathSizeIndex(), PathSizeIndex()
+        assert index.get_size(str(tmpdir)) == 100
+        assert other_index.get_size(str(tmpdir)) == 100
+
+        # The directory of the file is touched, so that the indexes of the
+        # other processes see the change as well
+        nested_dir.join('f').write(b'0' * 1000, mode='wb')
+        assert other_index.get_size(str(tmpdir)) == 100
+        index.invalidate(str(nested_dir.join('f')))
+        assert other_index.get_size(str(tmpdir)) == 1000
+
+    def test_path_size_of_running_execution(self, tmpdir):
+        execution_dir = tmpdir.mkdir('executions').mkdir('execution')
+        marker = execution_dir.mkdir('.carmin-files').join('running')
+        marker.write('')
+        execution_dir.join('stdout.txt').write(b'0' * 100, mode='wb')
+        make_old(str(tmpdir))
+        index = PathSizeIndex()
+        assert index.get_size(str(tmpdir)) == 100
+        assert index.get_size(str(execution_dir)) == 100
+
+        # The outputs of a running execution grow in place
+        execution_dir.join('stdout.txt').write(b'0' * 1000, mode='wb')
+        assert index.get_size(str(tmpdir)) == 1000
+        assert index.get_size(str(execution_dir)) == 1000
+
+    def test_path_size_index_bounded(self, tmpdir, monkeypatch):
+        monkeypatch.setitem(app.config, 'PATH_SIZE_INDEX_SIZE', 2)
+        for name in ['a', 'b', 'c']:
+            tmpdir.mkdir(name)
+        make_old(str(tmpdir))
+        index = PathSizeIndex()
+        assert index.get_size(str(tmpdir)) == 0
+        assert len(index._sizes) == 2
+
     def test_get_exists_action(self, test_client):
         response = test_client.get(
             '/path/{}/empty_dir?action=exists'.format(
@@ -202,6 +391,40 @@ class TestPathResource():
                          '{}/subdirectory'.format(standard_user().username)))
         assert len(expected_paths_list) == len(paths)
 
+    def test_get_list_action_with_name_filter_and_pagination(
+            self, test_client):
+        response = test_client.get(
+            '/path/{}?action=list&name=*.txt&sort=-name&offset=1&limit=1'.
+            format(standard_user().username),
+            headers={
+                "apiKey": standard_user().api_key
+            })
+        paths = PathSchema(many=True).load(load_json_data(response)).data
+        assert [os.path.basename(p.platform_path)
+                for p in paths] == ['subdir_text.txt']
+
+    def test_get_list_action_sorted_by_size(self, test_client):
+        response = test_client.get(
+            '/path/{}?action=list&sort=size'.format(standard_user().username),
+            headers={
+                "apiKey": standard_user().api_key
+            })
+        paths = PathSchema(many=True).load(load_json_data(response)).data
+        sizes = [p.size for p in paths]
+        assert len(paths) == 6
+        assert sizes == sorted(sizes)
+
+    def test_get_list_action_with_invalid_sort(self, test_client):
+        response = test_client.get(
+            '/path/{}?action=list&sort=invalid'.format(
+                standard_user().username),
+            headers={
+                "apiKey": standard_user().api_key
+            })
+        assert response.status_code == 400
+        error = error_from_response(response)
+        assert error.error_code == INVALID_QUERY_PARAMETER.error_code
+
     def test_get_list_action_with_file(self, test_client):
         response = test_client.get(
             '/path/{}/file.json?action=list'.format(standard_user().username),
@@ -222,6 +445,44 @@ class TestPathResource():
             os.path.join(app.config['DATA_DIRECTORY'], "{}/file.json".format(
                 standard_user().username)))
 
+    def test_get_md5_action_after_put(self, test_client):
+        url = '/path/{}/test.txt'.format(standard_user().username)
+        response = test_client.get(
+            url + '?action=md5', headers={"apiKey": standard_user().api_key})
+        md5 = PathMD5Schema().load(load_json_data(response)).data
+        assert md5.md5 == hashlib.md5(b"content").hexdigest()
+
+        test_client.put(
+            url,
+            headers={"apiKey": standard_user().api_key},
+            data="new content")
+        response = test_client.get(
+            url + '?action=md5', headers={"apiKey": standard_user().api_key})
+        md5 = PathMD5Schema().load(load_json_data(response)).data
+        assert md5.md5 == hashlib.md5(b"new content").hexdigest()
+
+    def test_get_checksum_action_with_file(self, test_client):
+        response = test_client.get(
+            '/path/{}/test.txt?action=checksum&algorithm=sha256'.format(
+                standard_user().username),
+            headers={
+                "apiKey": standard_user().api_key
+            })
+        checksum = PathChecksumSchema().load(load_json_data(response)).data
+        assert checksum.algorithm == 'sha256'
+        assert checksum.checksum == hashlib.sha256(b"content").hexdigest()
+
+    def test_get_checksum_action_with_invalid_algorithm(self, test_client):
+        response = test_client.get(
+            '/path/{}/test.txt?action=checksum&algorithm=crc'.format(
+                standard_user().username),
+            headers={
+                "apiKey": standard_user().api_key
+            })
+        assert response.status_code == 400
+        error = error_from_response(response)
+        assert error.error_code == INVALID_QUERY_PARAMETER.error_code
+
     def test_get_md5_action_with_dir(self, test_client):
         response = test_client.get(
             '/path/{}/subdirectory?action=md5'.format(
@@ -324,6 +585,116 @@ class TestPathResource():
             data=json.dumps(UploadDataSchema().dump(put_dir).data))
         assert response.status_code == 400
 
+    def test_put_base64_tar_gz_dir(self, test_client):
+        path = '{}/new_dir'.format(standard_user().username)
+        abs_path = os.path.join(app.config['DATA_DIRECTORY'], path)
+        response = test_client.put(
+            '/path/{}'.format(path),
+            headers={
+                "apiKey": standard_user().api_key,
+                "Content-Type": "application/carmin+json"
+            },
+            data=json.dumps(
+                UploadDataSchema().dump(
+                    archive_upload_data('w:gz', {
+                        'a/b.txt': b'b content',
+                        'c.txt': b'c'
+                    })).data))
+        assert response.status_code == 201
+        with open(os.path.join(abs_path, 'a', 'b.txt'), 'rb') as f:
+            assert f.read() == b'b content'
+        assert not [
+            name for name in os.listdir(os.path.dirname(abs_path))
+            if name.startswith('.new_dir')
+        ]
+
+    def test_put_archive_unsafe_member(self, test_client):
+        path = '{}/new_dir'.format(standard_user().username)
+        abs_path = os.path.join(app.config['DATA_DIRECTORY'], path)
+        response = test_client.put(
+            '/path/{}'.format(path),
+            headers={
+                "apiKey": standard_user().api_key,
+                "Content-Type": "application/carmin+json"
+            },
+            data=json.dumps(
+                UploadDataSchema().dump(
+                    archive_upload_data('w', {
+                        '../escaped.txt': b'escaped'
+                    })).data))
+        assert response.status_code == 400
+        assert not os.path.exists(abs_path)
+        assert not os.path.exists(
+            os.path.join(os.path.dirname(abs_path), 'escaped.txt'))
+
+    def test_put_archive_too_many_entries(self, test_client, monkeypatch):
+        monkeypatch.setitem(app.config, 'MAX_ARCHIVE_ENTRIES', 1)
+        path = '{}/new_dir'.format(standard_user().username)
+        response = test_client.put(
+            '/path/{}'.format(path),
+            headers={
+                "apiKey": standard_user().api_key,
+                "Content-Type": "application/carmin+json"
+            },
+            data=json.dumps(
+                UploadDataSchema().dump(
+                    archive_upload_data('w', {
+                        'b.txt': b'b',
+                        'c.txt': b'c'
+                    })).data))
+        error = error_from_response(response)
+        assert error.error_code == ARCHIVE_LIMIT_EXCEEDED.error_code
+
+    def test_put_archive_extracted_in_background(self, test_client,
+                                                 monkeypatch):
+        path = '{}/new_dir'.format(standard_user().username)
+        abs_path = os.path.join(app.config['DATA_DIRECTORY'], path)
+        extraction_status_url = '/path/{}?action=extraction'.format(path)
+        extraction_started = threading.Event()
+        extraction_allowed = threading.Event()
+
+        def failing_extraction(archive_path, destination, *args):
+            extraction_started.set()
+            extraction_allowed.wait(10)
+            return ErrorCodeAndMessageFormatter(ARCHIVE_LIMIT_EXCEEDED, 1,
+                                                'entries')
+
+        monkeypatch.setattr(path_helpers, 'extract_archive',
+                            failing_extraction)
+        monkeypatch.setitem(app.config, 'TESTING', False)
+        response = test_client.put(
+            '/path/{}'.format(path),
+            headers={
+                "apiKey": standard_user().api_key,
+                "Content-Type": "application/carmin+json"
+            },
+            data=json.dumps(
+                UploadDataSchema().dump(
+                    archive_upload_data('w', {'b.txt': b'b'})).data))
+        assert response.status_code == 202
+        assert extraction_started.wait(10)
+
+        response = test_client.get(
+            extraction_status_url,
+            headers={"apiKey": standard_user().api_key})
+        extraction = ArchiveExtractionSchema().load(
+            load_json_data(response)).data
+        assert extraction.status == 'Extracting'
+
+        extraction_allowed.set()
+        deadline = time.monotonic() + 10
+        while extraction.status == 'Extracting':
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+            response = test_client.get(
+                extraction_status_url,
+                headers={"apiKey": standard_user().api_key})
+            extraction = ArchiveExtractionSchema().load(
+                load_json_data(response)).data
+        assert extraction.status == 'Failed'
+        assert extraction.error.error_code == ARCHIVE_LIMIT_EXCEEDED.error_code
+        assert not os.path.exists(abs_path)
+
     def test_put_file_on_dir(self, test_client):
         path = '{}/empty_dir'.format(standard_user().username)
         put_dir = UploadData(
@@ -352,6 +723,166 @@ class TestPathResource():
         with open(file_path) as f:
             assert f.read() == file_content
 
+    def test_put_file_raw_binary(self, test_client):
+        path = '{}/test_file_raw.bin'.format(standard_user().username)
+        file_content = b"\x89PNG\r\n\x1a\n\xff\xfe\x00"
+        response = test_client.put(
+            '/path/{}'.format(path),
+            headers={"apiKey": standard_user().api_key},
+            data=file_content)
+        assert response.status_code == 201
+
+        file_path = os.path.join(app.config['DATA_DIRECTORY'], path)
+        with open(file_path, 'rb') as f:
+            assert f.read() == file_content
+
+    def test_put_file_octet_stream(self, test_client):
+        path = '{}/test_file_stream.bin'.format(standard_user().username)
+        file_content = os.urandom(3 * 1024 * 1024 + 7)
+        response = test_client.put(
+            '/path/{}'.format(path),
+            headers={"apiKey": standard_user().api_key},
+            content_type='application/octet-stream',
+            input_stream=io.BytesIO(file_content),
+            content_length=len(file_content))
+        assert response.status_code == 201
+        assert PathSchema().load(
+            load_json_data(response)).data.size == len(file_content)
+
+        file_path = os.path.join(app.config['DATA_DIRECTORY'], path)
+        with open(file_path, 'rb') as f:
+            assert f.read() == file_content
+        assert not [
+            f for f in os.listdir(os.path.dirname(file_path))
+            if f.endswith('.upload')
+        ]
+
+    def test_put_octet_stream_on_directory(self, test_client):
+        response = test_client.put(
+            '/path/{}/subdirectory'.format(standard_user().username),
+            headers={"apiKey": standard_user().api_key},
+            content_type='application/octet-stream',
+            data=b"content")
+        assert response.status_code == 400
+        error = error_from_response(response)
+        assert error.error_code == PATH_IS_DIRECTORY.error_code
+
+    def test_put_file_resumable(self, test_client):
+        path = '/path/{}/test_file_resumable.bin'.format(
+            standard_user().username)
+        file_content = os.urandom(1000)
+        headers = {"apiKey": standard_user().api_key}
+
+        response = test_client.put(
+            path,
+            headers=dict(headers, **{"Content-Range": "bytes 0-599/1000"}),
+            content_type='application/octet-stream',
+            data=file_content[:600])
+        assert response.status_code == 308
+        assert response.headers['Range'] == 'bytes=0-599'
+
+        # A chunk that does not match its checksum is dropped
+        response = test_client.put(
+            path,
+            headers=dict(
+                headers, **{
+                    "Content-Range": "bytes 600-999/1000",
+                    "Content-MD5": "invalid"
+                }),
+            content_type='application/octet-stream',
+            data=file_content[600:])
+        assert error_from_response(
+            response).error_code == CHUNK_CHECKSUM_MISMATCH.error_code
+
+        response = test_client.put(
+            path,
+            headers=dict(headers, **{"Content-Range": "bytes */1000"}),
+            content_type='application/octet-stream')
+        assert response.status_code == 308
+        assert response.headers['Range'] == 'bytes=0-599'
+
+        response = test_client.put(
+            path,
+            headers=dict(
+                headers, **{
+                    "Content-Range":
+                    "bytes 600-999/1000",
+                    "Content-MD5":
+                    base64.b64encode(
+                        hashlib.md5(file_content[600:]).digest()).decode()
+                }),
+            content_type='application/octet-stream',
+            data=file_content[600:])
+        assert response.status_code == 201
+        assert response.headers['Digest'] == 'md5={}'.format(
+            base64.b64encode(hashlib.md5(file_content).digest()).decode())
+
+        file_path = os.path.join(app.config['DATA_DIRECTORY'],
+                                 standard_user().username,
+                                 'test_file_resumable.bin')
+        with open(file_path, 'rb') as f:
+            assert f.read() == file_content
+        assert not os.listdir(
+            os.path.join(app.config['DATA_DIRECTORY'],
+                         standard_user().username, '.uploads'))
+
+    def test_put_file_resumable_with_wrong_offset(self, test_client):
+        response = test_client.put(
+            '/path/{}/test_file_resumable.bin'.format(
+                standard_user().username),
+            headers={
+                "apiKey": standard_user().api_key,
+                "Content-Range": "bytes 10-19/100"
+            },
+            content_type='application/octet-stream',
+            data=b"0123456789")
+        assert response.status_code == 400
+        error = error_from_response(response)
+        assert error.error_code == UPLOAD_OFFSET_MISMATCH.error_code
+
+    def test_put_file_resumable_session_lock(self, test_client):
+        user_data_directory = os.path.join(app.config['DATA_DIRECTORY'],
+                                           standard_user().username)
+        target_path = os.path.join(user_data_directory,
+                                   'test_file_resumable.bin')
+        with lock_upload_session(user_data_directory, target_path) as locked:
+            assert locked
+            with lock_upload_session(
+                    user_data_directory, target_path,
+                    blocking=False) as other_locked:
+                assert not other_locked
+        with lock_upload_session(
+                user_data_directory, target_path,
+                blocking=False) as other_locked:
+            assert other_locked
+
+    def test_put_file_resumable_expired_session(self, test_client):
+        user_data_directory = os.path.join(app.config['DATA_DIRECTORY'],
+                                           standard_user().username)
+        uploads_directory = os.path.join(user_data_directory, '.uploads')
+        response = test_client.put(
+            '/path/{}/test_file_resumable.bin'.format(
+                standard_user().username),
+            headers={
+                "apiKey": standard_user().api_key,
+                "Content-Range": "bytes 0-9/100"
+            },
+            content_type='application/octet-stream',
+            data=b"0123456789")
+        assert response.status_code == 308
+
+        delete_expired_upload_sessions(user_data_directory)
+        assert os.listdir(uploads_directory)
+
+        expired_time = time.time() - app.config['UPLOAD_SESSION_TTL'] - 1
+        for session_id in os.listdir(uploads_directory):
+            part_path = os.path.join(uploads_directory, session_id,
+                                     'data.part')
+            if os.path.exists(part_path):
+                os.utime(part_path, (expired_time, expired_time))
+        delete_expired_upload_sessions(user_data_directory)
+        assert not os.listdir(uploads_directory)
+
     # tests for DELETE
     def test_delete_single_file(self, test_client):
         file_to_delete = "{}/file.json".format(standard_user().username)
@@ -9,7 +9,14 @@ from server.config import TestConfig
 from server.resources.models.error_code_and_message import ErrorCodeAndMessageSchema
 from server.common.error_codes_and_messages import INVALID_PIPELINE_IDENTIFIER
 from server.resources.models.pipeline import PipelineSchema
-from server.test.fakedata.pipelines import (NameStudyOne, PipelineOne)
+from server.resources.helpers.pipelines import (
+    export_all_pipelines, export_pipeline, export_outdated_pipeline)
+from server.resources.models.descriptor.boutiques import Boutiques
+from server.resources.helpers.pipeline_watcher import (
+    PipelineWatcher, PipelineRegistryWatcher)
+from server.test.fakedata.pipelines import (
+    NameStudyOne, PipelineOne, BOUTIQUES_SLEEP_ORIGINAL,
+    BOUTIQUES_NO_SLEEP_ORIGINAL)
 
 
 @pytest.fixture(autouse=True)
@@ -53,3 +60,102 @@ class TestPipelineBoutiquesDescriptorResource():
             headers={"apiKey": standard_user().api_key})
         error = error_from_response(response)
         assert error == INVALID_PIPELINE_IDENTIFIER
+
+    def test_get_pipeline_boutiques_descriptor_added_while_running(
+            self, test_client):
+        watcher = PipelineWatcher(app.config['PIPELINE_DIRECTORY'])
+        boutiques_directory = os.path.join(app.config['PIPELINE_DIRECTORY'],
+                                           'boutiques')
+        with open(os.path.join(boutiques_directory, 'sleep.json'), 'w') as f:
+            json.dump(BOUTIQUES_SLEEP_ORIGINAL, f)
+        watcher.poll()
+
+        response = test_client.get(
+            '/pipelines/boutiques_sleep.json/boutiquesdescriptor',
+            headers={"apiKey": standard_user().api_key})
+        assert load_json_data(response) == BOUTIQUES_SLEEP_ORIGINAL
+
+        os.remove(os.path.join(boutiques_directory, 'sleep.json'))
+        watcher.poll()
+
+        response = test_client.get(
+            '/pipelines/boutiques_sleep.json/boutiquesdescriptor',
+            headers={"apiKey": standard_user().api_key})
+        error = error_from_response(response)
+        assert error == INVALID_PIPELINE_IDENTIFIER
+
+    def test_get_pipeline_boutiques_descriptor_exported_by_another_process(
+            self, test_client):
+        registry_watcher = PipelineRegistryWatcher(
+            app.config['PIPELINE_DIRECTORY'])
+        response = test_client.get(
+            '/pipelines/boutiques_sleep.json/boutiquesdescriptor',
+            headers={"apiKey": standard_user().api_key})
+        assert error_from_response(response) == INVALID_PIPELINE_IDENTIFIER
+
+        descriptor_path = os.path.join(app.config['PIPELINE_DIRECTORY'],
+                                       'boutiques', 'sleep.json')
+        with open(descriptor_path, 'w') as f:
+            json.dump(BOUTIQUES_SLEEP_ORIGINAL, f)
+        # Exporting does not update the registry by itself
+        carmin_pipeline, error = export_pipeline('boutiques', descriptor_path)
+        assert not error
+        registry_watcher.poll()
+
+        response = test_client.get(
+            '/pipelines/boutiques_sleep.json/boutiquesdescriptor',
+            headers={"apiKey": standard_user().api_key})
+        assert load_json_data(response) == BOUTIQUES_SLEEP_ORIGINAL
+
+        os.remove(carmin_pipeline)
+        registry_watcher.poll()
+
+        response = test_client.get(
+            '/pipelines/boutiques_sleep.json/boutiquesdescriptor',
+            headers={"apiKey": standard_user().api_key})
+        error = error_from_response(response)
+        assert error == INVALID_PIPELINE_IDENTIFIER
+
+    def test_export_all_pipelines_skips_up_to_date_descriptors(
+            self, tmpdir_factory):
+        root_directory = tmpdir_factory.mktemp('pipelines')
+        boutiques_directory = root_directory.mkdir('boutiques')
+        boutiques_directory.join('sleep.json').write(
+            json.dumps(BOUTIQUES_SLEEP_ORIGINAL))
+        boutiques_directory.join('no_sleep.json').write(
+            json.dumps(BOUTIQUES_NO_SLEEP_ORIGINAL))
+        app.config['PIPELINE_DIRECTORY'] = str(root_directory)
+
+        success, error = export_all_pipelines()
+        assert success and not error
+        exported_pipeline = root_directory.join('boutiques_sleep.json')
+        assert exported_pipeline.check()
+        assert root_directory.join('.boutiques_sleep.json.sha256').check()
+        assert root_directory.join('boutiques_no_sleep.json').check()
+
+        no_sleep_pipeline = root_directory.join('boutiques_no_sleep.json')
+        no_sleep_mtime = no_sleep_pipeline.mtime()
+        exported_pipeline.write('damaged')
+        success, error = export_all_pipelines()
+        assert success and not error
+        assert exported_pipeline.read() != 'damaged'
+        assert no_sleep_pipeline.mtime() == no_sleep_mtime
+
+    def test_export_all_pipelines_on_exporter_upgrade(self, tmpdir_factory,
+                                                      monkeypatch):
+        root_directory = tmpdir_factory.mktemp('pipelines')
+        boutiques_directory = root_directory.mkdir('boutiques')
+        boutiques_directory.join('sleep.json').write(
+            json.dumps(BOUTIQUES_SLEEP_ORIGINAL))
+        app.config['PIPELINE_DIRECTORY'] = str(root_directory)
+        descriptor_path = str(boutiques_directory.join('sleep.json'))
+
+        _, exported, _ = export_outdated_pipeline('boutiques', descriptor_path)
+        assert exported
+        _, exported, _ = export_outdated_pipeline('boutiques', descriptor_path)
+        assert not exported
+
+        monkeypatch.setattr(Boutiques, 'exporter_version',
+                            classmethod(lambda cls: "boutiques 99.0"))
+        _, exported, _ = export_outdated_pipeline('boutiques', descriptor_path)
+        assert exported
@@ -8,9 +8,10 @@ from server import app
 from server.resources.models.error_code_and_message import ErrorCodeAndMessageSchema
 from server.common.error_codes_and_messages import MISSING_PIPELINE_PROPERTY
 from server.resources.models.pipeline import PipelineSchema
+from server.resources.helpers.pipeline_registry import PIPELINE_REGISTRY
 from server.test.fakedata.pipelines import (
     NameStudyOne, NameStudyTwo, PipelineOne, PipelineTwo, PipelineThree,
-    PropNameOne, PropNameTwo, PropValueOne, PropValueTwo, PropValueThree)
+    PIPELINE_FOUR, PropNameOne, PropNameTwo, PropValueOne, PropValueTwo, PropValueThree)
 
 
 @pytest.fixture(scope='module', autouse=True)
@@ -111,3 +112,28 @@ class TestPipelinesResource():
         assert PipelineOne in pipeline
         assert PipelineTwo not in pipeline
         assert PipelineThree not in pipeline
+
+    def test_get_pipeline_added_after_registry_load(self, test_client):
+        new_pipeline_path = os.path.join(app.config['PIPELINE_DIRECTORY'],
+                                         NameStudyTwo, 'pipeline4.json')
+        with open(new_pipeline_path, 'w') as f:
+            f.write(PipelineSchema().dumps(PIPELINE_FOUR).data)
+
+        response = test_client.get(
+            '/pipelines/{}'.format(PIPELINE_FOUR.identifier),
+            headers={
+                "apiKey": standard_user().api_key
+            })
+        assert response.status_code == 400
+
+        PIPELINE_REGISTRY.update(new_pipeline_path)
+        response = test_client.get(
+            '/pipelines/{}'.format(PIPELINE_FOUR.identifier),
+            headers={
+                "apiKey": standard_user().api_key
+            })
+        pipeline = PipelineSchema().load(load_json_data(response)).data
+        assert pipeline == PIPELINE_FOUR
+
+        os.remove(new_pipeline_path)
+        PIPELINE_REGISTRY.remove(new_pipeline_path)
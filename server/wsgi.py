@@ -0,0 +1,124 @@
+"""Production entry point, serving the API with the gunicorn pre-fork server.
+
+The start up work (pipeline export, execution purge, ...) is done once, in the
+master process, before `WORKERS` worker processes are forked with `THREADS`
+threads each. Executions are initialized and run by a single supervisor
+process (see `server.supervisor`), started by the master as well.
+
+Sending `SIGHUP` to the master replaces the workers gracefully: the requests
+in progress are given `GRACEFUL_TIMEOUT` seconds to complete, and the streamed
+responses are closed (see `server.resources.helpers.streams`).
+
+If the supervisor process exits, the queue would silently stop: the master
+stops as well, so that the server is restarted as a whole.
+"""
+import os
+import sys
+import signal
+import threading
+import subprocess
+from gunicorn.app.base import BaseApplication
+from server import app
+from server.api import declare_api
+from server.database import db
+from server.startup_validation import start_up
+from server.resources.helpers.pipeline_watcher import start_pipeline_watcher
+from server.resources.helpers.execution_play import EXECUTION_SUPERVISOR
+from server.resources.helpers.execution_initialization import (
+    EXECUTION_INITIALIZER)
+from server.resources.helpers.streams import STREAMS_STOPPING
+
+
+class WSGIServer(BaseApplication):
+    def __init__(self, application, options: dict = None):
+        self.application = application
+        self.options = options or {}
+        self.supervisor_process = None
+        self.stopping = False
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+        self.cfg.set('when_ready', self.when_ready)
+        self.cfg.set('post_fork', self.post_fork)
+        self.cfg.set('post_worker_init', self.post_worker_init)
+        self.cfg.set('on_exit', self.on_exit)
+
+    def load(self):
+        return self.application
+
+    def when_ready(self, server):
+        # Started once the sockets are bound, so that the supervisor does not
+        # outlive a master which failed to start
+        self.supervisor_process = subprocess.Popen(
+            [sys.executable, '-m', 'server.supervisor'])
+        threading.Thread(
+            target=self.watch_supervisor,
+            args=(server, ),
+            name="supervisor-watcher",
+            daemon=True).start()
+
+    def watch_supervisor(self, server):
+        exit_code = self.supervisor_process.wait()
+        if self.stopping:
+            return
+        server.log.error(
+            "The execution supervisor exited with code {}: stopping the "
+            "server.".format(exit_code))
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    def post_fork(self, server, worker):
+        # Connections opened by the master must not be shared between workers
+        db.engine.dispose()
+        EXECUTION_SUPERVISOR.remote = True
+        EXECUTION_INITIALIZER.remote = True
+        start_pipeline_watcher(export=False)
+
+    def post_worker_init(self, worker):
+        # The worker stops gracefully on SIGTERM, which must close the
+        # streams as well
+        handle_exit = signal.getsignal(signal.SIGTERM)
+
+        def close_streams(signum, frame):
+            STREAMS_STOPPING.set()
+            handle_exit(signum, frame)
+
+        signal.signal(signal.SIGTERM, close_streams)
+
+    def on_exit(self, server):
+        self.stopping = True
+        if self.supervisor_process:
+            self.supervisor_process.terminate()
+            self.supervisor_process.wait()
+
+
+def main():
+    if len(sys.argv) > 1:
+        port = sys.argv[1]
+        try:
+            port = int(port)
+        except ValueError:
+            print("Invalid port number. Port must be an integer.")
+            exit(1)
+    else:
+        port = 8080
+
+    declare_api(app)
+    start_up()
+    db.engine.dispose()
+
+    server = WSGIServer(
+        app, {
+            'bind': '0.0.0.0:{}'.format(port),
+            'workers': app.config['WORKERS'],
+            'threads': app.config['THREADS'],
+            'worker_class': 'gthread',
+            'graceful_timeout': app.config['GRACEFUL_TIMEOUT'],
+            'preload_app': True
+        })
+    server.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -15,7 +15,8 @@ DEPS = [
     "psycopg2-binary>=2.7.4,<3.0", "marshmallow>=2.15.0,<3.0",
     "marshmallow_enum>=1.4.1,<2.0", "boutiques>=0.5.6,<1.0",
     "blinker>=1.4,<2.0", "docopt>=0.6.2,<1.0", "typing>=3.6.4,<4.0",
-    "scandir>=1.7,<2.0", "psutil>=5.4.5,<6.0"
+    "scandir>=1.7,<2.0", "psutil>=5.4.5,<6.0",
+    "gunicorn>=19.9.0,<21.0"
 ]
 
 setup(
@@ -28,7 +29,6 @@ setup(
     classifiers=[
         "Programming Language :: Python",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.5",
         "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: Implementation :: PyPy",
@@ -39,6 +39,7 @@ setup(
     license="MIT",
     packages=find_packages(),
     include_package_data=True,
+    python_requires=">=3.6",
     test_suite="pytest",
     tests_require=["pytest"],
     setup_requires=DEPS,